@@ -0,0 +1,124 @@
+"""Accuracy and speed of each ASR engine on the same recordings.
+
+Every file under --corpus is cut into segments by VADRecorder and transcribed by each
+engine. A `<name>.txt` next to `<name>.wav` is used as the reference transcript; files
+without one are scored against the first engine's output instead, so "WER" then means
+how far an engine drifts from the reference engine. Run from the repo root:
+
+	python -m benchmarks.asr_backends --corpus samples --model small
+	python -m benchmarks.asr_backends --corpus samples --engines openai,faster-whisper --compute-type int8_float32
+"""
+import argparse
+import json
+import re
+import time
+from dataclasses import replace
+from pathlib import Path
+
+from src.asr_backends import get_asr_backend
+from src.asr_whisper import transcribe_audio
+from src.audio import VADRecorder, pcm16_to_float32
+from src.batch import find_audio_files
+from src.config import AppConfig
+
+
+def normalize_words(text: str) -> list[str]:
+	return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_errors(reference: list[str], hypothesis: list[str]) -> int:
+	"""Levenshtein distance over words (substitutions + insertions + deletions)."""
+	previous = list(range(len(hypothesis) + 1))
+	for i, ref_word in enumerate(reference, 1):
+		current = [i]
+		for j, hyp_word in enumerate(hypothesis, 1):
+			current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+		previous = current
+	return previous[-1]
+
+
+def load_segments(config: AppConfig, paths: list[str]) -> dict[str, list]:
+	recorder = VADRecorder(config)
+	return {path: [(pcm16_to_float32(s.pcm16), s.sample_rate) for s in recorder.segments_from_wav(path)] for path in paths}
+
+
+def run_engine(config: AppConfig, segments: dict[str, list]) -> dict:
+	backend = get_asr_backend(config)
+	t0 = time.perf_counter()
+	model = backend.load(config.whisper_model_size)
+	load_s = time.perf_counter() - t0
+	first = next((s for file_segments in segments.values() for s in file_segments), None)
+	if first is not None:
+		transcribe_audio(model, *first, backend)  # warm-up, excluded
+	transcripts, audio_s, inference_s = {}, 0.0, 0.0
+	for path, file_segments in segments.items():
+		texts = []
+		for audio, sample_rate in file_segments:
+			t1 = time.perf_counter()
+			texts.append(transcribe_audio(model, audio, sample_rate, backend).text)
+			inference_s += time.perf_counter() - t1
+			audio_s += len(audio) / sample_rate
+		transcripts[path] = " ".join(t for t in texts if t)
+	return {
+		"engine": backend.name,
+		"load_s": round(load_s, 3),
+		"audio_s": round(audio_s, 3),
+		"inference_s": round(inference_s, 3),
+		"rtf": round(inference_s / audio_s, 4) if audio_s else None,
+		"transcripts": transcripts,
+	}
+
+
+def main():
+	parser = argparse.ArgumentParser(description="ASR engine WER and real-time factor")
+	parser.add_argument("--corpus", required=True, help="Directory of audio files, optionally with .txt references")
+	parser.add_argument("--model", default="small")
+	parser.add_argument("--engines", default="openai,openai-int8,faster-whisper", help="Comma-separated; the first is the fallback reference")
+	parser.add_argument("--compute-type", default="int8", help="faster-whisper compute type")
+	parser.add_argument("--threads", type=int, default=0, help="torch / CTranslate2 threads (0 = library default)")
+	parser.add_argument("--output", default=None, metavar="FILE", help="Write results, including transcripts, as JSON")
+	args = parser.parse_args()
+
+	if args.threads:
+		import torch
+		torch.set_num_threads(args.threads)
+	base = replace(AppConfig(), whisper_model_size=args.model, asr_compute_type=args.compute_type, asr_cpu_threads=args.threads)
+	paths = find_audio_files(args.corpus)
+	if not paths:
+		raise SystemExit(f"No audio files under {args.corpus}")
+	segments = load_segments(base, paths)
+	references = {}
+	for path in paths:
+		ref = Path(path).with_suffix(".txt")
+		if ref.exists():
+			references[path] = ref.read_text(encoding="utf-8")
+
+	results = []
+	for engine in [e.strip() for e in args.engines.split(",") if e.strip()]:
+		try:
+			row = run_engine(replace(base, asr_engine=engine), segments)
+		except ImportError as e:
+			print(f"{engine:<15} skipped: {e}")
+			continue
+		results.append(row)
+
+	reference_engine = results[0]["transcripts"] if results else {}
+	print(f"model={args.model} files={len(paths)} with reference text={len(references)}")
+	for row in results:
+		errors = words = 0
+		for path in paths:
+			ref = normalize_words(references.get(path, reference_engine.get(path, "")))
+			errors += word_errors(ref, normalize_words(row["transcripts"][path]))
+			words += len(ref)
+		row["wer"] = round(errors / words, 4) if words else None
+		wer = "n/a" if row["wer"] is None else f"{row['wer'] * 100:5.1f}%"
+		print(f"{row['engine']:<15} load={row['load_s']:6.2f}s  rtf={row['rtf']}  wer={wer}")
+
+	if args.output:
+		with open(args.output, "w", encoding="utf-8") as f:
+			json.dump({"model": args.model, "compute_type": args.compute_type, "results": results}, f, indent=2)
+		print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+	main()
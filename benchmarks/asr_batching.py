@@ -0,0 +1,121 @@
+"""Throughput and tail latency of batched Whisper inference against batch size.
+
+Segments cut by VADRecorder from every file under --corpus are shared out among
+--streams simulated callers. Each caller submits its next segment as soon as the
+previous one comes back (or, with --pace realtime, after waiting the segment's
+length, as a live speaker would), through one BatchScheduler per batch size. Batch
+size 1 uses the same decoding path unbatched, so it is the baseline. Run from the repo root:
+
+	python -m benchmarks.asr_batching --corpus samples --model base --batch-sizes 1,2,4,8 --streams 8
+	python -m benchmarks.asr_batching --corpus samples --engine faster-whisper --wait-ms 50 --pace realtime
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+from dataclasses import replace
+
+from src.asr_backends import get_asr_backend
+from src.asr_batch import BatchScheduler
+from src.asr_whisper import to_whisper_audio
+from src.audio import VADRecorder, pcm16_to_float32
+from src.batch import find_audio_files
+from src.config import AppConfig
+from src.model_registry import get_model_registry
+
+
+def load_audio(config: AppConfig, paths: list[str]) -> list:
+	recorder = VADRecorder(config)
+	return [
+		to_whisper_audio(pcm16_to_float32(s.pcm16), s.sample_rate)
+		for path in paths
+		for s in recorder.segments_from_wav(path)
+	]
+
+
+def percentile(values: list[float], q: float) -> float:
+	values = sorted(values)
+	return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def run_batch_size(pool, backend, segments: list, batch_size: int, args) -> dict:
+	scheduler = BatchScheduler(pool, backend, batch_size, args.wait_ms, workers=args.workers)
+	latencies: list[float] = []
+	lock = threading.Lock()
+
+	def stream(mine: list):
+		for audio in mine:
+			t0 = time.perf_counter()
+			scheduler.transcribe(audio)
+			latency = time.perf_counter() - t0
+			with lock:
+				latencies.append(latency)
+			if args.pace == "realtime":
+				time.sleep(max(0.0, len(audio) / 16000 - latency))
+
+	shares = [segments[i :: args.streams] for i in range(args.streams)]
+	threads = [threading.Thread(target=stream, args=(share,)) for share in shares if share]
+	t0 = time.perf_counter()
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	wall_s = time.perf_counter() - t0
+	stats = scheduler.stats()
+	scheduler.close()
+	audio_s = sum(len(a) for a in segments) / 16000
+	return {
+		"batch_size": batch_size,
+		"segments": len(latencies),
+		"wall_s": round(wall_s, 3),
+		"segments_per_s": round(len(latencies) / wall_s, 2),
+		"audio_s_per_s": round(audio_s / wall_s, 2),
+		"mean_batch": stats["mean_batch"],
+		"p50_ms": round(statistics.median(latencies) * 1000, 1),
+		"p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+		"p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+	}
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Batched Whisper throughput and tail latency")
+	parser.add_argument("--corpus", required=True, help="Directory of audio files")
+	parser.add_argument("--model", default="base")
+	parser.add_argument("--engine", default="openai", help="ASR engine (openai, openai-int8, faster-whisper)")
+	parser.add_argument("--batch-sizes", default="1,2,4,8")
+	parser.add_argument("--streams", type=int, default=8, help="Concurrent callers")
+	parser.add_argument("--wait-ms", type=float, default=30.0, help="Longest a batch waits to fill")
+	parser.add_argument("--workers", type=int, default=1, help="Scheduler threads, each on its own model replica")
+	parser.add_argument("--pace", default="fast", choices=["fast", "realtime"])
+	parser.add_argument("--repeat", type=int, default=1, help="Replay the corpus this many times")
+	parser.add_argument("--output", default=None, metavar="FILE", help="Write results as JSON")
+	args = parser.parse_args()
+
+	config = replace(AppConfig(), whisper_model_size=args.model, asr_engine=args.engine)
+	paths = find_audio_files(args.corpus)
+	if not paths:
+		raise SystemExit(f"No audio files under {args.corpus}")
+	segments = load_audio(config, paths) * max(1, args.repeat)
+	backend = get_asr_backend(config)
+	pool = get_model_registry().pool(args.model, backend)
+	pool.wait()
+
+	print(f"engine={backend.name} model={args.model} segments={len(segments)} streams={args.streams} wait={args.wait_ms} ms pace={args.pace}")
+	results = []
+	for batch_size in [int(b) for b in args.batch_sizes.split(",") if b.strip()]:
+		row = run_batch_size(pool, backend, segments, batch_size, args)
+		results.append(row)
+		print(
+			f"batch={row['batch_size']:<3} mean={row['mean_batch']}  {row['segments_per_s']:6.2f} seg/s  "
+			f"{row['audio_s_per_s']:6.2f} x real time  p50={row['p50_ms']} ms  p95={row['p95_ms']} ms  p99={row['p99_ms']} ms"
+		)
+
+	if args.output:
+		with open(args.output, "w", encoding="utf-8") as f:
+			json.dump({"engine": backend.name, "model": args.model, "streams": args.streams, "wait_ms": args.wait_ms, "results": results}, f, indent=2)
+		print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+	main()
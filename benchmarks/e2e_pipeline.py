@@ -0,0 +1,261 @@
+"""End-to-end latency and throughput of the live pipeline, replayed from a WAV corpus.
+
+Audio from every file under --corpus (sorted, with a gap of silence between files)
+is fed through the real VADRecorder segmentation and WhisperASR inference inside
+the asyncio Pipeline. Translation and TTS are the deterministic local stand-ins with
+configurable latency, and playback goes to a null sink, so only the model and the
+machine vary between runs. Each model size runs in its own process so CPU time and
+peak memory are not shared. Run from the repo root:
+
+	python -m benchmarks.e2e_pipeline --corpus samples --models tiny,base --output bench.json
+	python -m benchmarks.e2e_pipeline --corpus samples --pace realtime --baseline bench.json
+
+With --pace fast (the default) audio is fed as fast as VAD consumes it; the "vad"
+stage then reflects segment length rather than wall time.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import platform
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import replace
+from typing import Optional
+
+try:
+	import resource
+except ImportError:  # Windows
+	resource = None
+
+from benchmarks.tts_first_audio import RealTimeNullSink
+from src.asr_whisper import WhisperASR
+from src.audio import VADRecorder, read_wav_pcm16
+from src.batch import find_audio_files
+from src.config import AppConfig
+from src.local_backends import LOCAL_TTS_SAMPLE_RATE, local_translate, local_tts_stream
+from src.pipeline import Pipeline
+from src.playback import PCMStreamPlayer
+from src.tracing import LatencyTracer
+
+CHUNK_MS = 20
+GAP_MS = 600
+
+
+def peak_rss_mb() -> Optional[float]:
+	if resource is None:
+		return None
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# kB on Linux, bytes on macOS
+	return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class ReplayRecorder(VADRecorder):
+	"""VADRecorder fed from files instead of the microphone."""
+
+	def __init__(self, config: AppConfig, paths: list[str], realtime: bool):
+		super().__init__(config)
+		self.paths = paths
+		self.realtime = realtime
+		self.fed_seconds = 0.0
+
+	def start(self):
+		threading.Thread(target=self._replay, daemon=True).start()
+
+	def _replay(self):
+		step = int(self.sample_rate * CHUNK_MS / 1000) * 2
+		gap = bytes(int(self.sample_rate * GAP_MS / 1000) * 2)
+		t0 = time.perf_counter()
+		for path in self.paths:
+			pcm = read_wav_pcm16(path, self.sample_rate) + gap
+			for i in range(0, len(pcm), step):
+				chunk = pcm[i : i + step]
+				if self.realtime:
+					# Pace against the clock rather than sleeping per chunk, so drift does not add up
+					ahead = t0 + self.fed_seconds - time.perf_counter()
+					if ahead > 0:
+						time.sleep(ahead)
+				self.feed(chunk)
+				self.fed_seconds += len(chunk) / 2 / self.sample_rate
+		self.stop()
+
+
+class TimedASR:
+	"""Wraps WhisperASR to total inference time against the audio it transcribed."""
+
+	def __init__(self, asr):
+		self.asr = asr
+		self.audio_s = 0.0
+		self.inference_s = 0.0
+		self._lock = threading.Lock()
+
+	def __getattr__(self, name):
+		# language_tracker(), incremental_decoder() and the rest go straight to WhisperASR
+		return getattr(self.asr, name)
+
+	def transcribe_pooled(self, audio, sample_rate: int, language=None):
+		t0 = time.perf_counter()
+		result = self.asr.transcribe_pooled(audio, sample_rate, language)
+		elapsed = time.perf_counter() - t0
+		with self._lock:
+			self.audio_s += len(audio) / sample_rate
+			self.inference_s += elapsed
+		return result
+
+
+def run_model(model: str, args: dict) -> dict:
+	"""One benchmark run in a fresh process; returns the JSON-ready result row."""
+	if args["threads"]:
+		import torch
+		torch.set_num_threads(args["threads"])
+	config = replace(
+		AppConfig(),
+		whisper_model_size=model,
+		asr_workers=args["asr_workers"],
+		tts_latency_budget_s=0,  # measure every utterance rather than dropping late ones
+	)
+	paths = find_audio_files(args["corpus"])
+	if not paths:
+		raise SystemExit(f"No audio files under {args['corpus']}")
+
+	cpu0 = time.process_time()
+	t0 = time.perf_counter()
+	whisper_asr = WhisperASR(config)
+	whisper_asr.model  # wait for the background load and warm-up
+	load_s = time.perf_counter() - t0
+	asr = TimedASR(whisper_asr)
+
+	def translate_fn(text: str, source_lang):
+		return local_translate(text, config.default_target_lang, source_lang, latency_ms=args["translate_latency_ms"])
+
+	def synth_fn(text: str):
+		return local_tts_stream(text, first_chunk_ms=args["tts_first_chunk_ms"], chunk_latency_ms=args["tts_chunk_latency_ms"])
+
+	realtime = args["pace"] == "realtime"
+	recorder = ReplayRecorder(config, paths, realtime)
+	tracer = LatencyTracer()
+	pipeline = Pipeline(
+		config,
+		asr,
+		translate_fn,
+		synth_fn=synth_fn,
+		sample_rate=LOCAL_TTS_SAMPLE_RATE,
+		recorder=recorder,
+		player_factory=lambda rate: PCMStreamPlayer(rate, stream=RealTimeNullSink(rate, realtime)),
+		tracer=tracer,
+	)
+	t1 = time.perf_counter()
+	asyncio.run(pipeline.run())
+	wall_s = time.perf_counter() - t1
+	cpu_s = time.process_time() - cpu0
+	peak_mb = peak_rss_mb()
+
+	return {
+		"model": model,
+		"files": len(paths),
+		"audio_s": round(recorder.fed_seconds, 3),
+		"speech_s": round(asr.audio_s, 3),
+		"load_s": round(load_s, 3),
+		"startup": whisper_asr.startup_stats(),
+		"wall_s": round(wall_s, 3),
+		"asr_inference_s": round(asr.inference_s, 3),
+		# Inference time per second of transcribed speech; < 1 keeps up with real time
+		"asr_rtf": round(asr.inference_s / asr.audio_s, 4) if asr.audio_s else None,
+		"pipeline_rtf": round(wall_s / recorder.fed_seconds, 4) if recorder.fed_seconds else None,
+		"cpu_s": round(cpu_s, 3),
+		"cpu_utilization": round(cpu_s / (load_s + wall_s), 3),
+		"peak_rss_mb": None if peak_mb is None else round(peak_mb, 1),
+		"outcomes": dict(tracer.outcomes),
+		"stages": tracer.summary(),
+	}
+
+
+def git_revision() -> Optional[str]:
+	try:
+		return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+
+def compare(results: list[dict], baseline_path: str, tolerance: float) -> list[str]:
+	"""Metrics that got worse than the baseline by more than `tolerance` (a fraction)."""
+	with open(baseline_path, encoding="utf-8") as f:
+		baseline = {row["model"]: row for row in json.load(f)["results"]}
+	regressions = []
+	for row in results:
+		old = baseline.get(row["model"])
+		if old is None:
+			continue
+		checks = [("asr_rtf", row["asr_rtf"], old.get("asr_rtf")), ("peak_rss_mb", row["peak_rss_mb"], old.get("peak_rss_mb"))]
+		for stage in ("asr", "end_to_end"):
+			for p in ("p50", "p95"):
+				checks.append((f"{stage}.{p}", row["stages"][stage].get(p), old["stages"].get(stage, {}).get(p)))
+		for name, new_value, old_value in checks:
+			if new_value is not None and old_value and new_value > old_value * (1 + tolerance):
+				regressions.append(f"{row['model']} {name}: {old_value:.4g} -> {new_value:.4g}")
+	return regressions
+
+
+def print_row(row: dict):
+	rss = "n/a" if row["peak_rss_mb"] is None else f"{row['peak_rss_mb']:.0f} MB"
+	print(
+		f"{row['model']:<8} audio={row['audio_s']:.1f}s load={row['load_s']:.1f}s wall={row['wall_s']:.1f}s"
+		f" asr_rtf={row['asr_rtf']} cpu={row['cpu_utilization']:.2f} peak={rss}"
+	)
+	for stage, s in row["stages"].items():
+		if s["count"]:
+			print(f"  {stage:>15}: p50={s['p50'] * 1000:8.1f} ms  p95={s['p95'] * 1000:8.1f} ms  p99={s['p99'] * 1000:8.1f} ms  (n={s['count']})")
+
+
+def main():
+	parser = argparse.ArgumentParser(description="End-to-end pipeline latency and throughput")
+	parser.add_argument("--corpus", required=True, help="Directory of WAV (or other audio) files to replay")
+	parser.add_argument("--models", default="tiny", help="Comma-separated Whisper model sizes")
+	parser.add_argument("--pace", choices=["fast", "realtime"], default="fast")
+	parser.add_argument("--asr-workers", type=int, default=1)
+	parser.add_argument("--threads", type=int, default=0, help="torch threads per run (0 = torch default)")
+	parser.add_argument("--translate-latency-ms", type=float, default=80.0)
+	parser.add_argument("--tts-first-chunk-ms", type=float, default=150.0)
+	parser.add_argument("--tts-chunk-latency-ms", type=float, default=20.0)
+	parser.add_argument("--output", default=None, metavar="FILE", help="Write results as JSON")
+	parser.add_argument("--baseline", default=None, metavar="FILE", help="Earlier --output to compare against")
+	parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed slowdown vs. baseline (fraction)")
+	args = parser.parse_args()
+
+	options = {k: v for k, v in vars(args).items() if k not in ("models", "output", "baseline", "tolerance")}
+	ctx = multiprocessing.get_context("spawn")
+	results = []
+	for model in [m.strip() for m in args.models.split(",") if m.strip()]:
+		with ctx.Pool(1) as pool:
+			row = pool.apply(run_model, (model, options))
+		print_row(row)
+		results.append(row)
+
+	if args.output:
+		report = {
+			"meta": {
+				"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+				"git": git_revision(),
+				"python": platform.python_version(),
+				"platform": platform.platform(),
+				"processor": platform.processor(),
+				"options": options,
+			},
+			"results": results,
+		}
+		with open(args.output, "w", encoding="utf-8") as f:
+			json.dump(report, f, indent=2)
+		print(f"Wrote {args.output}")
+
+	if args.baseline:
+		regressions = compare(results, args.baseline, args.tolerance)
+		for line in regressions:
+			print(f"REGRESSION {line}")
+		if regressions:
+			sys.exit(1)
+
+
+if __name__ == "__main__":
+	main()
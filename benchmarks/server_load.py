@@ -0,0 +1,145 @@
+"""Load test for server mode: N simulated callers streaming audio at real-time pace.
+
+Start the server first (offline keeps translation and TTS local, so only ASR and the
+machine vary), then point the callers at it. Run from the repo root:
+
+	python main.py --serve --offline
+	python -m benchmarks.server_load --wav samples/talk.wav --callers 16
+	python -m benchmarks.server_load --callers 32 --ramp-s 10 --output load.json
+
+Without --wav each caller sends synthetic speech-like tone bursts. Callers refused at
+admission are counted as rejected; for the rest the report gives time from the first
+audio sent to the first transcript, translation and synthesized audio, and how long
+the server took to drain after "stop".
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Optional
+
+import aiohttp
+import numpy as np
+
+from src.audio import float_to_int16_pcm, read_wav_pcm16
+from src.config import AppConfig
+
+CHUNK_MS = 20
+
+
+def synthetic_speech(sample_rate: int, seconds: float) -> bytes:
+	"""Alternating 1.5 s tone bursts and 0.7 s silences, enough for VAD to cut utterances."""
+	t = np.arange(int(sample_rate * seconds)) / sample_rate
+	voiced = (t % 2.2) < 1.5
+	tone = 0.3 * np.sin(2 * np.pi * 180 * t) + 0.15 * np.sin(2 * np.pi * 720 * t)
+	return float_to_int16_pcm((tone * voiced).astype(np.float32))
+
+
+async def caller(url: str, pcm16: bytes, sample_rate: int, target_lang: str, delay_s: float) -> dict:
+	await asyncio.sleep(delay_s)
+	row = {"accepted": False, "transcripts": 0, "translations": 0, "audio_bytes": 0}
+	first: dict[str, Optional[float]] = {"transcript": None, "translation": None, "audio": None}
+	chunk = int(sample_rate * CHUNK_MS / 1000) * 2
+	async with aiohttp.ClientSession() as http:
+		async with http.ws_connect(url) as ws:
+			await ws.send_json({"type": "start", "target_lang": target_lang})
+			hello = await ws.receive_json()
+			if hello.get("type") != "ready":
+				row["reason"] = hello.get("reason", hello.get("type"))
+				return row
+			row["accepted"] = True
+			started = time.monotonic()
+
+			async def receive():
+				async for msg in ws:
+					now = time.monotonic() - started
+					if msg.type == aiohttp.WSMsgType.BINARY:
+						row["audio_bytes"] += len(msg.data)
+						first["audio"] = first["audio"] or now
+					elif msg.type == aiohttp.WSMsgType.TEXT:
+						kind = json.loads(msg.data).get("type")
+						if kind in ("transcript", "translation"):
+							row[kind + "s"] += 1
+							first[kind] = first[kind] or now
+
+			receiver = asyncio.create_task(receive())
+			for i, offset in enumerate(range(0, len(pcm16), chunk)):
+				await ws.send_bytes(pcm16[offset : offset + chunk])
+				# Real-time pace against the wall clock, so a slow event loop does not stretch the stream
+				pause = started + (i + 1) * CHUNK_MS / 1000 - time.monotonic()
+				if pause > 0:
+					await asyncio.sleep(pause)
+			stop_at = time.monotonic()
+			await ws.send_json({"type": "stop"})
+			await receiver
+			row["drain_s"] = round(time.monotonic() - stop_at, 3)
+	row.update({f"first_{k}_s": None if v is None else round(v, 3) for k, v in first.items()})
+	return row
+
+
+def percentiles(values: list[float]) -> dict:
+	if not values:
+		return {}
+	values = sorted(values)
+	return {
+		"p50": round(statistics.median(values), 3),
+		"p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+		"max": round(values[-1], 3),
+	}
+
+
+async def run(args) -> dict:
+	config = AppConfig()
+	if args.wav:
+		pcm16 = read_wav_pcm16(args.wav, config.sample_rate)
+	else:
+		pcm16 = synthetic_speech(config.sample_rate, args.seconds)
+	delays = [args.ramp_s * i / max(1, args.callers - 1) for i in range(args.callers)]
+	t0 = time.monotonic()
+	rows = await asyncio.gather(
+		*(caller(args.url, pcm16, config.sample_rate, args.target_lang, d) for d in delays), return_exceptions=True
+	)
+	errors = [repr(r) for r in rows if isinstance(r, BaseException)]
+	rows = [r for r in rows if isinstance(r, dict)]
+	accepted = [r for r in rows if r["accepted"]]
+	report = {
+		"callers": args.callers,
+		"audio_s": round(len(pcm16) / 2 / config.sample_rate, 2),
+		"wall_s": round(time.monotonic() - t0, 2),
+		"accepted": len(accepted),
+		"rejected": len(rows) - len(accepted),
+		"errors": errors,
+		"transcripts": sum(r["transcripts"] for r in accepted),
+		"translations": sum(r["translations"] for r in accepted),
+		"audio_mb": round(sum(r["audio_bytes"] for r in accepted) / 1e6, 2),
+	}
+	for key in ("first_transcript_s", "first_translation_s", "first_audio_s", "drain_s"):
+		report[key] = percentiles([r[key] for r in accepted if r.get(key) is not None])
+	return report
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Concurrent-caller load test for server mode")
+	parser.add_argument("--url", default="ws://127.0.0.1:8765/ws")
+	parser.add_argument("--callers", type=int, default=8)
+	parser.add_argument("--wav", default=None, help="Audio every caller streams (default: synthetic tone bursts)")
+	parser.add_argument("--seconds", type=float, default=20.0, help="Length of the synthetic stream")
+	parser.add_argument("--ramp-s", type=float, default=0.0, help="Spread caller start times over this many seconds")
+	parser.add_argument("--target-lang", default="es")
+	parser.add_argument("--output", default=None, metavar="FILE", help="Write the report as JSON")
+	args = parser.parse_args()
+
+	report = asyncio.run(run(args))
+	print(f"callers={report['callers']} accepted={report['accepted']} rejected={report['rejected']} errors={len(report['errors'])} wall={report['wall_s']}s")
+	print(f"transcripts={report['transcripts']} translations={report['translations']} audio={report['audio_mb']} MB")
+	for key in ("first_transcript_s", "first_translation_s", "first_audio_s", "drain_s"):
+		print(f"{key:<22} {report[key]}")
+	if args.output:
+		with open(args.output, "w", encoding="utf-8") as f:
+			json.dump(report, f, indent=2)
+		print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+	main()
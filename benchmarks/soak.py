@@ -0,0 +1,222 @@
+"""Long-running soak test: resident memory of the live pipeline over hours of synthetic speech.
+
+Synthetic speech-like audio (tone bursts with a syllable-rate envelope) is fed through
+the real VADRecorder segmentation and Pipeline. Utterances last 0.5-6 s with pauses
+between them, and every --monologue-every utterances the speaker talks for
+--monologue-s without a pause, so forced splits at MAX_SEGMENT_MS are exercised too.
+ASR is a stand-in that sleeps --asr-rtf x the segment length (or real Whisper with
+--asr whisper). Translation and TTS are the local stand-ins, and playback goes to a
+null sink. Current RSS and every queue's depth and high-water mark are sampled every
+--sample-s seconds.
+
+After --warmup-min minutes of audio, the mean RSS of the first and last tenth of the
+samples is compared. The command exits 1 if it grew by more than --max-growth-mb.
+Run from the repo root:
+
+	python -m benchmarks.soak --hours 24 --output soak.json
+	python -m benchmarks.soak --hours 2 --speed 20 --journal /tmp/journal
+	python -m benchmarks.soak --hours 1 --asr whisper --model tiny
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+from dataclasses import replace
+from typing import Optional
+
+import numpy as np
+
+from benchmarks.e2e_pipeline import peak_rss_mb
+from benchmarks.tts_first_audio import RealTimeNullSink
+from src.asr_backends import ASRResult
+from src.audio import VADRecorder, float_to_int16_pcm
+from src.config import AppConfig
+from src.local_backends import LOCAL_TTS_SAMPLE_RATE, local_translate, local_tts_stream
+from src.pipeline import Pipeline
+from src.playback import PCMStreamPlayer
+from src.tracing import LatencyTracer
+
+CHUNK_MS = 20
+
+
+def current_rss_mb() -> Optional[float]:
+	"""Resident set size now (Linux); elsewhere the peak, which can only show growth."""
+	try:
+		with open("/proc/self/statm") as f:
+			return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+	except (OSError, ValueError, AttributeError):
+		return peak_rss_mb()
+
+
+class SyntheticSpeaker(VADRecorder):
+	"""VADRecorder fed synthetic utterances and pauses from pre-rendered chunks."""
+
+	def __init__(self, config: AppConfig, seconds: float, speed: float, monologue_every: int, monologue_s: float, seed: int = 0):
+		super().__init__(config)
+		self.seconds = seconds
+		self.speed = speed
+		self.monologue_every = monologue_every
+		self.monologue_s = monologue_s
+		self._rng = random.Random(seed)
+		self.fed_seconds = 0.0
+		self.utterances = 0
+		rate = self.sample_rate
+		# One second of voice, cycled; the 4 Hz envelope gives syllable-like quiet points
+		t = np.arange(rate) / rate
+		voice = (0.3 * np.sin(2 * np.pi * 180 * t) + 0.15 * np.sin(2 * np.pi * 720 * t)) * (0.55 + 0.45 * np.sin(2 * np.pi * 4 * t))
+		step = int(rate * CHUNK_MS / 1000)
+		pcm = float_to_int16_pcm(voice.astype(np.float32))
+		self._voiced = [pcm[i * 2 : (i + step) * 2] for i in range(0, rate, step)]
+		self._silence = bytes(step * 2)
+
+	def start(self):
+		threading.Thread(target=self._speak, daemon=True).start()
+
+	def _speak(self):
+		t0 = time.perf_counter()
+		voiced_i = 0
+		while self.fed_seconds < self.seconds:
+			self.utterances += 1
+			if self.monologue_every and self.utterances % self.monologue_every == 0:
+				talk_s = self.monologue_s
+			else:
+				talk_s = self._rng.uniform(0.5, 6.0)
+			for voiced, length_s in ((True, talk_s), (False, self._rng.uniform(0.4, 1.5))):
+				for _ in range(int(length_s * 1000 / CHUNK_MS)):
+					if voiced:
+						chunk = self._voiced[voiced_i % len(self._voiced)]
+						voiced_i += 1
+					else:
+						chunk = self._silence
+					# Pace against the clock so drift does not add up
+					ahead = t0 + self.fed_seconds / self.speed - time.perf_counter()
+					if ahead > 0:
+						time.sleep(ahead)
+					self.feed(chunk)
+					self.fed_seconds += CHUNK_MS / 1000
+		self.stop()
+
+
+class FakeASR:
+	"""Stands in for WhisperASR: takes --asr-rtf x the segment's duration and returns a sentence."""
+
+	def __init__(self, rtf: float):
+		self.rtf = rtf
+		self.segments = 0
+
+	def language_tracker(self):
+		return None
+
+	def incremental_decoder(self, language=None):
+		return None
+
+	def transcribe_pooled(self, audio, sample_rate: int, language=None) -> ASRResult:
+		seconds = len(audio) / sample_rate
+		time.sleep(seconds * self.rtf)
+		self.segments += 1
+		return ASRResult(text=f"This is utterance {self.segments}, {seconds:.1f} seconds long.", language="en")
+
+
+def monitor(pipeline: Pipeline, speaker: SyntheticSpeaker, tracer: LatencyTracer, interval_s: float, samples: list, done: threading.Event):
+	t0 = time.perf_counter()
+	while not done.wait(interval_s):
+		sample = {
+			"wall_s": round(time.perf_counter() - t0, 1),
+			"audio_s": round(speaker.fed_seconds, 1),
+			"rss_mb": current_rss_mb(),
+			"backlog": pipeline.backlog_stats(),
+			"outcomes": dict(tracer.outcomes),
+		}
+		samples.append(sample)
+		print(f"audio={sample['audio_s'] / 3600:6.2f} h  rss={sample['rss_mb']:.1f} MB  outcomes={sample['outcomes']}")
+
+
+def growth_mb(samples: list, warmup_s: float) -> Optional[float]:
+	"""Mean RSS of the last tenth of the post-warm-up samples minus that of the first tenth."""
+	steady = [s["rss_mb"] for s in samples if s["audio_s"] >= warmup_s and s["rss_mb"] is not None]
+	if len(steady) < 10:
+		return None
+	tenth = len(steady) // 10
+	return sum(steady[-tenth:]) / tenth - sum(steady[:tenth]) / tenth
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Pipeline memory over a long synthetic session")
+	parser.add_argument("--hours", type=float, default=24.0, help="Hours of audio to feed")
+	parser.add_argument("--speed", type=float, default=1.0, help="Feed rate as a multiple of real time")
+	parser.add_argument("--asr", choices=["fake", "whisper"], default="fake")
+	parser.add_argument("--model", default="tiny", help="Whisper model size with --asr whisper")
+	parser.add_argument("--asr-rtf", type=float, default=0.1, help="Fake ASR seconds per second of speech")
+	parser.add_argument("--monologue-every", type=int, default=10, help="Every Nth utterance has no pause (0 = never)")
+	parser.add_argument("--monologue-s", type=float, default=25.0)
+	parser.add_argument("--journal", default=None, metavar="DIR", help="Journal every segment to DIR (AUDIO_JOURNAL_ALL)")
+	parser.add_argument("--sample-s", type=float, default=60.0, help="Seconds between RSS samples")
+	parser.add_argument("--warmup-min", type=float, default=10.0, help="Minutes of audio excluded from the growth check")
+	parser.add_argument("--max-growth-mb", type=float, default=50.0)
+	parser.add_argument("--output", default=None, metavar="FILE", help="Write the samples as JSON")
+	args = parser.parse_args()
+
+	config = AppConfig()
+	if args.journal:
+		config = replace(config, audio_journal_dir=args.journal, audio_journal_all=True)
+	if args.asr == "whisper":
+		from src.asr_whisper import WhisperASR
+		config = replace(config, whisper_model_size=args.model)
+		asr = WhisperASR(config)
+		asr.model  # wait for the background load and warm-up
+	else:
+		asr = FakeASR(args.asr_rtf)
+
+	realtime = args.speed <= 1.0
+	speaker = SyntheticSpeaker(config, args.hours * 3600, args.speed, args.monologue_every, args.monologue_s)
+	tracer = LatencyTracer()
+	pipeline = Pipeline(
+		config,
+		asr,
+		lambda text, source_lang: local_translate(text, config.default_target_lang, source_lang),
+		synth_fn=lambda text: local_tts_stream(text),
+		sample_rate=LOCAL_TTS_SAMPLE_RATE,
+		recorder=speaker,
+		player_factory=lambda rate: PCMStreamPlayer(rate, stream=RealTimeNullSink(rate, realtime)),
+		tracer=tracer,
+	)
+
+	samples: list = []
+	done = threading.Event()
+	watcher = threading.Thread(target=monitor, args=(pipeline, speaker, tracer, args.sample_s, samples, done), daemon=True)
+	print(f"soak: {args.hours} h of audio at {args.speed}x, asr={args.asr}, rss={current_rss_mb():.1f} MB")
+	watcher.start()
+	try:
+		asyncio.run(pipeline.run())
+	except KeyboardInterrupt:
+		print("Interrupted; reporting what was sampled")
+	done.set()
+	watcher.join()
+
+	growth = growth_mb(samples, args.warmup_min * 60)
+	result = {
+		"args": vars(args),
+		"utterances_fed": speaker.utterances,
+		"audio_s": round(speaker.fed_seconds, 1),
+		"forced_splits": speaker.forced_splits,
+		"rss_growth_mb": None if growth is None else round(growth, 1),
+		"samples": samples,
+	}
+	if pipeline.journal is not None:
+		result["journal"] = pipeline.journal.stats()
+	print(f"fed {result['audio_s'] / 3600:.2f} h, {speaker.forced_splits} forced splits, RSS growth after warm-up: {result['rss_growth_mb']} MB")
+	if args.output:
+		with open(args.output, "w", encoding="utf-8") as f:
+			json.dump(result, f, indent=2)
+		print(f"Wrote {args.output}")
+	if growth is not None and growth > args.max_growth_mb:
+		print(f"RSS grew by more than {args.max_growth_mb} MB")
+		sys.exit(1)
+
+
+if __name__ == "__main__":
+	main()
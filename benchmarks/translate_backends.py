@@ -0,0 +1,105 @@
+"""Latency of each translation backend on the same sentences: local MT against DeepL and Google.
+
+Each backend translates --texts sentences one at a time (the live pipeline's pattern)
+and then all of them as batches of --batch. The first call is timed separately:
+for the local backend it includes loading the pair's model. The translation cache is
+not involved. Remote backends need network access (and DEEPL_API_KEY for DeepL) and
+are skipped when unavailable. Run from the repo root:
+
+	python -m benchmarks.translate_backends --target es
+	python -m benchmarks.translate_backends --backends local --engine transformers --batch 16 --output mt.json
+"""
+import argparse
+import json
+import statistics
+import time
+from dataclasses import replace
+
+from src.config import AppConfig
+from src.translate import create_translation_backend
+
+SENTENCES = [
+	"Good morning, how can I help you?",
+	"The train to the airport leaves every twenty minutes.",
+	"Could you repeat that more slowly?",
+	"I have a reservation under the name Garcia.",
+	"We need to finish the report before Friday.",
+	"Is there a pharmacy near the hotel?",
+	"My flight was delayed by three hours.",
+	"Please turn left at the second traffic light.",
+]
+
+
+def run_backend(config: AppConfig, name: str, texts: list[str], source: str, target: str, batch: int) -> dict:
+	backend = create_translation_backend(name, config)
+	t0 = time.perf_counter()
+	backend.translate(texts[0], target, source)
+	first_s = time.perf_counter() - t0
+
+	single = []
+	for text in texts:
+		t1 = time.perf_counter()
+		backend.translate(text, target, source)
+		single.append(time.perf_counter() - t1)
+
+	t2 = time.perf_counter()
+	for i in range(0, len(texts), batch):
+		backend.translate_batch(texts[i : i + batch], target, source)
+	batch_s = time.perf_counter() - t2
+	single.sort()
+	row = {
+		"backend": name,
+		"first_call_s": round(first_s, 3),
+		"p50_ms": round(statistics.median(single) * 1000, 1),
+		"p95_ms": round(single[min(len(single) - 1, int(len(single) * 0.95))] * 1000, 1),
+		"sequential_texts_per_s": round(len(texts) / sum(single), 1),
+		"batched_texts_per_s": round(len(texts) / batch_s, 1),
+	}
+	if hasattr(backend, "stats"):
+		row["models"] = backend.stats()
+	return row
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Translation backend latency and throughput")
+	parser.add_argument("--backends", default="local,deepl,google")
+	parser.add_argument("--source", default="en")
+	parser.add_argument("--target", default="es")
+	parser.add_argument("--texts", type=int, default=64, help="Sentences per backend")
+	parser.add_argument("--batch", type=int, default=8, help="Texts per translate_batch() call")
+	parser.add_argument("--engine", default=None, help="Local MT engine (ctranslate2 or transformers)")
+	parser.add_argument("--threads", type=int, default=None, help="Local MT CPU threads")
+	parser.add_argument("--output", default=None, metavar="FILE", help="Write results as JSON")
+	args = parser.parse_args()
+
+	config = AppConfig()
+	if args.engine:
+		config = replace(config, local_mt_engine=args.engine)
+	if args.threads is not None:
+		config = replace(config, local_mt_threads=args.threads)
+	texts = [SENTENCES[i % len(SENTENCES)] + ("" if i < len(SENTENCES) else f" ({i})") for i in range(args.texts)]
+
+	results = []
+	for name in [b.strip() for b in args.backends.split(",") if b.strip()]:
+		if name == "deepl" and not config.deepl_api_key:
+			print(f"{name:<7} skipped: DEEPL_API_KEY not set")
+			continue
+		try:
+			row = run_backend(config, name, texts, args.source, args.target, max(1, args.batch))
+		except Exception as e:
+			print(f"{name:<7} skipped: {e}")
+			continue
+		results.append(row)
+		print(
+			f"{name:<7} first={row['first_call_s']:6.2f}s  p50={row['p50_ms']} ms  p95={row['p95_ms']} ms  "
+			f"sequential={row['sequential_texts_per_s']}/s  batched={row['batched_texts_per_s']}/s"
+		)
+
+	if args.output:
+		with open(args.output, "w", encoding="utf-8") as f:
+			json.dump({"source": args.source, "target": args.target, "results": results}, f, indent=2)
+		print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+	main()
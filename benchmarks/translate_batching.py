@@ -0,0 +1,160 @@
+"""Request count, throughput and latency of translation micro-batching against a mock DeepL.
+
+A local aiohttp server stands in for the DeepL API (/v2/translate). It answers after
+--latency-ms plus --per-text-ms for each text and counts requests. The real
+TranslationService and deepl client talk to it through DEEPL_SERVER_URL, with the
+translation cache off. --callers threads each translate their share of a list of
+short utterances one after another, like concurrent sessions. The run is repeated for
+each batch size; batch size 1 sends one request per utterance. Run from the repo root:
+
+	python -m benchmarks.translate_batching --callers 16 --texts 400 --batch-sizes 1,4,16
+	python -m benchmarks.translate_batching --latency-ms 120 --wait-ms 25 --output translate.json
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import threading
+import time
+from dataclasses import replace
+
+from aiohttp import web
+
+from src.config import AppConfig
+from src.translate import TranslationService
+
+PHRASES = [
+	"Hello, how are you today?",
+	"I would like a table for two.",
+	"Where is the train station?",
+	"Thank you very much.",
+	"Can you speak more slowly, please?",
+	"The meeting starts at nine.",
+	"I am looking for a pharmacy.",
+	"How much does this cost?",
+]
+
+
+class MockDeepL:
+	"""Minimal /v2/translate: echoes each text reversed, after a simulated round trip."""
+
+	def __init__(self, latency_ms: float, per_text_ms: float):
+		self.latency_s = latency_ms / 1000
+		self.per_text_s = per_text_ms / 1000
+		self.requests = 0
+		self.texts = 0
+		self._runner = None
+		self.url = None
+
+	async def translate(self, request: web.Request) -> web.Response:
+		if request.content_type == "application/json":
+			body = await request.json()
+			texts, target = body.get("text", []), body.get("target_lang", "")
+		else:
+			form = await request.post()
+			texts, target = form.getall("text", []), form.get("target_lang", "")
+		self.requests += 1
+		self.texts += len(texts)
+		await asyncio.sleep(self.latency_s + self.per_text_s * len(texts))
+		return web.json_response({
+			"translations": [{"detected_source_language": "EN", "text": f"[{target}] {t[::-1]}"} for t in texts]
+		})
+
+	def start(self) -> str:
+		"""Serve on an ephemeral port from a background thread; returns the base URL."""
+		started = threading.Event()
+
+		async def serve():
+			app = web.Application()
+			app.add_routes([web.post("/v2/translate", self.translate)])
+			self._runner = web.AppRunner(app)
+			await self._runner.setup()
+			site = web.TCPSite(self._runner, "127.0.0.1", 0)
+			await site.start()
+			port = site._server.sockets[0].getsockname()[1]
+			self.url = f"http://127.0.0.1:{port}"
+			started.set()
+			await asyncio.Event().wait()
+
+		threading.Thread(target=lambda: asyncio.run(serve()), daemon=True).start()
+		started.wait()
+		return self.url
+
+
+def run_batch_size(base: AppConfig, mock: MockDeepL, texts: list[str], batch_size: int, callers: int) -> dict:
+	service = TranslationService(replace(base, translate_batch_size=batch_size))
+	requests_before = mock.requests
+	latencies: list[float] = []
+	lock = threading.Lock()
+
+	def caller(mine: list[str]):
+		for text in mine:
+			t0 = time.perf_counter()
+			service.translate(text, base.default_target_lang, "en")
+			with lock:
+				latencies.append(time.perf_counter() - t0)
+
+	shares = [texts[i::callers] for i in range(callers)]
+	threads = [threading.Thread(target=caller, args=(share,)) for share in shares if share]
+	t0 = time.perf_counter()
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	wall_s = time.perf_counter() - t0
+	if service.batcher is not None:
+		service.batcher.close()
+	latencies.sort()
+	return {
+		"batch_size": batch_size,
+		"texts": len(latencies),
+		"requests": mock.requests - requests_before,
+		"wall_s": round(wall_s, 3),
+		"texts_per_s": round(len(latencies) / wall_s, 1),
+		"p50_ms": round(statistics.median(latencies) * 1000, 1),
+		"p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+	}
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Translation micro-batching against a mock DeepL server")
+	parser.add_argument("--callers", type=int, default=16, help="Concurrent callers (sessions)")
+	parser.add_argument("--texts", type=int, default=400, help="Utterances translated in total")
+	parser.add_argument("--batch-sizes", default="1,4,16")
+	parser.add_argument("--wait-ms", type=float, default=15.0, help="Longest a batch waits to fill")
+	parser.add_argument("--latency-ms", type=float, default=80.0, help="Mock round-trip time per request")
+	parser.add_argument("--per-text-ms", type=float, default=1.0, help="Mock extra time per text in a request")
+	parser.add_argument("--output", default=None, metavar="FILE", help="Write results as JSON")
+	args = parser.parse_args()
+
+	mock = MockDeepL(args.latency_ms, args.per_text_ms)
+	url = mock.start()
+	base = replace(
+		AppConfig(),
+		deepl_api_key="mock",
+		deepl_server_url=url,
+		translation_cache_memory=0,
+		translate_batch_wait_ms=args.wait_ms,
+		translate_workers=args.callers,
+	)
+	# Distinct texts so nothing could be served from a cache even if one were on
+	texts = [f"{PHRASES[i % len(PHRASES)]} ({i})" for i in range(args.texts)]
+
+	print(f"mock DeepL at {url}: {args.latency_ms} ms + {args.per_text_ms} ms/text, callers={args.callers}, wait={args.wait_ms} ms")
+	results = []
+	for batch_size in [int(b) for b in args.batch_sizes.split(",") if b.strip()]:
+		row = run_batch_size(base, mock, texts, batch_size, args.callers)
+		results.append(row)
+		print(
+			f"batch={row['batch_size']:<3} requests={row['requests']:<5} {row['texts_per_s']:7.1f} texts/s  "
+			f"p50={row['p50_ms']} ms  p95={row['p95_ms']} ms"
+		)
+
+	if args.output:
+		with open(args.output, "w", encoding="utf-8") as f:
+			json.dump({"args": vars(args), "results": results}, f, indent=2)
+		print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,68 @@
+"""Time-to-first-audio for buffered vs. streaming TTS playback, using a fake chunked provider.
+
+No sound device or API key needed: audio goes to a null sink that consumes it at
+real-time pace. Run from the repo root:
+
+	python -m benchmarks.tts_first_audio --first-chunk-ms 150 --chunk-latency-ms 40
+"""
+import argparse
+import statistics
+import time
+
+from src.local_backends import LOCAL_TTS_SAMPLE_RATE, local_tts_stream
+from src.playback import play_pcm16_stream
+
+
+class RealTimeNullSink:
+	"""Output stream stand-in that blocks on write for as long as the audio would play."""
+
+	def __init__(self, sample_rate: int, realtime: bool):
+		self.sample_rate = sample_rate
+		self.realtime = realtime
+
+	def start(self):
+		pass
+
+	def write(self, data: bytes):
+		if self.realtime:
+			time.sleep(len(data) / 2 / self.sample_rate)
+
+	def stop(self):
+		pass
+
+	def abort(self):
+		pass
+
+	def close(self):
+		pass
+
+
+def main():
+	parser = argparse.ArgumentParser(description="TTS time-to-first-audio")
+	parser.add_argument("--text", default="Un momento por favor, le comunico con un agente en seguida.")
+	parser.add_argument("--first-chunk-ms", type=float, default=150.0)
+	parser.add_argument("--chunk-latency-ms", type=float, default=40.0)
+	parser.add_argument("--chunk-ms", type=int, default=100)
+	parser.add_argument("--runs", type=int, default=5)
+	parser.add_argument("--realtime", action="store_true", help="Make the sink consume audio at playback speed")
+	args = parser.parse_args()
+
+	def provider():
+		return local_tts_stream(args.text, chunk_ms=args.chunk_ms, first_chunk_ms=args.first_chunk_ms, chunk_latency_ms=args.chunk_latency_ms)
+
+	rate = LOCAL_TTS_SAMPLE_RATE
+	buffered, streaming = [], []
+	for _ in range(args.runs):
+		t0 = time.perf_counter()
+		whole = b"".join(provider())  # the old path: join every chunk, then play
+		stats = play_pcm16_stream([whole], rate, stream=RealTimeNullSink(rate, args.realtime), started_at=t0)
+		buffered.append(stats.time_to_first_audio_s * 1000)
+		stats = play_pcm16_stream(provider(), rate, stream=RealTimeNullSink(rate, args.realtime))
+		streaming.append(stats.time_to_first_audio_s * 1000)
+	print(f"clip={stats.audio_s:.2f}s first_chunk={args.first_chunk_ms} ms chunk_latency={args.chunk_latency_ms} ms")
+	print(f"buffered  time-to-first-audio: {statistics.median(buffered):7.1f} ms")
+	print(f"streaming time-to-first-audio: {statistics.median(streaming):7.1f} ms")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,182 @@
+"""Throughput of VADRecorder.segment_stream on hours of synthetic PCM.
+
+Compares the ring-buffer loop against the slice-and-pop loop it replaced and checks
+that both cut identical segments. Each run gets its own recorder and VAD, since
+webrtcvad keeps state between frames. --pool-min minutes of PCM are rendered up front
+and cycled, so generating audio is not timed. Utterances are never cut at
+max_segment_ms here, because only the new loop cuts at the quietest frame.
+
+The VAD costs far more than either loop, so --free-vad swaps in a fixed on/off
+pattern to time the loops alone. The old loop copies everything still buffered on
+every frame, so the gap grows with --chunk-ms: timed alone, the new loop is about even
+at 20-30 ms chunks, about 1.2x as fast at 100 ms, 1.9x at 1 s and 6x at 10 s (a whole
+file pushed at once). With webrtcvad the classifier narrows the gap.
+
+Run from the repo root:
+
+	python -m benchmarks.vad_segments --hours 2
+	python -m benchmarks.vad_segments --hours 2 --free-vad --chunk-ms 1000
+	python -m benchmarks.vad_segments --hours 8 --chunk-ms 1000 --energy-vad
+"""
+import argparse
+import hashlib
+import itertools
+import time
+from dataclasses import replace
+from typing import Generator, Iterable
+
+import numpy as np
+
+from src.audio import AudioSegment, VADRecorder
+from src.config import AppConfig
+
+
+class EnergyVad:
+	"""Stand-in for webrtcvad so the loop itself, not the classifier, dominates the timing."""
+
+	def __init__(self, threshold: float = 500.0):
+		self.threshold = threshold
+
+	def is_speech(self, frame: bytes, sample_rate: int) -> bool:
+		samples = np.frombuffer(frame, dtype=np.int16)
+		return float(np.abs(samples).mean()) > self.threshold
+
+
+class PatternVad:
+	"""Costs next to nothing: alternates runs of voiced and unvoiced frames."""
+
+	def __init__(self, run_frames: int = 60):
+		self.run_frames = run_frames
+		self._n = 0
+
+	def is_speech(self, frame: bytes, sample_rate: int) -> bool:
+		self._n += 1
+		return (self._n // self.run_frames) % 2 == 0
+
+
+def synthetic_pcm(hours: float, sample_rate: int, chunk_ms: int, seed: int = 0) -> Generator[bytes, None, None]:
+	"""Alternate noisy tone bursts (0.3-4 s) and quiet gaps (0.2-1.5 s), produced lazily."""
+	rng = np.random.default_rng(seed)
+	chunk = int(sample_rate * chunk_ms / 1000)
+	total = int(hours * 3600 * sample_rate)
+	pending = np.zeros(0, dtype=np.int16)
+	produced = 0
+	speech = True
+	while produced < total:
+		while len(pending) < chunk:
+			seconds = rng.uniform(0.3, 4.0) if speech else rng.uniform(0.2, 1.5)
+			n = int(seconds * sample_rate)
+			t = np.arange(n) / sample_rate
+			if speech:
+				burst = 6000 * np.sin(2 * np.pi * rng.uniform(120, 300) * t) + rng.normal(0, 800, n)
+			else:
+				burst = rng.normal(0, 60, n)
+			pending = np.concatenate([pending, np.clip(burst, -32768, 32767).astype(np.int16)])
+			speech = not speech
+		out, pending = pending[:chunk], pending[chunk:]
+		produced += len(out)
+		yield out.tobytes()
+
+
+def legacy_segment_stream(rec: VADRecorder, chunks: Iterable[bytes]) -> Generator[AudioSegment, None, None]:
+	"""The slice-and-pop loop as it stood before the ring buffer (end-of-speech hangover
+	included), as the reference for boundaries and speed.
+
+	It predates partial snapshots and cutting at the quietest frame, so it matches only
+	while utterances stay under max_segment_ms, as the synthetic ones do.
+	"""
+	ring = bytearray()
+	triggered = False
+	speech_bytes = bytearray()
+	padding_frames = int(rec.config.padding_ms / rec.frame_ms)
+	hangover_frames = max(1, int(rec.hangover_ms / rec.frame_ms))
+	window = padding_frames
+	padding_ring: list[bool] = []
+	max_bytes = int(rec.sample_rate * rec.config.max_segment_ms / 1000) * 2
+
+	for chunk in chunks:
+		ring.extend(chunk)
+		while len(ring) >= rec.frame_bytes:
+			frame = bytes(ring[: rec.frame_bytes])
+			ring = ring[rec.frame_bytes :]
+			is_speech = False
+			try:
+				is_speech = rec.vad.is_speech(frame, rec.sample_rate)
+			except Exception:
+				is_speech = False
+
+			if not triggered:
+				padding_ring.append(is_speech)
+				if len(padding_ring) > window:
+					padding_ring.pop(0)
+				if sum(padding_ring) > 0.9 * len(padding_ring):
+					triggered = True
+					speech_bytes.extend(frame)
+					window = hangover_frames
+					padding_ring = padding_ring[-window:]
+			else:
+				speech_bytes.extend(frame)
+				too_long = len(speech_bytes) >= max_bytes
+				end_condition = not is_speech and sum(padding_ring) < 0.1 * len(padding_ring)
+				padding_ring.append(is_speech)
+				if len(padding_ring) > window:
+					padding_ring.pop(0)
+				if too_long or end_condition:
+					yield rec._segment(speech_bytes)
+					triggered = False
+					speech_bytes.clear()
+					padding_ring.clear()
+					window = padding_frames
+
+	if triggered and speech_bytes:
+		yield rec._segment(speech_bytes)
+
+
+def make_recorder(args) -> VADRecorder:
+	# Long enough that webrtcvad bridging a few synthetic gaps never forces a cut
+	rec = VADRecorder(replace(AppConfig(), max_segment_ms=120_000))
+	if args.energy_vad:
+		rec.vad = EnergyVad()
+	elif args.free_vad:
+		rec.vad = PatternVad()
+	return rec
+
+
+def run(name: str, segment_fn, pool: list[bytes], args) -> tuple[list, float]:
+	rec = make_recorder(args)
+	n_chunks = int(args.hours * 3600 * 1000 / args.chunk_ms)
+	digest = []
+	t0 = time.perf_counter()
+	for seg in segment_fn(rec, itertools.islice(itertools.cycle(pool), n_chunks)):
+		digest.append((seg.duration_ms, hashlib.blake2b(seg.pcm16, digest_size=8).hexdigest()))
+	elapsed = time.perf_counter() - t0
+	audio_s = args.hours * 3600
+	frames = audio_s * 1000 / rec.frame_ms
+	print(f"{name:<8} {elapsed:8.2f} s  {audio_s / elapsed:9.0f}x real time  {elapsed / frames * 1e6:6.2f} us/frame  segments={len(digest)}")
+	return digest, elapsed
+
+
+def main():
+	parser = argparse.ArgumentParser(description="VADRecorder segmentation micro-benchmark")
+	parser.add_argument("--hours", type=float, default=1.0)
+	parser.add_argument("--chunk-ms", type=int, default=100, help="Size of each pushed chunk (mic callbacks are ~10-100 ms)")
+	parser.add_argument("--energy-vad", action="store_true", help="Replace webrtcvad with a cheap energy threshold")
+	parser.add_argument("--free-vad", action="store_true", help="Replace webrtcvad with a fixed pattern to time the loop alone")
+	parser.add_argument("--pool-min", type=float, default=10.0, help="Minutes of distinct synthetic PCM, cycled to fill --hours")
+	parser.add_argument("--skip-legacy", action="store_true")
+	parser.add_argument("--seed", type=int, default=0)
+	args = parser.parse_args()
+
+	vad = "energy" if args.energy_vad else "pattern" if args.free_vad else "webrtcvad"
+	print(f"hours={args.hours} chunk={args.chunk_ms} ms vad={vad}")
+
+	pool = list(synthetic_pcm(min(args.hours, args.pool_min / 60), AppConfig().sample_rate, args.chunk_ms, args.seed))
+	ring, ring_s = run("ring", lambda r, c: r.segment_stream(c), pool, args)
+	if not args.skip_legacy:
+		legacy, legacy_s = run("legacy", legacy_segment_stream, pool, args)
+		print(f"ring loop is {legacy_s / ring_s:.2f}x the speed of the legacy loop")
+		print("boundaries identical" if ring == legacy else "BOUNDARIES DIFFER")
+
+
+if __name__ == "__main__":
+	main()
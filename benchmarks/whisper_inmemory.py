@@ -0,0 +1,82 @@
+"""Per-segment Whisper latency with the in-memory path vs. the old temp-WAV round trip.
+
+Run from the repo root:
+
+	python -m benchmarks.whisper_inmemory --model tiny --runs 10
+	python -m benchmarks.whisper_inmemory --wav sample.wav
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+import whisper
+
+from src.asr_whisper import to_whisper_audio
+
+
+def synthetic_segment(seconds: float, sample_rate: int) -> np.ndarray:
+	t = np.arange(int(seconds * sample_rate), dtype=np.float32) / sample_rate
+	tone = 0.2 * np.sin(2 * np.pi * 220.0 * t) * (0.5 + 0.5 * np.sin(2 * np.pi * 3.0 * t))
+	return tone.astype(np.float32).reshape(-1, 1)
+
+
+def transcribe_via_tempfile(model, audio: np.ndarray, sample_rate: int) -> str:
+	"""The pre-existing path: write a WAV, let whisper shell out to ffmpeg, unlink."""
+	with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_file:
+		sf.write(tmp_file.name, audio, sample_rate)
+	try:
+		return model.transcribe(tmp_file.name, language="en")["text"].strip()
+	finally:
+		os.unlink(tmp_file.name)
+
+
+def transcribe_in_memory(model, audio: np.ndarray, sample_rate: int) -> str:
+	return model.transcribe(to_whisper_audio(audio, sample_rate), language="en")["text"].strip()
+
+
+def measure(fn, model, audio, sample_rate, runs: int) -> list[float]:
+	fn(model, audio, sample_rate)  # warm-up, excluded
+	timings = []
+	for _ in range(runs):
+		t0 = time.perf_counter()
+		fn(model, audio, sample_rate)
+		timings.append((time.perf_counter() - t0) * 1000)
+	return timings
+
+
+def report(name: str, timings: list[float]):
+	ordered = sorted(timings)
+	p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+	print(f"{name:<12} mean={statistics.mean(timings):8.1f} ms  p50={statistics.median(timings):8.1f} ms  p95={p95:8.1f} ms")
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Whisper in-memory vs temp-file latency")
+	parser.add_argument("--model", default=os.getenv("WHISPER_MODEL", "tiny"))
+	parser.add_argument("--wav", default=None, help="Optional WAV to use instead of a synthetic 3 s segment")
+	parser.add_argument("--seconds", type=float, default=3.0)
+	parser.add_argument("--sample-rate", type=int, default=16000)
+	parser.add_argument("--runs", type=int, default=10)
+	args = parser.parse_args()
+
+	if args.wav:
+		audio, sample_rate = sf.read(args.wav, dtype="float32", always_2d=True)
+	else:
+		sample_rate = args.sample_rate
+		audio = synthetic_segment(args.seconds, sample_rate)
+
+	model = whisper.load_model(args.model)
+	print(f"model={args.model} segment={len(audio) / sample_rate:.2f}s runs={args.runs}")
+	tmp = measure(transcribe_via_tempfile, model, audio, sample_rate, args.runs)
+	mem = measure(transcribe_in_memory, model, audio, sample_rate, args.runs)
+	report("temp-file", tmp)
+	report("in-memory", mem)
+	print(f"saved per segment: {statistics.mean(tmp) - statistics.mean(mem):.1f} ms")
+
+
+if __name__ == "__main__":
+	main()
@@ -1,4 +1,5 @@
 import argparse
+import asyncio
 from rich import print
 from dotenv import load_dotenv
 
@@ -7,9 +8,51 @@ load_dotenv()
 from src.config import AppConfig
 from src.asr_whisper import WhisperASR
 from src.translate import translate_text
-from src.tts_elevenlabs import tts_elevenlabs
-from src.tts_azure import tts_azure
-from src.tts_queue import TTSQueue
+from src.tts_elevenlabs import SAMPLE_RATE as ELEVENLABS_SAMPLE_RATE, speech_chunks_elevenlabs, synthesize_elevenlabs
+from src.tts_azure import SAMPLE_RATE as AZURE_SAMPLE_RATE, speech_chunks_azure, synthesize_azure, warm_azure
+from src.pipeline import Pipeline
+
+
+def resolve_tts_provider(name: str, config: AppConfig) -> str:
+	if name != "auto":
+		return name
+	if config.elevenlabs_api_key:
+		return "elevenlabs"
+	if config.azure_speech_key and config.azure_speech_region:
+		return "azure"
+	return "none"
+
+
+def run_prewarm(args, config: AppConfig, provider: str):
+	from src.tts_cache import get_audio_cache, prewarm
+	if provider == "elevenlabs":
+		synthesize = synthesize_elevenlabs
+	elif provider == "azure":
+		synthesize = synthesize_azure
+	else:
+		print("[red]Pre-warm needs a TTS provider (ElevenLabs or Azure keys).[/red]")
+		return
+	cache = get_audio_cache(config)
+	if cache is None:
+		print("[red]TTS cache is disabled (TTS_CACHE_MAX_MB=0); nothing to pre-warm.[/red]")
+		return
+	with open(args.prewarm, encoding="utf-8") as f:
+		done, failed = prewarm(f, lambda text: synthesize(text, config, voice=args.voice, accent=args.accent, native_style=args.native_style))
+	stats = cache.stats()
+	print(f"[green]Pre-warmed {done} phrases[/green] ({failed} failed) with {provider}: {stats['hits']} already cached, {stats['bytes'] / 1e6:.1f} MB on disk")
+
+
+def run_batch(args, config: AppConfig):
+	from src.batch import translate_directory
+	tts = "local" if args.offline else resolve_tts_provider(args.tts, config)
+	tts_options = {"voice": args.voice, "accent": args.accent, "native_style": args.native_style}
+	print(f"[bold cyan]Batch[/bold cyan] -> {args.batch} => {args.output_dir}, target={config.default_target_lang}, offline={args.offline}, tts={tts}")
+	report = translate_directory(args.batch, args.output_dir, config, workers=args.workers, offline=args.offline, tts=tts, tts_options=tts_options)
+	failed = sum(1 for f in report.files if f.error)
+	print(
+		f"[green]{len(report.files)} files[/green] ({failed} failed), {report.audio_seconds / 60:.1f} min audio in {report.wall_seconds:.1f} s"
+		f" -> RTF {report.rtf:.3f}, {report.files_per_hour:.0f} files/hour"
+	)
 
 
 def main():
@@ -19,6 +62,16 @@ def main():
 	parser.add_argument("--accent", default=None, choices=["us", "uk", "au", "gr"], help="Accent preference for English/Greek voices")
 	parser.add_argument("--tts", default="auto", choices=["auto", "elevenlabs", "azure"], help="TTS provider")
 	parser.add_argument("--native-style", action="store_true", help="Enable native accent profile with tuned pitch/pace/style")
+	parser.add_argument("--batch", default=None, metavar="DIR", help="Translate every audio file under DIR instead of the mic")
+	parser.add_argument("--output-dir", default="output", help="Where batch mode writes transcripts, translations and audio")
+	parser.add_argument("--workers", type=int, default=None, help="Batch worker processes (default: one per core)")
+	parser.add_argument("--offline", action="store_true", help="Batch and server mode: use local stand-ins for translation and TTS")
+	parser.add_argument("--barge-in", action="store_true", help="Stop speaking when you start talking (use headphones to avoid self-interruption)")
+	parser.add_argument("--serve", action="store_true", help="Run the WebSocket server for many concurrent callers instead of the mic")
+	parser.add_argument("--host", default="0.0.0.0", help="Server mode: interface to listen on")
+	parser.add_argument("--port", type=int, default=8765, help="Server mode: port to listen on")
+	parser.add_argument("--prewarm", default=None, metavar="FILE", help="Synthesize each line of FILE into the TTS cache and exit")
+	parser.add_argument("--export-journal", default=None, metavar="DIR", help="Write the segments in AUDIO_JOURNAL_DIR to DIR as WAV files (for --batch) and exit")
 	args = parser.parse_args()
 
 	config = AppConfig()
@@ -29,47 +82,80 @@ def main():
 	if args.accent:
 		config.default_accent = args.accent
 
-	print(f"[bold cyan]Starting[/bold cyan] -> target={config.default_target_lang}, voice={config.default_voice}, accent={config.default_accent}")
+	if args.export_journal:
+		from src.audio_journal import export_journal
+		if not config.audio_journal_dir:
+			print("[red]AUDIO_JOURNAL_DIR is not set[/red]")
+			return
+		count = export_journal(config.audio_journal_dir, args.export_journal)
+		print(f"[green]Exported {count} journaled segments[/green] -> {args.export_journal}")
+		return
+
+	if args.batch:
+		run_batch(args, config)
+		return
 
 	# Decide TTS provider function
-	provider = args.tts
-	if provider == "auto":
-		if config.elevenlabs_api_key:
-			provider = "elevenlabs"
-		elif config.azure_speech_key and config.azure_speech_region:
-			provider = "azure"
-		else:
-			provider = "none"
+	provider = resolve_tts_provider(args.tts, config)
+
+	if args.prewarm:
+		run_prewarm(args, config, provider)
+		return
+
+	if args.serve:
+		from src.server import serve
+		serve(config, host=args.host, port=args.port, tts="local" if args.offline else provider, offline=args.offline)
+		return
+
+	print(f"[bold cyan]Starting[/bold cyan] -> target={config.default_target_lang}, voice={config.default_voice}, accent={config.default_accent}")
 
 	if provider == "elevenlabs":
-		def speak_fn(text: str):
-			tts_elevenlabs(text, config, voice=args.voice, accent=args.accent, native_style=args.native_style)
+		def synth_fn(text: str):
+			return speech_chunks_elevenlabs(text, config, voice=args.voice, accent=args.accent, native_style=args.native_style)
+		tts = {"synth_fn": synth_fn, "sample_rate": ELEVENLABS_SAMPLE_RATE}
 	elif provider == "azure":
-		def speak_fn(text: str):
-			tts_azure(text, config, voice=args.voice, accent=args.accent, native_style=args.native_style)
+		try:
+			warm_azure(config, voice=args.voice, accent=args.accent, native_style=args.native_style)
+		except Exception as e:
+			print(f"[red]Azure TTS warm-up failed:[/red] {e}")
+
+		def synth_fn(text: str):
+			return speech_chunks_azure(text, config, voice=args.voice, accent=args.accent, native_style=args.native_style)
+		tts = {"synth_fn": synth_fn, "sample_rate": AZURE_SAMPLE_RATE}
 	else:
 		def speak_fn(text: str):
 			print(f"[red]No TTS provider configured. Text:[/red] {text}")
+		tts = {"speak_fn": speak_fn}
+
+	def translate_fn(text: str, source_lang):
+		return translate_text(text, config.default_target_lang, config, source_lang=source_lang)
+
+	def on_transcript(utt):
+		print(f"[yellow]{(utt.language or '')}[/yellow] > {utt.text}{'' if utt.is_final else ' …'}")
 
-	ttsq = TTSQueue(speak_fn)
-	ttsq.start()
+	def on_translation(utt):
+		print(f"[bold magenta]{config.default_target_lang}[/bold magenta] > {utt.translation}")
 
 	asr = WhisperASR(config)
-	asr.start()
+	pipeline = Pipeline(
+		config,
+		asr,
+		translate_fn,
+		barge_in=args.barge_in,
+		on_transcript=on_transcript,
+		on_translation=on_translation,
+		**tts,
+	)
 	print("[green]Streaming... Speak anytime. Press Ctrl+C to stop.[/green]")
 	try:
-		for res in asr.results():
-			if not res.text:
-				continue
-			print(f"[yellow]{(res.language or '')}[/yellow] > {res.text}")
-			translated = translate_text(res.text, config.default_target_lang, config, source_lang=res.language)
-			print(f"[bold magenta]{config.default_target_lang}[/bold magenta] > {translated}")
-			ttsq.enqueue(translated)
+		asyncio.run(pipeline.run())
 	except KeyboardInterrupt:
 		print("\n[red]Stopping...[/red]")
 	finally:
-		asr.stop()
-		ttsq.stop()
+		asr.close()
+	if pipeline.tracer.enabled:
+		print("[bold cyan]Stage latency[/bold cyan]")
+		print(pipeline.tracer.format_summary())
 
 
 if __name__ == "__main__":
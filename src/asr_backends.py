@@ -0,0 +1,305 @@
+"""Speech-recognition engines behind WhisperASR.
+
+An engine turns a model size name into a loaded model and transcribes 16 kHz mono
+float32 audio with it:
+
+	name: str
+	load(size) -> model
+	detect_language(model, audio) -> (code, probability)
+	transcribe(model, audio, language=None) -> ASRResult
+	transcribe_detected(model, audio, choose) -> ASRResult
+	transcribe_segments(model, audio, prompt=None, language=None) -> [(start_s, end_s, text), ...]
+	transcribe_batch(model, [audio, ...], languages=None, choose=None) -> [ASRResult, ...]
+
+A language of None lets the engine detect it; English-only (".en") models always
+decode English.
+
+The model registry caches and leases models per (engine, size), so an engine only
+has to be safe for one model instance per thread. Optional engines import their
+libraries in load(), so they cost nothing unless selected with ASR_ENGINE.
+"""
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import numpy as np
+
+from .config import AppConfig
+
+
+# transcribe()'s thresholds for retrying a greedy decode at a higher temperature
+FALLBACK_COMPRESSION_RATIO = 2.4
+FALLBACK_LOGPROB = -1.0
+
+
+def compression_ratio(text: str) -> float:
+	"""How well `text` compresses; repetition loops score high (as in whisper's own check)."""
+	data = text.encode("utf-8")
+	return len(data) / len(zlib.compress(data)) if data else 0.0
+
+
+@dataclass
+class ASRResult:
+	text: str
+	language: Optional[str]
+	# Incremental decoding sends an utterance as partial results (newly committed words)
+	# followed by one final result with the rest; joined in order they are the utterance
+	is_final: bool = True
+
+
+class OpenAIWhisperBackend:
+	"""The reference openai-whisper PyTorch model, FP32 on CPU."""
+
+	name = "openai"
+	options: dict = {}
+
+	def load(self, size: str):
+		import whisper
+		return whisper.load_model(size)
+
+	def _mel(self, model, audio: np.ndarray):
+		import torch
+		import whisper
+		return whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(audio)), model.dims.n_mels)
+
+	def detect_language(self, model, audio: np.ndarray) -> tuple[str, float]:
+		"""Most likely language of the first 30 s and its probability, from one encoder pass and one decoder step."""
+		if not model.is_multilingual:
+			return "en", 1.0
+		_, probs = model.detect_language(self._mel(model, audio).to(model.device))
+		language = max(probs, key=probs.get)
+		return language, probs[language]
+
+	def transcribe(self, model, audio: np.ndarray, language: Optional[str] = None) -> ASRResult:
+		"""Transcribe in `language`, or in the language whisper detects when None."""
+		if not model.is_multilingual:
+			language = "en"
+		result = model.transcribe(audio, language=language, **self.options)
+		return ASRResult(text=result["text"].strip(), language=result.get("language") or language)
+
+	def transcribe_detected(self, model, audio: np.ndarray, choose: Callable[[str, float], str]) -> ASRResult:
+		"""Detect the language, let `choose` settle it, and transcribe, encoding the segment once.
+
+		Detection and one greedy decode share the encoder output. A decode that
+		transcribe() would retry at a higher temperature, and audio longer than one 30 s
+		window, go through transcribe() instead.
+		"""
+		import torch
+		import whisper
+		if not model.is_multilingual or len(audio) > whisper.audio.N_SAMPLES:
+			return self.transcribe(model, audio, choose(*self.detect_language(model, audio)))
+		fp16 = self.options.get("fp16", model.device.type != "cpu")
+		mel = self._mel(model, audio).to(model.device).unsqueeze(0)
+		with torch.no_grad():
+			features = model.embed_audio(mel.half() if fp16 else mel)
+			_, probs = model.detect_language(features)
+			detected = max(probs[0], key=probs[0].get)
+			language = choose(detected, probs[0][detected])
+			options = whisper.DecodingOptions(language=language, without_timestamps=True, fp16=fp16)
+			decoded = whisper.decode(model, features, options)[0]
+		if decoded.compression_ratio > FALLBACK_COMPRESSION_RATIO or decoded.avg_logprob < FALLBACK_LOGPROB:
+			return self.transcribe(model, audio, language)
+		return ASRResult(text=decoded.text.strip(), language=language)
+
+	def transcribe_segments(
+		self, model, audio: np.ndarray, prompt: Optional[str] = None, language: Optional[str] = None
+	) -> list[tuple[float, float, str]]:
+		if not model.is_multilingual:
+			language = "en"
+		result = model.transcribe(audio, language=language, initial_prompt=prompt, **self.options)
+		return [(s["start"], s["end"], s["text"]) for s in result["segments"]]
+
+	def transcribe_batch(
+		self,
+		model,
+		audios: list[np.ndarray],
+		languages: Optional[list[Optional[str]]] = None,
+		choose: Optional[list[Optional[Callable[[str, float], str]]]] = None,
+	) -> list[ASRResult]:
+		"""One encoder pass and one greedy decoding loop per language over a batch of single-window segments.
+
+		A segment whose language is None is identified on the batch's encoder output and
+		its choose callback, if any, settles the language it is decoded in. Unlike
+		transcribe() there is no temperature fallback, so the text can differ on hard
+		audio; segments longer than one 30 s window are transcribed on their own.
+		"""
+		import torch
+		import whisper
+		languages = list(languages or [None] * len(audios))
+		choose = choose or [None] * len(audios)
+		results: list[Optional[ASRResult]] = [None] * len(audios)
+		batch = []
+		for i, audio in enumerate(audios):
+			if len(audio) <= whisper.audio.N_SAMPLES:
+				batch.append(i)
+				continue
+			if languages[i] is None and choose[i] is not None:
+				languages[i] = choose[i](*self.detect_language(model, audio))
+			results[i] = self.transcribe(model, audio, languages[i])
+		if not batch:
+			return results
+		fp16 = self.options.get("fp16", model.device.type != "cpu")
+		# Every segment is padded to the full window, so the mels stack without masking
+		mel = torch.stack([self._mel(model, audios[i]) for i in batch]).to(model.device)
+		with torch.no_grad():
+			features = model.embed_audio(mel.half() if fp16 else mel)
+		pending = [k for k, i in enumerate(batch) if languages[i] is None]
+		if pending and not model.is_multilingual:
+			for k in pending:
+				languages[batch[k]] = "en"
+		elif pending:
+			_, probs = model.detect_language(features[pending])
+			for k, p in zip(pending, probs):
+				i = batch[k]
+				detected = max(p, key=p.get)
+				languages[i] = choose[i](detected, p[detected]) if choose[i] is not None else detected
+		groups: dict[str, list[int]] = {}
+		for k, i in enumerate(batch):
+			groups.setdefault(languages[i], []).append(k)
+		for language, rows in groups.items():
+			options = whisper.DecodingOptions(language=language, without_timestamps=True, fp16=fp16)
+			for k, decoded in zip(rows, whisper.decode(model, features[rows], options)):
+				results[batch[k]] = ASRResult(text=decoded.text.strip(), language=language)
+		return results
+
+
+class QuantizedWhisperBackend(OpenAIWhisperBackend):
+	"""openai-whisper with its Linear layers dynamically quantized to int8 for CPU."""
+
+	name = "openai-int8"
+	options = {"fp16": False}
+
+	def load(self, size: str):
+		import torch
+		import whisper
+		model = whisper.load_model(size, device="cpu")
+		# whisper's Linear subclass only adds an fp16 cast; quantize_dynamic matches exact types
+		for module in model.modules():
+			if type(module) is whisper.model.Linear:
+				module.__class__ = torch.nn.Linear
+		return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class FasterWhisperBackend:
+	"""CTranslate2 Whisper via faster-whisper, int8 weights by default."""
+
+	name = "faster-whisper"
+
+	def __init__(self, compute_type: str = "int8", cpu_threads: int = 0):
+		self.compute_type = compute_type
+		self.cpu_threads = cpu_threads
+
+	def load(self, size: str):
+		from faster_whisper import WhisperModel
+		return WhisperModel(size, device="cpu", compute_type=self.compute_type, cpu_threads=self.cpu_threads)
+
+	def _encode(self, model, audios: list[np.ndarray]):
+		"""Encoder output for a batch of segments, each padded or cut to one 30 s window."""
+		import ctranslate2
+		extractor = model.feature_extractor
+		n = extractor.n_samples
+		features = np.stack([extractor(np.pad(a[:n], (0, n - len(a[:n]))))[:, : extractor.nb_max_frames] for a in audios])
+		# WhisperModel.encode() adds a batch axis of its own, so the batch goes to the CTranslate2 model directly
+		return model.model.encode(ctranslate2.StorageView.from_array(np.ascontiguousarray(features, dtype=np.float32)))
+
+	def _detect(self, model, encoded) -> list[tuple[str, float]]:
+		# Tokens come back as "<|en|>", best first
+		return [(ranked[0][0][2:-2], ranked[0][1]) for ranked in model.model.detect_language(encoded)]
+
+	def detect_language(self, model, audio: np.ndarray) -> tuple[str, float]:
+		"""Most likely language of the first 30 s and its probability, from one encoder pass and one decoder step."""
+		if not model.model.is_multilingual:
+			return "en", 1.0
+		return self._detect(model, self._encode(model, [audio]))[0]
+
+	def transcribe(self, model, audio: np.ndarray, language: Optional[str] = None) -> ASRResult:
+		"""Transcribe in `language`, or in the language faster-whisper detects when None."""
+		# Greedy, like openai-whisper's transcribe() default, so the outputs are comparable
+		segments, info = model.transcribe(audio, language=language, beam_size=1)
+		return ASRResult(text="".join(s.text for s in segments).strip(), language=info.language)
+
+	def transcribe_detected(self, model, audio: np.ndarray, choose: Callable[[str, float], str]) -> ASRResult:
+		"""Detect the language, let `choose` settle it, and transcribe, encoding the segment once.
+
+		Detection and one greedy generate() share the encoder output. A decode that
+		transcribe() would retry at a higher temperature, and audio longer than one 30 s
+		window, go through transcribe() instead.
+		"""
+		from faster_whisper.tokenizer import Tokenizer
+		if not model.model.is_multilingual or len(audio) > model.feature_extractor.n_samples:
+			return self.transcribe(model, audio, choose(*self.detect_language(model, audio)))
+		encoded = self._encode(model, [audio])
+		language = choose(*self._detect(model, encoded)[0])
+		tokenizer = Tokenizer(model.hf_tokenizer, True, task="transcribe", language=language)
+		prompt = list(tokenizer.sot_sequence) + [tokenizer.no_timestamps]
+		# With the default length penalty the score is the mean token log-probability
+		output = model.model.generate(encoded, [prompt], beam_size=1, suppress_blank=True, suppress_tokens=[-1], return_scores=True)[0]
+		text = tokenizer.decode([t for t in output.sequences_ids[0] if t < tokenizer.eot]).strip()
+		if compression_ratio(text) > FALLBACK_COMPRESSION_RATIO or output.scores[0] < FALLBACK_LOGPROB:
+			return self.transcribe(model, audio, language)
+		return ASRResult(text=text, language=language)
+
+	def transcribe_segments(
+		self, model, audio: np.ndarray, prompt: Optional[str] = None, language: Optional[str] = None
+	) -> list[tuple[float, float, str]]:
+		segments, _ = model.transcribe(audio, language=language, beam_size=1, initial_prompt=prompt)
+		return [(s.start, s.end, s.text) for s in segments]
+
+	def transcribe_batch(
+		self,
+		model,
+		audios: list[np.ndarray],
+		languages: Optional[list[Optional[str]]] = None,
+		choose: Optional[list[Optional[Callable[[str, float], str]]]] = None,
+	) -> list[ASRResult]:
+		"""Encode the whole batch at once and decode it with one generate() call.
+
+		Each segment's prompt carries its own language token, so segments in different
+		languages share the call; None languages are identified on the same encoder output.
+		"""
+		from faster_whisper.tokenizer import Tokenizer
+		languages = list(languages or [None] * len(audios))
+		choose = choose or [None] * len(audios)
+		results: list[Optional[ASRResult]] = [None] * len(audios)
+		n_samples = model.feature_extractor.n_samples
+		batch = []
+		for i, audio in enumerate(audios):
+			if len(audio) <= n_samples:
+				batch.append(i)
+				continue
+			if languages[i] is None and choose[i] is not None:
+				languages[i] = choose[i](*self.detect_language(model, audio))
+			results[i] = self.transcribe(model, audio, languages[i])
+		if not batch:
+			return results
+		multilingual = model.model.is_multilingual
+		encoded = self._encode(model, [audios[i] for i in batch])
+		if any(languages[i] is None for i in batch):
+			detected = self._detect(model, encoded) if multilingual else [("en", 1.0)] * len(batch)
+			for i, (language, prob) in zip(batch, detected):
+				if languages[i] is None:
+					languages[i] = choose[i](language, prob) if choose[i] is not None else language
+		tokenizers = {
+			language: Tokenizer(model.hf_tokenizer, multilingual, task="transcribe", language=language)
+			for language in {languages[i] for i in batch}
+		}
+		prompts = [list(tokenizers[languages[i]].sot_sequence) + [tokenizers[languages[i]].no_timestamps] for i in batch]
+		generated = model.model.generate(encoded, prompts, beam_size=1, suppress_blank=True, suppress_tokens=[-1])
+		for i, output in zip(batch, generated):
+			tokenizer = tokenizers[languages[i]]
+			tokens = [t for t in output.sequences_ids[0] if t < tokenizer.eot]
+			results[i] = ASRResult(text=tokenizer.decode(tokens).strip(), language=languages[i])
+		return results
+
+
+ASR_ENGINES = ("openai", "openai-int8", "faster-whisper")
+
+
+def get_asr_backend(config: AppConfig):
+	if config.asr_engine == "openai":
+		return OpenAIWhisperBackend()
+	if config.asr_engine == "openai-int8":
+		return QuantizedWhisperBackend()
+	if config.asr_engine == "faster-whisper":
+		return FasterWhisperBackend(config.asr_compute_type, config.asr_cpu_threads)
+	raise ValueError(f"Unknown ASR engine: {config.asr_engine} (expected one of {', '.join(ASR_ENGINES)})")
@@ -0,0 +1,149 @@
+"""Batched Whisper inference across callers.
+
+Callers on any thread submit() a segment and get a Future. One collector thread
+waits for a free model replica, takes the first waiting segment, then keeps
+collecting for up to `max_wait_ms` or until `max_batch` segments are waiting, and
+hands the batch to a worker that runs it through the engine's transcribe_batch() as
+one padded mel batch: one encoder pass and one decoding loop for the whole batch
+instead of one per segment. Each result is routed back to the Future of the segment
+it came from. While every replica is busy nothing is collected, so segments that
+arrive meanwhile go into the next full batch rather than being split across workers.
+
+With one caller the wait only adds latency; the gain comes when several streams
+(server sessions, or a backlog in one stream) have segments ready at about the same time.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+import numpy as np
+
+from .asr_backends import ASRResult
+
+
+@dataclass
+class _Request:
+	audio: np.ndarray
+	language: Optional[str] = None
+	choose: Optional[Callable[[str, float], str]] = None
+	future: Future = field(default_factory=Future)
+	submitted_at: float = field(default_factory=time.monotonic)
+
+
+class BatchScheduler:
+	"""Groups segments submitted from many threads into batches on leased model replicas.
+
+	`models` is a ModelPool; up to `workers` batches run at once, each on its own
+	leased replica, all assembled by a single collector thread.
+	"""
+
+	def __init__(self, models, backend, max_batch: int = 8, max_wait_ms: float = 30.0, workers: int = 1):
+		self.models = models
+		self.backend = backend
+		self.max_batch = max(1, max_batch)
+		self.max_wait_s = max(0.0, max_wait_ms) / 1000
+		self._requests: "queue.Queue[Optional[_Request]]" = queue.Queue()
+		self._lock = threading.Lock()
+		# Metrics
+		self.batches = 0
+		self.segments = 0
+		self.largest_batch = 0
+		self.queue_wait_s = 0.0
+		self._workers = max(1, workers)
+		self._idle = threading.Semaphore(self._workers)
+		self._pool = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="asr-batch")
+		self._collector = threading.Thread(target=self._run, name="asr-batch-collect", daemon=True)
+		self._collector.start()
+
+	def submit(self, audio: np.ndarray, language: Optional[str] = None, choose: Optional[Callable[[str, float], str]] = None) -> Future:
+		"""Queue 16 kHz float32 audio for the next batch; the Future resolves to its ASRResult.
+
+		Without a `language` it is detected on the batch's encoder output and `choose`,
+		if given, turns (detected, probability) into the language to decode in.
+		"""
+		request = _Request(audio, language, choose)
+		self._requests.put(request)
+		return request.future
+
+	def transcribe(self, audio: np.ndarray, language: Optional[str] = None, choose: Optional[Callable[[str, float], str]] = None) -> ASRResult:
+		return self.submit(audio, language, choose).result()
+
+	def _collect(self) -> Optional[list[_Request]]:
+		first = self._requests.get()
+		if first is None:
+			return None
+		batch = [first]
+		deadline = time.monotonic() + self.max_wait_s
+		while len(batch) < self.max_batch:
+			remaining = deadline - time.monotonic()
+			try:
+				request = self._requests.get(timeout=remaining) if remaining > 0 else self._requests.get_nowait()
+			except queue.Empty:
+				break
+			if request is None:
+				# Run what was collected, then stop on the next _collect()
+				self._requests.put(None)
+				break
+			batch.append(request)
+		return batch
+
+	def _run(self):
+		while True:
+			# Collect only once a replica is free, so a busy pool lets the next batch fill up
+			self._idle.acquire()
+			batch = self._collect()
+			if batch is None:
+				self._idle.release()
+				return
+			batch = [r for r in batch if r.future.set_running_or_notify_cancel()]
+			if not batch:
+				self._idle.release()
+				continue
+			self._pool.submit(self._run_batch, batch)
+
+	def _run_batch(self, batch: list[_Request]):
+		try:
+			self._transcribe(batch)
+		finally:
+			self._idle.release()
+
+	def _transcribe(self, batch: list[_Request]):
+		started = time.monotonic()
+		try:
+			with self.models.lease(self._workers) as model:
+				results = self.backend.transcribe_batch(
+					model, [r.audio for r in batch], [r.language for r in batch], [r.choose for r in batch]
+				)
+		except BaseException as e:
+			for request in batch:
+				request.future.set_exception(e)
+			return
+		for request, result in zip(batch, results):
+			request.future.set_result(result)
+		with self._lock:
+			self.batches += 1
+			self.segments += len(batch)
+			self.largest_batch = max(self.largest_batch, len(batch))
+			self.queue_wait_s += sum(started - r.submitted_at for r in batch)
+
+	def close(self):
+		"""Finish the batches already queued, then stop the collector and workers."""
+		self._requests.put(None)
+		self._collector.join(timeout=5)
+		self._pool.shutdown(wait=True)
+
+	def stats(self) -> dict:
+		with self._lock:
+			return {
+				"max_batch": self.max_batch,
+				"max_wait_ms": self.max_wait_s * 1000,
+				"batches": self.batches,
+				"segments": self.segments,
+				"mean_batch": round(self.segments / self.batches, 2) if self.batches else None,
+				"largest_batch": self.largest_batch,
+				"mean_queue_wait_ms": round(self.queue_wait_s / self.segments * 1000, 1) if self.segments else None,
+				"waiting": self._requests.qsize(),
+			}
@@ -0,0 +1,133 @@
+"""Incremental Whisper decoding with local agreement.
+
+While an utterance is still being spoken, VADRecorder hands out growing snapshots of
+it. Each snapshot is decoded from the start of the uncommitted window, prompted with
+the text committed before that window, and the words on which the last two hypotheses
+agree are committed and emitted as a partial ASRResult. Whisper segments whose words
+are all committed are trimmed off the window, so each step decodes only the audio
+that is still uncertain rather than the whole utterance.
+"""
+import re
+from typing import Callable, Optional
+
+import numpy as np
+
+from .asr_backends import ASRResult
+
+
+# Whisper's input rate; offsets into the window are counted in these samples
+_SAMPLE_RATE = 16000
+
+
+def _norm(word: str) -> str:
+	return re.sub(r"[^\w']", "", word.lower())
+
+
+class LocalAgreement:
+	"""Commits the longest prefix on which two consecutive hypotheses agree."""
+
+	def __init__(self):
+		self.committed: list[str] = []
+		self._previous: list[str] = []
+
+	def update(self, hypothesis: list[str]) -> list[str]:
+		"""Feed the newest hypothesis for the window; returns the words it newly commits."""
+		n = len(self.committed)
+		new = []
+		for previous, current in zip(self._previous[n:], hypothesis[n:]):
+			if _norm(previous) != _norm(current):
+				break
+			new.append(current)
+		self.committed.extend(new)
+		self._previous = hypothesis
+		return new
+
+	def trim(self, n: int):
+		"""Forget the first `n` committed words once their audio has left the window."""
+		self.committed = self.committed[n:]
+		self._previous = self._previous[n:]
+
+	def reset(self):
+		self.committed = []
+		self._previous = []
+
+
+class IncrementalDecoder:
+	"""Turns utterance snapshots into partial and final ASRResults. Not thread-safe.
+
+	`transcribe_segments(audio, prompt, language)` decodes 16 kHz float32 audio and
+	returns Whisper's (start_s, end_s, text) segments, e.g. a bound
+	backend.transcribe_segments. `detect(audio)`, if given, settles the language of
+	each utterance from its first snapshot; otherwise every utterance is in `language`.
+	"""
+
+	def __init__(
+		self,
+		transcribe_segments: Callable[[np.ndarray, Optional[str], Optional[str]], list[tuple[float, float, str]]],
+		language: Optional[str] = "en",
+		prompt_chars: int = 200,
+		detect: Optional[Callable[[np.ndarray], Optional[str]]] = None,
+	):
+		self._transcribe = transcribe_segments
+		self.language = language
+		self.prompt_chars = prompt_chars
+		self._detect = detect
+		self._utterance_language: Optional[str] = None
+		self._language_settled = False
+		self._agreement = LocalAgreement()
+		self._offset = 0
+		self._context = ""
+		self._emitted = False
+
+	def decode(self, audio: np.ndarray, is_final: bool) -> Optional[ASRResult]:
+		"""Decode the latest snapshot of the current utterance (16 kHz float32 from its start).
+
+		Returns a partial result with newly committed words, the final result for the
+		utterance, or None when nothing new was committed.
+		"""
+		if not self._language_settled:
+			self._utterance_language = self._detect(audio) if self._detect is not None else self.language
+			self._language_settled = True
+		language = self._utterance_language
+		window = audio[self._offset :]
+		segments = self._transcribe(window, self._context[-self.prompt_chars :] or None, language) if len(window) else []
+		words = [w for _, _, text in segments for w in text.split()]
+		if is_final:
+			# Whatever the final decode has past the committed words completes the utterance
+			tail = words[len(self._agreement.committed) :]
+			emitted = self._emitted
+			self._remember(self._agreement.committed + tail)
+			self._agreement.reset()
+			self._offset = 0
+			self._emitted = False
+			self._language_settled = False
+			if not tail and not emitted:
+				return None
+			return ASRResult(text=" ".join(tail), language=language, is_final=True)
+
+		new = self._agreement.update(words)
+		self._trim(segments)
+		if not new:
+			return None
+		self._emitted = True
+		return ASRResult(text=" ".join(new), language=language, is_final=False)
+
+	def _trim(self, segments: list[tuple[float, float, str]]):
+		"""Drop fully committed Whisper segments (never the last, still growing one) from the window."""
+		committed = len(self._agreement.committed)
+		words = 0
+		cut_s, cut_words = None, 0
+		for _, end, text in segments[:-1]:
+			words += len(text.split())
+			if words > committed:
+				break
+			cut_s, cut_words = end, words
+		if cut_s is None or not cut_words:
+			return
+		self._remember(self._agreement.committed[:cut_words])
+		self._agreement.trim(cut_words)
+		self._offset += int(cut_s * _SAMPLE_RATE)
+
+	def _remember(self, words: list[str]):
+		if words:
+			self._context = (self._context + " " + " ".join(words)).strip()[-self.prompt_chars :]
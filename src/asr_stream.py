@@ -1,8 +1,8 @@
-import queue
 import threading
 from dataclasses import dataclass
 from typing import Generator, Optional
 
+from .bounded_queue import BoundedQueue
 from .config import AppConfig
 
 
@@ -17,7 +17,7 @@ class AzureStreamingASR:
 		import azure.cognitiveservices.speech as speechsdk
 		self.speechsdk = speechsdk
 		self.config = config
-		self._q: "queue.Queue[ASRResult]" = queue.Queue()
+		self._q: BoundedQueue[ASRResult] = BoundedQueue(max(1, config.asr_result_queue_size), policy="drop_oldest")
 		self._recognizer = None
 		self._started = False
 		self._thread: Optional[threading.Thread] = None
@@ -71,4 +71,6 @@ class AzureStreamingASR:
 	def results(self) -> Generator[ASRResult, None, None]:
 		while True:
 			res = self._q.get()
+			if res is None:
+				return
 			yield res
@@ -1,114 +1,216 @@
-import queue
 import threading
-import tempfile
-import os
-from dataclasses import dataclass
+import time
+from concurrent.futures import ProcessPoolExecutor
 from typing import Generator, Optional
-import sounddevice as sd
-import soundfile as sf
 import numpy as np
-import whisper
 
+from .asr_backends import ASRResult, OpenAIWhisperBackend, get_asr_backend
+from .asr_batch import BatchScheduler
+from .asr_incremental import IncrementalDecoder
+from .audio import AudioSegment, VADRecorder, pcm16_to_float32
 from .config import AppConfig
+from .language_id import LanguageTracker, resolve_language
+from .model_registry import get_model_registry
 
 
-@dataclass
-class ASRResult:
-	text: str
-	language: Optional[str]
+# openai-whisper expects 16 kHz mono float32 when given an array instead of a path
+WHISPER_SAMPLE_RATE = 16000
+# Longest buffer whisper decodes in a single window; merged backlog never exceeds it
+WHISPER_MAX_SECONDS = 30
 
 
-class WhisperASR:
-	def __init__(self, config: AppConfig):
-		self.config = config
-		self._q: "queue.Queue[ASRResult]" = queue.Queue()
-		self._started = False
-		self._thread: Optional[threading.Thread] = None
-		self._recording = False
-		self._audio_buffer = []
-		
-		# Load Whisper model
-		print(f"Loading Whisper model: {config.whisper_model_size}")
-		self.model = whisper.load_model(config.whisper_model_size)
-		print("Whisper model loaded successfully!")
-
-	def _record_audio(self):
-		"""Record audio in chunks and process when speech ends"""
-		def audio_callback(indata, frames, time, status):
-			if status:
-				print(f"Audio callback status: {status}")
-			if self._recording:
-				self._audio_buffer.append(indata.copy())
-
-		# Start recording
-		self._recording = True
-		stream = sd.InputStream(
-			samplerate=self.config.sample_rate,
-			channels=1,
-			callback=audio_callback,
-			blocksize=int(self.config.sample_rate * 0.1)  # 100ms blocks
-		)
-		
-		stream.start()
-		
-		try:
-			while self._started:
-				# Record for 3 seconds or until silence
-				import time
-				time.sleep(3.0)
-				
-				if self._audio_buffer:
-					# Convert buffer to numpy array
-					audio_data = np.concatenate(self._audio_buffer, axis=0)
-					
-					# Save to temporary file
-					with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_file:
-						sf.write(tmp_file.name, audio_data, self.config.sample_rate)
-						
-						try:
-							# Transcribe with Whisper
-							result = self.model.transcribe(tmp_file.name, language="en")
-							text = result["text"].strip()
-							
-							if text:
-								print(f"Transcribed: {text}")
-								self._q.put(ASRResult(text=text, language="en"))
-						except Exception as e:
-							print(f"Transcription error: {e}")
-						finally:
-							# Clean up temp file
-							os.unlink(tmp_file.name)
-					
-					# Clear buffer
-					self._audio_buffer = []
-					
-		finally:
-			stream.stop()
-			stream.close()
-
-	def _run(self):
-		self._started = True
-		self._record_audio()
-
-	def start(self):
-		if self._thread is not None:
-			return
-		self._thread = threading.Thread(target=self._run, daemon=True)
-		self._thread.start()
-
-	def stop(self):
-		self._started = False
-		self._recording = False
-		if self._thread is not None:
-			self._thread.join(timeout=3)
-			self._thread = None
-
-	def results(self) -> Generator[ASRResult, None, None]:
-		while True:
-			res = self._q.get()
-			yield res
+def to_whisper_audio(audio: np.ndarray, sample_rate: int) -> np.ndarray:
+	"""Return a 1-D float32 16 kHz view of `audio`, copying only when a conversion is needed."""
+	audio = np.asarray(audio, dtype=np.float32)
+	if audio.ndim > 1:
+		audio = audio.reshape(-1) if audio.shape[1] == 1 else audio.mean(axis=1, dtype=np.float32)
+	if sample_rate != WHISPER_SAMPLE_RATE and len(audio):
+		n_out = int(round(len(audio) * WHISPER_SAMPLE_RATE / sample_rate))
+		positions = np.arange(n_out, dtype=np.float64) * (sample_rate / WHISPER_SAMPLE_RATE)
+		audio = np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+	return np.ascontiguousarray(audio)
+
+
+def transcribe_audio(model, audio: np.ndarray, sample_rate: int, backend=None, language: Optional[LanguageTracker] = None) -> ASRResult:
+	"""Transcribe an in-memory float32 buffer without a temp file or ffmpeg.
+
+	With a `language` tracker the segment's language is settled through it (and only
+	detected when it asks, on the encoder output the transcription reuses), otherwise
+	the engine detects it on its own.
+	"""
+	backend = backend or OpenAIWhisperBackend()
+	audio = to_whisper_audio(audio, sample_rate)
+	if language is None:
+		return backend.transcribe(model, audio)
+	hint = language.hint()
+	if hint is None:
+		return backend.transcribe_detected(model, audio, language.choose)
+	return backend.transcribe(model, audio, hint)
+
+
+# Per-process engine and model for ASR_EXECUTOR=process; module level so it pickles under spawn.
+# Each stream's LanguageTracker stays in the parent, which sends each segment's language along.
+_process_backend = None
+_process_model = None
 
 
+def _init_process_worker(config: AppConfig):
+	global _process_backend, _process_model
+	_process_backend = get_asr_backend(config)
+	_process_model = get_model_registry().pool(config.whisper_model_size, _process_backend, warmup=config.whisper_warmup).wait()
 
 
+def _detect_in_process(audio: np.ndarray, sample_rate: int) -> tuple[str, float]:
+	return _process_backend.detect_language(_process_model, to_whisper_audio(audio, sample_rate))
 
+
+def _transcribe_in_process(audio: np.ndarray, sample_rate: int, language: Optional[str]) -> ASRResult:
+	return _process_backend.transcribe(_process_model, to_whisper_audio(audio, sample_rate), language)
+
+
+class WhisperASR:
+	"""Whisper for any number of audio streams, sharing one set of loaded models.
+
+	Each stream (the pipeline's mic, a server session) brings its own language tracker
+	and incremental decoder. transcribe_pooled() is safe to call from several threads:
+	it batches across callers with ASR_BATCH_SIZE above 1, runs in worker processes with
+	ASR_EXECUTOR=process, and otherwise leases one of up to ASR_WORKERS model replicas.
+	"""
+
+	def __init__(self, config: AppConfig):
+		self.config = config
+		self.created_at = time.perf_counter()
+		self.first_inference_s: Optional[float] = None
+		self.first_result_after_s: Optional[float] = None
+
+		# Loads (and warms up) in the background, shared with other instances in this process
+		self.backend = get_asr_backend(config)
+		print(f"Loading Whisper model: {config.whisper_model_size} ({self.backend.name})")
+		self._models = get_model_registry().pool(config.whisper_model_size, self.backend, warmup=config.whisper_warmup)
+		# Spoken language of streams that do not bring their own tracker
+		self.language = self.language_tracker()
+		# Cross-caller batching: segments that arrive within ASR_BATCH_WAIT_MS share one decode
+		self._batcher: Optional[BatchScheduler] = None
+		if config.asr_batch_size > 1:
+			self._batcher = BatchScheduler(
+				self._models, self.backend, config.asr_batch_size, config.asr_batch_wait_ms, workers=max(1, config.asr_workers)
+			)
+		self._processes: Optional[ProcessPoolExecutor] = None
+		self._processes_lock = threading.Lock()
+
+	@property
+	def model(self):
+		"""The shared model, waiting for the background load if it has not finished."""
+		return self._models.wait()
+
+	def transcribe(self, audio: np.ndarray, sample_rate: Optional[int] = None) -> ASRResult:
+		"""Transcribe an in-memory float32 buffer without a temp file or ffmpeg."""
+		return self._transcribe_leased(audio, sample_rate or self.config.sample_rate, 1)
+
+	def transcribe_segment(self, segment: AudioSegment) -> ASRResult:
+		return self.transcribe(pcm16_to_float32(segment.pcm16), segment.sample_rate)
+
+	def transcribe_wav(self, path: str) -> Generator[ASRResult, None, None]:
+		"""Run a recorded file through the same VAD segmentation as the live mic."""
+		recorder = VADRecorder(self.config)
+		for segment in recorder.segments_from_wav(path):
+			result = self.transcribe_segment(segment)
+			if result.text:
+				yield result
+
+	def _transcribe_leased(
+		self, audio: np.ndarray, sample_rate: int, max_replicas: int, language: Optional[LanguageTracker] = None
+	) -> ASRResult:
+		# A replica is used by one thread at a time: whisper's kv-cache hooks are per module
+		with self._models.lease(max_replicas) as model:
+			t0 = time.perf_counter()
+			result = transcribe_audio(model, audio, sample_rate, self.backend, language or self.language)
+		if self.first_inference_s is None:
+			self.first_inference_s = time.perf_counter() - t0
+			self.first_result_after_s = time.perf_counter() - self.created_at
+			print(f"First utterance: inference {self.first_inference_s * 1000:.0f} ms, {self.first_result_after_s:.2f} s after startup")
+		return result
+
+	def _process_pool(self) -> ProcessPoolExecutor:
+		with self._processes_lock:
+			if self._processes is None:
+				self._processes = ProcessPoolExecutor(
+					max_workers=max(1, self.config.asr_workers),
+					initializer=_init_process_worker,
+					initargs=(self.config,),
+				)
+			return self._processes
+
+	def _transcribe_in_process(self, audio: np.ndarray, sample_rate: int, tracker: LanguageTracker) -> ASRResult:
+		"""Transcribe in a worker process, settling the language here with the stream's tracker.
+
+		A segment the tracker wants detected is detected by a worker first and waited on,
+		which encodes it a second time in the transcribing call.
+		"""
+		pool = self._process_pool()
+		language = tracker.hint()
+		if language is None:
+			language = tracker.choose(*pool.submit(_detect_in_process, audio, sample_rate).result())
+		return pool.submit(_transcribe_in_process, audio, sample_rate, language).result()
+
+	def transcribe_pooled(self, audio: np.ndarray, sample_rate: int, language: Optional[LanguageTracker] = None) -> ASRResult:
+		"""Like transcribe(), but safe to call from several threads at once; batched across callers when enabled.
+
+		Streams pass their own `language` tracker; without one the instance's is used.
+		"""
+		tracker = language or self.language
+		if self._batcher is not None:
+			hint = tracker.hint()
+			return self._batcher.transcribe(to_whisper_audio(audio, sample_rate), hint, None if hint else tracker.choose)
+		if self.config.asr_executor == "process":
+			return self._transcribe_in_process(audio, sample_rate, tracker)
+		return self._transcribe_leased(audio, sample_rate, max(1, self.config.asr_workers), tracker)
+
+	def batch_stats(self) -> Optional[dict]:
+		return self._batcher.stats() if self._batcher is not None else None
+
+	def _transcribe_window(self, audio: np.ndarray, prompt: Optional[str], language: Optional[str]) -> list[tuple[float, float, str]]:
+		with self._models.lease(max(1, self.config.asr_workers)) as model:
+			return self.backend.transcribe_segments(model, audio, prompt, language)
+
+	def _settle_language(self, audio: np.ndarray, tracker: LanguageTracker) -> Optional[str]:
+		with self._models.lease(max(1, self.config.asr_workers)) as model:
+			return resolve_language(self.backend, model, audio, tracker)
+
+	def language_tracker(self) -> LanguageTracker:
+		"""A fresh spoken-language tracker for one audio stream (speaker or session)."""
+		return LanguageTracker.from_config(self.config)
+
+	def incremental_decoder(self, language: Optional[LanguageTracker] = None) -> IncrementalDecoder:
+		"""A fresh decoder for one audio stream, sharing this instance's models."""
+		tracker = language or self.language
+		return IncrementalDecoder(self._transcribe_window, detect=lambda audio: self._settle_language(audio, tracker))
+
+	def decode_incremental(self, segment: AudioSegment, decoder: IncrementalDecoder) -> Optional[ASRResult]:
+		"""Feed one utterance snapshot (or its final segment) to a stream's incremental decoder.
+
+		Snapshots of one stream must arrive in order from a single thread. Returns the
+		newly committed words as a partial result, the rest of the utterance as the final
+		result, or None.
+		"""
+		audio = to_whisper_audio(pcm16_to_float32(segment.pcm16), segment.sample_rate)
+		return decoder.decode(audio, segment.is_final)
+
+	def startup_stats(self) -> dict:
+		return {
+			"engine": self.backend.name,
+			"model": self.config.whisper_model_size,
+			"load_s": self._models.load_s,
+			"warmup_s": self._models.warmup_s,
+			"first_inference_s": self.first_inference_s,
+			"first_result_after_s": self.first_result_after_s,
+		}
+
+	def close(self):
+		"""Stop the batch scheduler and worker processes; the shared models stay loaded and batch_stats() stays readable."""
+		if self._batcher is not None:
+			self._batcher.close()
+		with self._processes_lock:
+			if self._processes is not None:
+				self._processes.shutdown(wait=False, cancel_futures=True)
+				self._processes = None
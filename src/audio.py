@@ -1,13 +1,14 @@
-import queue
-import sys
-import time
+from collections import deque
 from dataclasses import dataclass
-from typing import Generator, Optional
+from typing import Callable, Generator, Iterable, Optional
 
 import numpy as np
 import sounddevice as sd
+import soundfile as sf
 import webrtcvad
 
+from .bounded_queue import BoundedQueue
+from .capture import CaptureRing
 from .config import AppConfig
 
 
@@ -16,6 +17,8 @@ class AudioSegment:
 	pcm16: bytes
 	sample_rate: int
 	duration_ms: int
+	# False for an in-progress snapshot of an utterance that is still being spoken
+	is_final: bool = True
 
 
 def float_to_int16_pcm(audio_float: np.ndarray) -> bytes:
@@ -24,28 +27,46 @@ def float_to_int16_pcm(audio_float: np.ndarray) -> bytes:
 	return pcm.tobytes()
 
 
+def pcm16_to_float32(pcm16: bytes) -> np.ndarray:
+	return np.frombuffer(pcm16, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def read_wav_pcm16(path: str, sample_rate: int) -> bytes:
+	"""Load an audio file as mono 16-bit PCM at `sample_rate`."""
+	data, file_rate = sf.read(path, dtype="float32", always_2d=True)
+	mono = data.mean(axis=1) if data.shape[1] > 1 else data[:, 0]
+	if file_rate != sample_rate and len(mono):
+		n_out = int(round(len(mono) * sample_rate / file_rate))
+		positions = np.arange(n_out, dtype=np.float64) * (file_rate / sample_rate)
+		mono = np.interp(positions, np.arange(len(mono)), mono)
+	return float_to_int16_pcm(mono)
+
+
 class VADRecorder:
-	def __init__(self, config: AppConfig):
+	def __init__(self, config: AppConfig, hangover_ms: Optional[int] = None, on_speech_start: Optional[Callable[[], None]] = None):
 		self.config = config
 		self.vad = webrtcvad.Vad(self.config.aggressiveness)
 		self.sample_rate = self.config.sample_rate
 		self.frame_ms = self.config.frame_ms
 		self.frame_bytes = int(self.sample_rate * self.frame_ms / 1000) * 2  # 16-bit mono
-		self._q: queue.Queue[bytes] = queue.Queue()
+		self.hangover_ms = hangover_ms if hangover_ms is not None else self.config.vad_hangover_ms
+		# Called once per utterance after vad_barge_in_ms of voiced audio (e.g. to interrupt TTS)
+		self.on_speech_start = on_speech_start
+		# Audio pushed through feed(), bounded like the capture ring (in chunks of about one frame)
+		self._q: BoundedQueue[bytes] = BoundedQueue(max(1, self.config.capture_ring_ms // self.frame_ms))
 		self._stream: Optional[sd.InputStream] = None
-
-	def _callback(self, indata, frames, time_info, status):
-		if status:
-			print(f"[audio] {status}", file=sys.stderr)
-		pcm_bytes = float_to_int16_pcm(indata[:, 0])
-		self._q.put(pcm_bytes)
+		self._ring: Optional[CaptureRing] = None
+		# Utterances cut at max_segment_ms while the speaker was still talking
+		self.forced_splits = 0
 
 	def start(self):
+		# The microphone writes into a preallocated ring from the audio thread; feed() still uses the queue
+		self._ring = CaptureRing.for_config(self.config)
 		self._stream = sd.InputStream(
 			channels=1,
 			samplerate=self.sample_rate,
-			dtype="float32",
-			callback=self._callback,
+			dtype="int16",
+			callback=self._ring.callback,
 		)
 		self._stream.start()
 
@@ -54,47 +75,192 @@ class VADRecorder:
 			self._stream.stop()
 			self._stream.close()
 			self._stream = None
+		# Wake up segments() so it can return instead of blocking forever
+		if self._ring is not None:
+			self._ring.close()
+		self._q.close()
+
+	def feed(self, pcm16: bytes, block: bool = True) -> bool:
+		"""Push 16-bit mono PCM from a source other than the microphone.
+
+		When the queue is full this waits for room, or with block=False returns False at once.
+		"""
+		return self._q.put(pcm16, None if block else 0)
+
+	def segments(self, partial_ms: Optional[int] = None) -> Generator[AudioSegment, None, None]:
+		"""Yield speech segments from the microphone (or feed()) until stop() is called."""
+		chunks = self._ring.chunks() if self._ring is not None else iter(self._q.get, None)
+		return self.segment_stream(chunks, partial_ms)
+
+	def capture_stats(self) -> dict:
+		"""Forced splits, plus ring fill and overflow counts from the microphone or the feed() queue's."""
+		stats = self._ring.stats() if self._ring is not None else {"feed": self._q.stats()}
+		stats["forced_splits"] = self.forced_splits
+		return stats
+
+	def segments_from_wav(self, path: str, chunk_ms: int = 100, partial_ms: Optional[int] = None) -> Generator[AudioSegment, None, None]:
+		"""Yield speech segments from a recorded file, e.g. a test fixture."""
+		pcm = read_wav_pcm16(path, self.sample_rate)
+		step = int(self.sample_rate * chunk_ms / 1000) * 2
+		return self.segment_stream((pcm[i : i + step] for i in range(0, len(pcm), step)), partial_ms)
+
+	def _segment(self, speech_bytes, is_final: bool = True) -> AudioSegment:
+		dur_ms = int((len(speech_bytes) / 2) / self.sample_rate * 1000)
+		return AudioSegment(pcm16=bytes(speech_bytes), sample_rate=self.sample_rate, duration_ms=dur_ms, is_final=is_final)
 
-	def segments(self) -> Generator[AudioSegment, None, None]:
-		"""Yield speech segments using VAD with padding and max duration."""
-		ring = bytearray()
+	def _quietest_cut(self, speech: memoryview, length: int, search_frames: int) -> int:
+		"""Byte offset just after the lowest-energy frame among the last `search_frames` of speech."""
+		frame_bytes = self.frame_bytes
+		n = min(search_frames, length // frame_bytes - 1)
+		if n < 1:
+			return length
+		start = length - n * frame_bytes
+		frames = np.frombuffer(speech[start:length], dtype=np.int16).reshape(n, -1).astype(np.float32)
+		energy = np.einsum("ij,ij->i", frames, frames)
+		return start + (int(np.argmin(energy)) + 1) * frame_bytes
+
+	def segment_stream(self, chunks: Iterable[bytes], partial_ms: Optional[int] = None) -> Generator[AudioSegment, None, None]:
+		"""Yield speech segments using VAD with padding, end-of-speech hangover and max duration.
+
+		With `partial_ms`, an utterance in progress is also yielded every `partial_ms` of
+		speech as a snapshot from its start (is_final=False), before the final segment.
+
+		A speaker who never pauses is split at max_segment_ms, at the quietest frame of
+		the last vad_split_search_ms; the audio after the cut starts the next segment.
+
+		Constant work per 20 ms frame: frames are views into the input (see _FrameRing),
+		the voiced-frame window keeps a running count and speech accumulates into a
+		preallocated bytearray, so nothing in the loop grows or shifts with the chunk
+		size or history.
+		"""
+		frame_bytes = self.frame_bytes
+		frames = _FrameRing(frame_bytes)
 		triggered = False
-		speech_bytes = bytearray()
 		padding_frames = int(self.config.padding_ms / self.frame_ms)
-		padding_ring: list[bool] = []
-		start_time: Optional[float] = None
+		hangover_frames = max(1, int(self.hangover_ms / self.frame_ms))
+		# Sliding window of the last frames' VAD decisions, with a running count of voiced ones
+		window = padding_frames
+		flags: deque[bool] = deque()
+		voiced = 0
+		barge_in_frames = max(1, int(self.config.vad_barge_in_ms / self.frame_ms))
+		voiced_in_segment = 0
+		announced = False
 		max_bytes = int(self.sample_rate * self.config.max_segment_ms / 1000) * 2
+		# Round up to whole frames: the last frame may overshoot max_bytes
+		speech = bytearray(-(-max_bytes // frame_bytes) * frame_bytes)
+		speech_view = memoryview(speech)
+		speech_len = 0
+		partial_bytes = int(self.sample_rate * partial_ms / 1000) * 2 if partial_ms else 0
+		split_frames = max(1, int(self.config.vad_split_search_ms / self.frame_ms))
+		next_partial = partial_bytes
+		vad_is_speech = self.vad.is_speech
+		sample_rate = self.sample_rate
 
-		while True:
-			chunk = self._q.get()
-			ring.extend(chunk)
-			while len(ring) >= self.frame_bytes:
-				frame = bytes(ring[: self.frame_bytes])
-				ring = ring[self.frame_bytes :]
+		for chunk in chunks:
+			# Frames are views (see _FrameRing): the VAD and the speech buffer read them without a copy
+			for frame in frames.push(chunk):
 				is_speech = False
 				try:
-					is_speech = self.vad.is_speech(frame, self.sample_rate)
+					is_speech = vad_is_speech(frame, sample_rate)
 				except Exception:
 					is_speech = False
 
 				if not triggered:
-					padding_ring.append(is_speech)
-					if len(padding_ring) > padding_frames:
-						padding_ring.pop(0)
-					if sum(padding_ring) > 0.9 * len(padding_ring):
+					flags.append(is_speech)
+					voiced += is_speech
+					if len(flags) > window:
+						voiced -= flags.popleft()
+					if voiced > 0.9 * len(flags):
 						triggered = True
-						start_time = time.time()
-						speech_bytes.extend(frame)
+						speech_view[:frame_bytes] = frame
+						speech_len = frame_bytes
+						next_partial = partial_bytes
+						voiced_in_segment = 1
+						announced = False
+						# From here on the window tracks the end-of-speech hangover
+						window = hangover_frames
+						while len(flags) > window:
+							voiced -= flags.popleft()
 				else:
-					speech_bytes.extend(frame)
-					too_long = len(speech_bytes) >= max_bytes
-					end_condition = not is_speech and sum(padding_ring) < 0.1 * len(padding_ring)
-					padding_ring.append(is_speech)
-					if len(padding_ring) > padding_frames:
-						padding_ring.pop(0)
-					if too_long or end_condition:
-						dur_ms = int((len(speech_bytes) / 2) / self.sample_rate * 1000)
-						yield AudioSegment(pcm16=bytes(speech_bytes), sample_rate=self.sample_rate, duration_ms=dur_ms)
+					speech_view[speech_len : speech_len + frame_bytes] = frame
+					speech_len += frame_bytes
+					voiced_in_segment += is_speech
+					if not announced and voiced_in_segment >= barge_in_frames and self.on_speech_start is not None:
+						announced = True
+						self.on_speech_start()
+					too_long = speech_len >= max_bytes
+					end_condition = not is_speech and voiced < 0.1 * len(flags)
+					flags.append(is_speech)
+					voiced += is_speech
+					if len(flags) > window:
+						voiced -= flags.popleft()
+					if end_condition:
+						yield self._segment(speech_view[:speech_len])
 						triggered = False
-						speech_bytes.clear()
-						padding_ring.clear()
+						speech_len = 0
+						flags.clear()
+						voiced = 0
+						window = padding_frames
+					elif too_long:
+						cut = self._quietest_cut(speech_view, speech_len, split_frames)
+						yield self._segment(speech_view[:cut])
+						self.forced_splits += 1
+						# Still triggered: the rest belongs to the next segment of the same turn
+						speech_len -= cut
+						speech_view[:speech_len] = speech_view[cut : cut + speech_len]
+						next_partial = partial_bytes
+					elif partial_bytes and speech_len >= next_partial:
+						yield self._segment(speech_view[:speech_len], is_final=False)
+						next_partial = speech_len + partial_bytes
+
+		# Input ended mid-utterance (end of file or stop()): flush what we have
+		if triggered and speech_len:
+			yield self._segment(speech_view[:speech_len])
+
+
+class _FrameRing:
+	"""Splits pushed chunks into whole frames without copying or allocating per frame.
+
+	A frame that lies whole within a chunk is handed out as a view into the chunk. Only
+	a frame straddling two chunks is copied, into one of two preallocated frame buffers
+	used in turn, so the frame just completed is never overwritten by the next partial
+	one. The views are only valid until the next push().
+	"""
+
+	def __init__(self, frame_bytes: int):
+		self.frame_bytes = frame_bytes
+		self._bufs = (memoryview(bytearray(frame_bytes)), memoryview(bytearray(frame_bytes)))
+		# The buffer holding the partial frame, and how many of its bytes are filled
+		self._cur = 0
+		self._size = 0
+
+	def push(self, chunk: bytes) -> list[memoryview]:
+		src = memoryview(chunk)
+		if src.itemsize != 1:
+			src = src.cast("B")
+		n = len(src)
+		frame_bytes = self.frame_bytes
+		size = self._size
+		if not size:
+			if n == frame_bytes:
+				return [src]
+			frames = []
+			offset = 0
+		else:
+			# Complete the partial frame first
+			offset = frame_bytes - size
+			buf = self._bufs[self._cur]
+			if n < offset:
+				buf[size : size + n] = src
+				self._size = size + n
+				return []
+			buf[size:] = src[:offset]
+			frames = [buf]
+			self._cur ^= 1
+		while offset + frame_bytes <= n:
+			frames.append(src[offset : offset + frame_bytes])
+			offset += frame_bytes
+		self._size = n - offset
+		if self._size:
+			self._bufs[self._cur][: self._size] = src[offset:]
+		return frames
@@ -0,0 +1,165 @@
+"""On-disk journal of raw speech audio, for reprocessing what a live session dropped.
+
+Segments are appended as records to memory-mapped files of `file_bytes` each under
+one directory; when a file is full the next one is started, and the oldest files are
+deleted once the directory holds more than `budget_bytes`. Every megabyte or so the
+written pages are flushed and released, so journaling a whole shift keeps neither the
+audio nor the dirty pages in the process's memory.
+
+Record: magic, sample rate, Unix time, byte count, then 16-bit mono PCM. A file ends
+at the first position without the magic (new files are zero-filled).
+"""
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Generator, Optional
+
+from .config import AppConfig
+
+
+JOURNAL_MAGIC = b"VTJ1"
+_RECORD = struct.Struct("<4sIdI")
+_SUFFIX = ".vtj"
+# Dirty bytes written between flushes
+_RELEASE_BYTES = 1 << 20
+
+
+def journal_files(directory: str) -> list[str]:
+	"""Journal files under `directory`, oldest first."""
+	if not os.path.isdir(directory):
+		return []
+	return sorted(os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(_SUFFIX))
+
+
+class AudioJournal:
+	"""Append-only, size-bounded segment journal; safe to share between threads and sessions."""
+
+	def __init__(self, directory: str, budget_bytes: int, file_bytes: int = 16 << 20):
+		os.makedirs(directory, exist_ok=True)
+		self.directory = directory
+		self.budget_bytes = budget_bytes
+		self.file_bytes = file_bytes
+		# Files from earlier runs count against the budget too
+		self._files = [(path, os.path.getsize(path)) for path in journal_files(directory)]
+		self._next = len(self._files)
+		self._mm: Optional[mmap.mmap] = None
+		self._offset = 0
+		self._released = 0
+		self._lock = threading.Lock()
+		# Metrics
+		self.records = 0
+		self.bytes_written = 0
+		self.files_removed = 0
+
+	def append(self, pcm16: bytes, sample_rate: int, at: Optional[float] = None):
+		size = _RECORD.size + len(pcm16)
+		with self._lock:
+			if self._mm is None or self._offset + size > len(self._mm):
+				self._rotate(size)
+			_RECORD.pack_into(self._mm, self._offset, JOURNAL_MAGIC, sample_rate, at or time.time(), len(pcm16))
+			start = self._offset + _RECORD.size
+			self._mm[start : start + len(pcm16)] = pcm16
+			self._offset = start + len(pcm16)
+			self.records += 1
+			self.bytes_written += size
+			if self._offset - self._released >= _RELEASE_BYTES:
+				self._release()
+
+	def _release(self):
+		"""Write dirty pages back to the file and drop them from this process's resident set."""
+		self._mm.flush()
+		if hasattr(self._mm, "madvise"):  # not on Windows
+			start = self._released - self._released % mmap.PAGESIZE
+			self._mm.madvise(mmap.MADV_DONTNEED, start, self._offset - start)
+		self._released = self._offset
+
+	def _rotate(self, min_bytes: int):
+		self._close_file()
+		size = max(self.file_bytes, min_bytes)
+		path = os.path.join(self.directory, f"journal-{time.strftime('%Y%m%d-%H%M%S')}-{self._next:06d}{_SUFFIX}")
+		self._next += 1
+		with open(path, "w+b") as f:
+			f.truncate(size)
+			self._mm = mmap.mmap(f.fileno(), size)
+		self._offset = 0
+		self._released = 0
+		self._files.append((path, size))
+		while len(self._files) > 1 and sum(s for _, s in self._files) > self.budget_bytes:
+			old, _ = self._files.pop(0)
+			try:
+				os.remove(old)
+			except OSError:
+				pass
+			self.files_removed += 1
+
+	def _close_file(self):
+		if self._mm is not None:
+			self._mm.flush()
+			self._mm.close()
+			self._mm = None
+
+	def close(self):
+		with self._lock:
+			self._close_file()
+
+	def stats(self) -> dict:
+		with self._lock:
+			return {
+				"directory": self.directory,
+				"records": self.records,
+				"bytes_written": self.bytes_written,
+				"files": len(self._files),
+				"bytes_on_disk": sum(s for _, s in self._files),
+				"budget_bytes": self.budget_bytes,
+				"files_removed": self.files_removed,
+			}
+
+
+def read_journal(directory: str) -> Generator[tuple[float, int, bytes], None, None]:
+	"""Yield (unix_time, sample_rate, pcm16) for every record, oldest first."""
+	for path in journal_files(directory):
+		with open(path, "rb") as f:
+			if os.fstat(f.fileno()).st_size == 0:
+				continue
+			with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+				offset = 0
+				while offset + _RECORD.size <= len(mm):
+					magic, sample_rate, at, n = _RECORD.unpack_from(mm, offset)
+					start = offset + _RECORD.size
+					if magic != JOURNAL_MAGIC or start + n > len(mm):
+						break
+					yield at, sample_rate, mm[start : start + n]
+					offset = start + n
+
+
+def export_journal(directory: str, out_dir: str) -> int:
+	"""Write every journaled segment as a WAV file under `out_dir` (ready for --batch); returns the count."""
+	import numpy as np
+	import soundfile as sf
+
+	os.makedirs(out_dir, exist_ok=True)
+	count = 0
+	for at, sample_rate, pcm16 in read_journal(directory):
+		stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(at))
+		path = os.path.join(out_dir, f"segment-{stamp}-{count:06d}.wav")
+		sf.write(path, np.frombuffer(pcm16, dtype=np.int16), sample_rate, subtype="PCM_16")
+		count += 1
+	return count
+
+
+_journals: dict[str, AudioJournal] = {}
+_journals_lock = threading.Lock()
+
+
+def get_audio_journal(config: AppConfig) -> Optional[AudioJournal]:
+	"""The process-wide journal for AUDIO_JOURNAL_DIR, or None when journaling is off."""
+	if not config.audio_journal_dir:
+		return None
+	with _journals_lock:
+		journal = _journals.get(config.audio_journal_dir)
+		if journal is None:
+			journal = AudioJournal(config.audio_journal_dir, int(config.audio_journal_mb * 1024 * 1024))
+			_journals[config.audio_journal_dir] = journal
+		return journal
@@ -0,0 +1,173 @@
+"""Offline translation of a directory of recorded audio, spread across CPU cores."""
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import soundfile as sf
+
+from .audio import VADRecorder, pcm16_to_float32
+from .config import AppConfig
+from .language_id import LanguageTracker
+
+
+AUDIO_EXTENSIONS = {".wav", ".flac", ".ogg", ".mp3"}
+
+
+@dataclass
+class FileReport:
+	path: str
+	audio_seconds: float
+	processing_seconds: float
+	segments: int
+	error: Optional[str] = None
+
+	@property
+	def rtf(self) -> float:
+		return self.processing_seconds / self.audio_seconds if self.audio_seconds else 0.0
+
+
+@dataclass
+class BatchReport:
+	files: list[FileReport]
+	wall_seconds: float
+
+	@property
+	def audio_seconds(self) -> float:
+		return sum(f.audio_seconds for f in self.files)
+
+	@property
+	def rtf(self) -> float:
+		"""Wall-clock seconds spent per second of audio, across all workers."""
+		return self.wall_seconds / self.audio_seconds if self.audio_seconds else 0.0
+
+	@property
+	def files_per_hour(self) -> float:
+		return len(self.files) / self.wall_seconds * 3600 if self.wall_seconds else 0.0
+
+
+# Per-process state, set up once by _init_worker
+_worker: dict = {}
+
+
+def _init_worker(config: AppConfig, threads_per_worker: int, offline: bool, tts: str, tts_options: dict):
+	from .asr_backends import get_asr_backend
+	if config.asr_engine == "faster-whisper":
+		# CTranslate2 ignores torch's thread setting; give it the share directly
+		config = replace(config, asr_cpu_threads=threads_per_worker)
+	else:
+		import torch
+		torch.set_num_threads(threads_per_worker)
+	_worker["config"] = config
+	_worker["backend"] = get_asr_backend(config)
+	_worker["model"] = _worker["backend"].load(config.whisper_model_size)
+	_worker["offline"] = offline
+	_worker["tts"] = tts
+	_worker["tts_options"] = tts_options
+
+
+def _translate(text: str, source_lang: Optional[str]) -> str:
+	config = _worker["config"]
+	if _worker["offline"]:
+		from .local_backends import local_translate
+		return local_translate(text, config.default_target_lang, source_lang)
+	from .translate import translate_text
+	return translate_text(text, config.default_target_lang, config, source_lang=source_lang)
+
+
+def _synthesize(text: str) -> Optional[tuple[np.ndarray, int]]:
+	"""Synthesized speech for `text` as (float32 samples, sample rate), or None without TTS."""
+	tts = _worker["tts"]
+	if tts == "local":
+		from .local_backends import local_tts
+		segment = local_tts(text)
+		return pcm16_to_float32(segment.pcm16), segment.sample_rate
+	if tts == "elevenlabs":
+		from .tts_elevenlabs import synthesize_elevenlabs as synthesize
+	elif tts == "azure":
+		from .tts_azure import synthesize_azure as synthesize
+	else:
+		return None
+	encoded = synthesize(text, _worker["config"], **_worker["tts_options"])
+	data, sample_rate = sf.read(io.BytesIO(encoded), dtype="float32", always_2d=True)
+	return data.mean(axis=1), sample_rate
+
+
+def _process_file(path: str, input_dir: str, output_dir: str) -> FileReport:
+	from .asr_whisper import transcribe_audio
+	config: AppConfig = _worker["config"]
+	t0 = time.perf_counter()
+	audio_seconds = 0.0
+	# Mirror the input tree and keep the suffix, so a/call.wav, b/call.wav and call.mp3 do not collide
+	stem = Path(output_dir) / Path(path).relative_to(input_dir)
+	transcript, translation, speech = [], [], []
+	# One speaker per file: detect the language once and keep it unless the speech clearly changes
+	language = LanguageTracker.from_config(config)
+	try:
+		audio_seconds = sf.info(path).duration
+		stem.parent.mkdir(parents=True, exist_ok=True)
+		for segment in VADRecorder(config).segments_from_wav(path):
+			result = transcribe_audio(_worker["model"], pcm16_to_float32(segment.pcm16), segment.sample_rate, _worker["backend"], language)
+			if not result.text:
+				continue
+			translated = _translate(result.text, result.language)
+			transcript.append(result.text)
+			translation.append(translated)
+			audio = _synthesize(translated)
+			if audio is not None:
+				speech.append(audio)
+		Path(f"{stem}.transcript.txt").write_text("\n".join(transcript) + "\n", encoding="utf-8")
+		Path(f"{stem}.{config.default_target_lang}.txt").write_text("\n".join(translation) + "\n", encoding="utf-8")
+		if speech:
+			sample_rate = speech[0][1]
+			sf.write(f"{stem}.{config.default_target_lang}.wav", np.concatenate([a for a, _ in speech]), sample_rate, subtype="PCM_16")
+		error = None
+	except Exception as e:
+		error = str(e)
+	return FileReport(path, audio_seconds, time.perf_counter() - t0, len(transcript), error)
+
+
+def find_audio_files(input_dir: str) -> list[str]:
+	return sorted(str(p) for p in Path(input_dir).rglob("*") if p.suffix.lower() in AUDIO_EXTENSIONS)
+
+
+def translate_directory(
+	input_dir: str,
+	output_dir: str,
+	config: AppConfig,
+	workers: Optional[int] = None,
+	offline: bool = False,
+	tts: str = "none",
+	tts_options: Optional[dict] = None,
+) -> BatchReport:
+	"""Run every audio file under `input_dir` through VAD -> Whisper -> translate -> optional TTS.
+
+	`tts` is "none", "local" (offline stand-in), "elevenlabs" or "azure".
+
+	Each worker process loads its own model once and gets an even share of the
+	cores for its ASR engine, so workers do not oversubscribe the CPU.
+	"""
+	files = find_audio_files(input_dir)
+	os.makedirs(output_dir, exist_ok=True)
+	cores = os.cpu_count() or 1
+	workers = max(1, min(workers or cores, len(files) or 1))
+	threads_per_worker = max(1, cores // workers)
+
+	reports = []
+	t0 = time.perf_counter()
+	with ProcessPoolExecutor(
+		max_workers=workers,
+		initializer=_init_worker,
+		initargs=(config, threads_per_worker, offline, tts, tts_options or {}),
+	) as pool:
+		futures = [pool.submit(_process_file, path, input_dir, output_dir) for path in files]
+		for future in as_completed(futures):
+			report = future.result()
+			status = f"error: {report.error}" if report.error else f"{report.segments} segments, rtf={report.rtf:.2f}"
+			print(f"{report.path}: {status}")
+			reports.append(report)
+	return BatchReport(files=sorted(reports, key=lambda r: r.path), wall_seconds=time.perf_counter() - t0)
@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Generic, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+BACKPRESSURE_POLICIES = ("block", "drop_oldest", "merge")
+
+
+class BoundedQueue(Generic[T]):
+	"""Thread-safe FIFO with a hard capacity and an explicit policy for when it is full.
+
+	- block: put() waits until a consumer makes room (lossless, stalls the producer)
+	- drop_oldest: the head item is evicted to make room for the new one
+	- merge: the new item is folded into the newest queued item with merge_fn;
+	  if merge_fn returns None the queue falls back to drop_oldest
+
+	get() returns None once close() has been called and the queue is drained.
+	`on_drop(item)`, if given, is called (outside the lock) with each evicted item, e.g.
+	to spill it to disk instead of losing it.
+	"""
+
+	def __init__(
+		self,
+		maxsize: int,
+		policy: str = "block",
+		merge_fn: Optional[Callable[[T, T], Optional[T]]] = None,
+		on_drop: Optional[Callable[[T], None]] = None,
+	):
+		if maxsize < 1:
+			raise ValueError("maxsize must be >= 1")
+		if policy not in BACKPRESSURE_POLICIES:
+			raise ValueError(f"Unknown backpressure policy: {policy}")
+		if policy == "merge" and merge_fn is None:
+			raise ValueError("merge policy requires merge_fn")
+		self.maxsize = maxsize
+		self.policy = policy
+		self._merge = merge_fn
+		self._on_drop = on_drop
+		self._items: Deque[T] = deque()
+		self._cond = threading.Condition()
+		self._closed = False
+		self.dropped = 0
+		self.merged = 0
+		self.high_water = 0
+
+	def __len__(self) -> int:
+		return len(self._items)
+
+	@property
+	def closed(self) -> bool:
+		return self._closed
+
+	def put(self, item: T, timeout: Optional[float] = None) -> bool:
+		"""Enqueue `item`; returns False if it was not accepted (closed, or block timed out)."""
+		evicted = None
+		with self._cond:
+			if self._closed:
+				return False
+			if len(self._items) >= self.maxsize:
+				if self.policy == "block":
+					deadline = None if timeout is None else time.monotonic() + timeout
+					while len(self._items) >= self.maxsize and not self._closed:
+						remaining = None if deadline is None else deadline - time.monotonic()
+						if remaining is not None and remaining <= 0:
+							return False
+						self._cond.wait(remaining)
+					if self._closed:
+						return False
+				else:
+					combined = self._merge(self._items[-1], item) if self.policy == "merge" else None
+					if combined is not None:
+						self._items[-1] = combined
+						self.merged += 1
+						self._cond.notify_all()
+						return True
+					evicted = self._items.popleft()
+					self.dropped += 1
+			self._items.append(item)
+			self.high_water = max(self.high_water, len(self._items))
+			self._cond.notify_all()
+		if evicted is not None and self._on_drop is not None:
+			self._on_drop(evicted)
+		return True
+
+	def get(self, timeout: Optional[float] = None) -> Optional[T]:
+		"""Dequeue the oldest item, waiting up to `timeout`; None on timeout or once closed and empty."""
+		with self._cond:
+			deadline = None if timeout is None else time.monotonic() + timeout
+			while not self._items:
+				if self._closed:
+					return None
+				remaining = None if deadline is None else deadline - time.monotonic()
+				if remaining is not None and remaining <= 0:
+					return None
+				self._cond.wait(remaining)
+			item = self._items.popleft()
+			self._cond.notify_all()
+			return item
+
+	def close(self):
+		"""Refuse new items and wake all waiters; queued items can still be drained."""
+		with self._cond:
+			self._closed = True
+			self._cond.notify_all()
+
+	def clear(self) -> int:
+		with self._cond:
+			n = len(self._items)
+			self._items.clear()
+			self._cond.notify_all()
+			return n
+
+	def stats(self) -> dict:
+		return {
+			"depth": len(self._items),
+			"maxsize": self.maxsize,
+			"high_water": self.high_water,
+			"dropped": self.dropped,
+			"merged": self.merged,
+		}
@@ -0,0 +1,111 @@
+"""Microphone capture into a preallocated ring of 16-bit samples.
+
+The sounddevice callback runs on PortAudio's real-time thread, so it only copies the
+block into the ring and moves the write index: no locks, no queue, no per-block
+buffers. The stream is opened as int16, so PortAudio does the float conversion.
+
+One thread writes (the callback) and one thread reads (the VAD or Whisper capture
+loop). Each index is assigned by one side only and is advanced after the samples it
+covers are in place, which is all the ordering a single producer and consumer need
+under the GIL. When the reader falls behind and a block does not fit, the block is
+dropped and counted; the reader, not the callback, reports it.
+"""
+import sys
+import time
+from typing import Generator
+
+import numpy as np
+
+
+class CaptureRing:
+	"""Single-producer/single-consumer ring buffer of mono int16 samples."""
+
+	def __init__(self, capacity_samples: int):
+		self.capacity = max(1, capacity_samples)
+		self._buf = np.zeros(self.capacity, dtype=np.int16)
+		self._bytes = memoryview(self._buf).cast("B")
+		# Samples ever written / read; only the callback assigns _write, only the reader _read
+		self._write = 0
+		self._read = 0
+		self._closed = False
+		# Metrics
+		self.overflows = 0  # PortAudio reported an input overflow (samples lost before the callback)
+		self.dropped_blocks = 0  # blocks the ring had no room for
+		self.dropped_frames = 0
+		self.high_water = 0
+		self._reported = 0
+
+	@classmethod
+	def for_config(cls, config) -> "CaptureRing":
+		return cls(int(config.sample_rate * config.capture_ring_ms / 1000))
+
+	# --- producer (audio thread) ---
+
+	def write(self, block: np.ndarray) -> bool:
+		n = len(block)
+		write = self._write
+		used = write - self._read
+		if used + n > self.capacity:
+			self.dropped_blocks += 1
+			self.dropped_frames += n
+			return False
+		start = write % self.capacity
+		first = min(n, self.capacity - start)
+		np.copyto(self._buf[start : start + first], block[:first])
+		if first < n:
+			np.copyto(self._buf[: n - first], block[first:])
+		self._write = write + n
+		if used + n > self.high_water:
+			self.high_water = used + n
+		return True
+
+	def callback(self, indata, frames, time_info, status):
+		"""sounddevice InputStream callback for a mono int16 stream."""
+		if status and status.input_overflow:
+			self.overflows += 1
+		self.write(indata[:, 0])
+
+	def close(self):
+		"""No more writes are coming; readers return once the ring is drained."""
+		self._closed = True
+
+	# --- consumer ---
+
+	def _check_losses(self):
+		lost = self.overflows + self.dropped_blocks
+		if lost != self._reported:
+			self._reported = lost
+			print(
+				f"[audio] capture fell behind: {self.overflows} input overflows, {self.dropped_frames} samples dropped",
+				file=sys.stderr,
+			)
+
+	def chunks(self, poll_s: float = 0.01) -> Generator[memoryview, None, None]:
+		"""Yield buffered audio as 16-bit PCM byte views of the ring until close() and drained.
+
+		A view is only valid until the next one is requested: its samples are released
+		to the writer then.
+		"""
+		while True:
+			closed = self._closed
+			available = self._write - self._read
+			if not available:
+				if closed:
+					return
+				self._check_losses()
+				time.sleep(poll_s)
+				continue
+			start = self._read % self.capacity
+			n = min(available, self.capacity - start)
+			yield self._bytes[start * 2 : (start + n) * 2]
+			self._read += n
+
+	def stats(self) -> dict:
+		return {
+			"capacity_samples": self.capacity,
+			"buffered_samples": self._write - self._read,
+			"high_water_samples": self.high_water,
+			"overflows": self.overflows,
+			"dropped_blocks": self.dropped_blocks,
+			"dropped_frames": self.dropped_frames,
+		}
@@ -13,14 +13,103 @@ class AppConfig:
 	default_voice: str = os.getenv("DEFAULT_VOICE", "female")
 	default_accent: str = os.getenv("DEFAULT_ACCENT", "us")
 	deepl_api_key: str | None = os.getenv("DEEPL_API_KEY")
+	# Alternative DeepL endpoint, e.g. a proxy or the local mock used by benchmarks
+	deepl_server_url: str | None = os.getenv("DEEPL_SERVER_URL")
 	elevenlabs_api_key: str | None = os.getenv("ELEVENLABS_API_KEY")
 	azure_speech_key: str | None = os.getenv("AZURE_SPEECH_KEY")
 	azure_speech_region: str | None = os.getenv("AZURE_SPEECH_REGION")
+	# Translation backends in preference order: deepl (when DEEPL_API_KEY is set), google, local (offline MT)
+	translate_backends: str = os.getenv("TRANSLATE_BACKENDS", "deepl,google")
+	# Local MT: "ctranslate2" (converted OPUS-MT models under local_mt_dir) or "transformers" (Hugging Face cache),
+	# memory budget for loaded language pairs, beam size, and CPU threads (0 = library default)
+	local_mt_engine: str = os.getenv("LOCAL_MT_ENGINE", "ctranslate2")
+	local_mt_dir: str = os.getenv("LOCAL_MT_DIR", "models/mt")
+	local_mt_memory_mb: float = float(os.getenv("LOCAL_MT_MEMORY_MB", "1024"))
+	local_mt_beam: int = int(os.getenv("LOCAL_MT_BEAM", "1"))
+	local_mt_threads: int = int(os.getenv("LOCAL_MT_THREADS", "0"))
+	# Translation backends: HTTP timeout and circuit breaker (consecutive failures, cool-down)
+	translate_timeout_s: float = float(os.getenv("TRANSLATE_TIMEOUT_S", "5"))
+	translate_breaker_failures: int = int(os.getenv("TRANSLATE_BREAKER_FAILURES", "3"))
+	translate_breaker_reset_s: float = float(os.getenv("TRANSLATE_BREAKER_RESET_S", "30"))
+	translate_workers: int = int(os.getenv("TRANSLATE_WORKERS", "4"))
+	# Micro-batching: up to translate_batch_size texts per language pair in one request (1 = off),
+	# waiting at most translate_batch_wait_ms after the first for others to arrive
+	translate_batch_size: int = int(os.getenv("TRANSLATE_BATCH_SIZE", "1"))
+	translate_batch_wait_ms: float = float(os.getenv("TRANSLATE_BATCH_WAIT_MS", "15"))
+	# Partial ASR fragments without a sentence end wait up to this long for the rest of the sentence (0 = never hold)
+	translate_hold_ms: float = float(os.getenv("TRANSLATE_HOLD_MS", "2000"))
+	# Translation cache: in-process LRU backed by SQLite. TRANSLATION_CACHE_MEMORY<=0 turns the whole cache off;
+	# an empty TRANSLATION_CACHE_PATH keeps it in memory only. TRANSLATION_CACHE_SIZE caps the SQLite rows
+	translation_cache_path: str = os.getenv("TRANSLATION_CACHE_PATH", ".cache/translations.sqlite3")
+	translation_cache_size: int = int(os.getenv("TRANSLATION_CACHE_SIZE", "50000"))
+	translation_cache_memory: int = int(os.getenv("TRANSLATION_CACHE_MEMORY", "2048"))
+	translation_cache_ttl_s: float = float(os.getenv("TRANSLATION_CACHE_TTL_S", str(30 * 24 * 3600)))
+	# Async pipeline: bound on each inter-stage queue, and how long shutdown may spend draining
+	pipeline_queue_size: int = int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))
+	pipeline_drain_timeout_s: float = float(os.getenv("PIPELINE_DRAIN_TIMEOUT_S", "10"))
+	# Server mode: concurrent sessions admitted, per-session ingest limit (x real time, burst seconds), shared TTS threads
+	server_max_sessions: int = int(os.getenv("SERVER_MAX_SESSIONS", "8"))
+	server_ingest_ratio: float = float(os.getenv("SERVER_INGEST_RATIO", "1.5"))
+	server_ingest_burst_s: float = float(os.getenv("SERVER_INGEST_BURST_S", "2"))
+	server_tts_workers: int = int(os.getenv("SERVER_TTS_WORKERS", "8"))
+	# Latency tracing: JSON-lines trace ("" = none), summary period (0 = none), /metrics port (0 = none)
+	trace_enabled: bool = os.getenv("TRACE_ENABLED", "0") == "1"
+	trace_path: str = os.getenv("TRACE_PATH", "")
+	trace_summary_s: float = float(os.getenv("TRACE_SUMMARY_S", "30"))
+	metrics_port: int = int(os.getenv("METRICS_PORT", "0"))
+	# TTS items synthesizing ahead of the one playing
+	tts_max_in_flight: int = int(os.getenv("TTS_MAX_IN_FLIGHT", "2"))
+	# End-to-end budget per utterance (0 = speak everything); a late one is skipped if a newer one waits
+	tts_latency_budget_s: float = float(os.getenv("TTS_LATENCY_BUDGET_S", "4"))
+	# Synthesized-audio cache (0 MB = off)
+	tts_cache_dir: str = os.getenv("TTS_CACHE_DIR", ".cache/tts")
+	tts_cache_max_mb: float = float(os.getenv("TTS_CACHE_MAX_MB", "512"))
 	# ASR
 	whisper_model_size: str = os.getenv("WHISPER_MODEL", "small")
+	# Decode a second of silence after loading so the first real utterance is not the slow one
+	whisper_warmup: bool = os.getenv("WHISPER_WARMUP", "1") == "1"
+	# Inference engine: "openai" (PyTorch FP32), "openai-int8" (dynamic int8 torch) or "faster-whisper" (CTranslate2)
+	asr_engine: str = os.getenv("ASR_ENGINE", "openai")
+	asr_compute_type: str = os.getenv("ASR_COMPUTE_TYPE", "int8")  # faster-whisper only
+	asr_cpu_threads: int = int(os.getenv("ASR_CPU_THREADS", "0"))  # faster-whisper only, 0 = library default
+	# Spoken language: "auto" identifies it with Whisper per stream, or a fixed code such as "en".
+	# Hysteresis: detection probability that locks a language, consecutive confident detections
+	# of another language before switching, and segments decoded between re-checks once locked
+	asr_language: str = os.getenv("ASR_LANGUAGE", "auto")
+	asr_language_lock_prob: float = float(os.getenv("ASR_LANGUAGE_LOCK_PROB", "0.7"))
+	asr_language_switch_after: int = int(os.getenv("ASR_LANGUAGE_SWITCH_AFTER", "2"))
+	asr_language_recheck: int = int(os.getenv("ASR_LANGUAGE_RECHECK", "4"))
+	# The pipeline's ASR stage: segments waiting for it, what happens when that queue is full,
+	# and where inference runs ("process" sidesteps the GIL at the cost of a model per worker)
+	asr_executor: str = os.getenv("ASR_EXECUTOR", "thread")  # "thread" or "process"
+	asr_workers: int = int(os.getenv("ASR_WORKERS", "1"))
+	asr_queue_size: int = int(os.getenv("ASR_QUEUE_SIZE", "4"))
+	asr_backpressure: str = os.getenv("ASR_BACKPRESSURE", "merge")  # "merge", "drop_oldest" or "block"
+	# Azure streaming transcripts waiting for a reader; the oldest is dropped beyond this
+	asr_result_queue_size: int = int(os.getenv("ASR_RESULT_QUEUE_SIZE", "64"))
+	# Batched inference: up to asr_batch_size segments from any caller decoded together, waiting at most
+	# asr_batch_wait_ms after the first for others to arrive. 1 = off, and then the server does not batch across sessions
+	asr_batch_size: int = int(os.getenv("ASR_BATCH_SIZE", "1"))
+	asr_batch_wait_ms: float = float(os.getenv("ASR_BATCH_WAIT_MS", "30"))
+	# Incremental decoding: re-decode the utterance in progress every asr_partial_ms and emit committed words early
+	asr_incremental: bool = os.getenv("ASR_INCREMENTAL", "0") == "1"
+	asr_partial_ms: int = int(os.getenv("ASR_PARTIAL_MS", "1000"))
 	# Audio
 	sample_rate: int = int(os.getenv("AUDIO_SAMPLE_RATE", "16000"))
 	frame_ms: int = int(os.getenv("VAD_FRAME_MS", "20"))
 	aggressiveness: int = int(os.getenv("VAD_AGGRESSIVENESS", "2"))
 	max_segment_ms: int = int(os.getenv("MAX_SEGMENT_MS", "8000"))
 	padding_ms: int = int(os.getenv("VAD_PADDING_MS", "300"))
+	# Audio the capture ring (or the feed() queue) holds while the reader is busy; beyond it blocks are dropped and counted
+	capture_ring_ms: int = int(os.getenv("CAPTURE_RING_MS", "5000"))
+	# Voiced audio needed before an utterance counts as the user talking over TTS
+	vad_barge_in_ms: int = int(os.getenv("VAD_BARGE_IN_MS", "200"))
+	# Trailing non-speech needed to close a segment; defaults to the padding window
+	vad_hangover_ms: int = int(os.getenv("VAD_HANGOVER_MS", os.getenv("VAD_PADDING_MS", "300")))
+	# An utterance reaching max_segment_ms is cut at the quietest frame within this much of its end
+	vad_split_search_ms: int = int(os.getenv("VAD_SPLIT_SEARCH_MS", "1000"))
+	# Journal of raw speech segments for later reprocessing (empty = off), capped at audio_journal_mb on disk.
+	# By default only segments ASR backpressure drops are written; audio_journal_all writes every one
+	audio_journal_dir: str = os.getenv("AUDIO_JOURNAL_DIR", "")
+	audio_journal_mb: float = float(os.getenv("AUDIO_JOURNAL_MB", "512"))
+	audio_journal_all: bool = os.getenv("AUDIO_JOURNAL_ALL", "0") == "1"
@@ -0,0 +1,101 @@
+"""Spoken-language identification with per-stream hysteresis.
+
+Whisper can tell the language from a segment's encoder output with a single decoder
+step, but on short or ambiguous segments ("OK", a name) the guess flips around. A
+LanguageTracker keeps one language per stream (speaker or session):
+
+- until a language is locked, every segment is detected and decoded in whatever was
+  detected; a detection at or above `lock_prob` locks it
+- once locked, segments are decoded in that language without detecting, except every
+  `recheck_every`-th segment, which is detected again
+- a different language only takes over after `switch_after` consecutive confident
+  detections of it; weaker or one-off disagreements are ignored
+"""
+import threading
+from typing import Optional
+
+from .config import AppConfig
+
+
+class LanguageTracker:
+	def __init__(
+		self,
+		fixed: Optional[str] = None,
+		lock_prob: float = 0.7,
+		switch_after: int = 2,
+		recheck_every: int = 4,
+	):
+		self.fixed = fixed
+		self.lock_prob = lock_prob
+		self.switch_after = max(1, switch_after)
+		self.recheck_every = max(1, recheck_every)
+		self.language: Optional[str] = fixed
+		self._since_check = 0
+		self._challenger: Optional[str] = None
+		self._challenger_count = 0
+		self._lock = threading.Lock()
+		# Metrics
+		self.detections = 0
+		self.skipped = 0
+		self.switches = 0
+
+	@classmethod
+	def from_config(cls, config: AppConfig) -> "LanguageTracker":
+		fixed = None if config.asr_language == "auto" else config.asr_language
+		return cls(fixed, config.asr_language_lock_prob, config.asr_language_switch_after, config.asr_language_recheck)
+
+	def hint(self) -> Optional[str]:
+		"""The language to decode the next segment in, or None if it should be detected first."""
+		with self._lock:
+			if self.fixed is not None:
+				return self.fixed
+			if self.language is None or self._challenger is not None or self._since_check >= self.recheck_every:
+				return None
+			self._since_check += 1
+			self.skipped += 1
+			return self.language
+
+	def choose(self, detected: str, prob: float) -> str:
+		"""Record a detection and return the language the segment should be decoded in."""
+		with self._lock:
+			self.detections += 1
+			self._since_check = 0
+			if self.language is None:
+				if prob >= self.lock_prob:
+					self.language = detected
+				return detected
+			if detected == self.language or prob < self.lock_prob:
+				self._challenger, self._challenger_count = None, 0
+				return self.language
+			if detected == self._challenger:
+				self._challenger_count += 1
+			else:
+				self._challenger, self._challenger_count = detected, 1
+			if self._challenger_count < self.switch_after:
+				return self.language
+			self.language = detected
+			self._challenger, self._challenger_count = None, 0
+			self.switches += 1
+			return detected
+
+	def stats(self) -> dict:
+		with self._lock:
+			return {
+				"language": self.language,
+				"detections": self.detections,
+				"skipped": self.skipped,
+				"switches": self.switches,
+			}
+
+
+def resolve_language(backend, model, audio, tracker: Optional[LanguageTracker]) -> Optional[str]:
+	"""Language to decode 16 kHz `audio` in, detecting on `model` only when `tracker` asks for it.
+
+	None (no tracker) leaves detection to the engine's own transcribe().
+	"""
+	if tracker is None:
+		return None
+	language = tracker.hint()
+	if language is None:
+		language = tracker.choose(*backend.detect_language(model, audio))
+	return language
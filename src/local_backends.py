@@ -0,0 +1,61 @@
+"""Deterministic offline stand-ins for the translation and TTS backends.
+
+They never touch the network, so batch runs and benchmarks can exercise the full
+pipeline on an air-gapped box. `latency_ms` simulates the round trip of the real
+service when measuring throughput.
+"""
+import time
+from typing import Iterator, Optional
+
+import numpy as np
+
+from .audio import AudioSegment
+from .translate import same_language
+
+
+LOCAL_TTS_SAMPLE_RATE = 16000
+
+
+def local_translate(text: str, target_lang: str, source_lang: Optional[str] = None, latency_ms: float = 0.0) -> str:
+	if latency_ms:
+		time.sleep(latency_ms / 1000)
+	if not text.strip() or same_language(source_lang, target_lang):
+		return text
+	return f"[{(source_lang or 'auto')}->{target_lang}] {text}"
+
+
+def local_tts(text: str, sample_rate: int = LOCAL_TTS_SAMPLE_RATE, latency_ms: float = 0.0) -> AudioSegment:
+	"""Render one short tone per word (60 ms per character) so output length tracks the text."""
+	if latency_ms:
+		time.sleep(latency_ms / 1000)
+	parts = []
+	gap = np.zeros(int(0.05 * sample_rate), dtype=np.float32)
+	for word in text.split():
+		n = int(0.06 * len(word) * sample_rate)
+		t = np.arange(n, dtype=np.float32) / sample_rate
+		freq = 180.0 + (sum(map(ord, word)) % 200)
+		parts.append(0.25 * np.sin(2 * np.pi * freq * t).astype(np.float32))
+		parts.append(gap)
+	audio = np.concatenate(parts) if parts else gap
+	pcm16 = (np.clip(audio, -1.0, 1.0) * 32767.0).astype(np.int16).tobytes()
+	return AudioSegment(pcm16=pcm16, sample_rate=sample_rate, duration_ms=int(len(audio) / sample_rate * 1000))
+
+
+def local_tts_stream(
+	text: str,
+	sample_rate: int = LOCAL_TTS_SAMPLE_RATE,
+	chunk_ms: int = 100,
+	first_chunk_ms: float = 0.0,
+	chunk_latency_ms: float = 0.0,
+) -> Iterator[bytes]:
+	"""Chunked variant of local_tts that mimics a streaming provider's pacing.
+
+	The first chunk arrives after `first_chunk_ms`, each later one after `chunk_latency_ms`.
+	"""
+	pcm16 = local_tts(text, sample_rate).pcm16
+	step = int(sample_rate * chunk_ms / 1000) * 2
+	for i in range(0, len(pcm16), step):
+		delay = first_chunk_ms if i == 0 else chunk_latency_ms
+		if delay:
+			time.sleep(delay / 1000)
+		yield pcm16[i : i + step]
@@ -0,0 +1,165 @@
+"""Process-wide registry of loaded ASR models.
+
+Loading a model takes seconds, and the first inference pays one-time setup on top,
+so each (engine, model size) is loaded once per process on a background thread and
+warmed up on a silent buffer before anyone needs it. Whisper keeps its decoder kv-cache in
+hooks on the module, so one instance cannot decode on two threads at once; callers
+lease a replica for the duration of a call and the pool grows up to the replica
+count they ask for.
+"""
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import numpy as np
+
+from .asr_backends import OpenAIWhisperBackend
+
+
+# One second of silence at whisper's 16 kHz input rate
+_WARMUP_SAMPLES = 16000
+
+
+def warm_up(backend, model):
+	"""Run one throwaway decode so kernel selection and mel filter setup happen now."""
+	backend.transcribe(model, np.zeros(_WARMUP_SAMPLES, dtype=np.float32))
+
+
+class ModelPool:
+	def __init__(self, size: str, backend, warmup: bool = True):
+		self.size = size
+		self.backend = backend
+		self.warmup = warmup
+		self.label = f"{backend.name}/{size}"
+		self._free: "queue.Queue[object]" = queue.Queue()
+		self._lock = threading.Lock()
+		self._ready = threading.Event()
+		self._error: Optional[BaseException] = None
+		self._primary = None
+		self._thread: Optional[threading.Thread] = None
+		self.replicas = 0
+		self.requested_at: Optional[float] = None
+		self.load_s: Optional[float] = None
+		self.warmup_s: Optional[float] = None
+
+	def preload(self):
+		"""Start loading the first replica in the background; returns immediately."""
+		with self._lock:
+			if self._thread is not None:
+				return
+			self.replicas = 1
+			self.requested_at = time.perf_counter()
+			self._thread = threading.Thread(target=self._load_primary, name=f"asr-load-{self.label}", daemon=True)
+		self._thread.start()
+
+	def _load(self) -> tuple[object, float, Optional[float]]:
+		t0 = time.perf_counter()
+		model = self.backend.load(self.size)
+		load_s = time.perf_counter() - t0
+		warmup_s = None
+		if self.warmup:
+			t1 = time.perf_counter()
+			warm_up(self.backend, model)
+			warmup_s = time.perf_counter() - t1
+		return model, load_s, warmup_s
+
+	def _load_primary(self):
+		try:
+			model, self.load_s, self.warmup_s = self._load()
+			self._primary = model
+			self._free.put(model)
+			warm = f", warm-up {self.warmup_s:.2f} s" if self.warmup_s is not None else ""
+			print(f"ASR model {self.label} ready: load {self.load_s:.2f} s{warm}")
+		except BaseException as e:
+			self._error = e
+			print(f"ASR model {self.label} failed to load: {e}")
+		finally:
+			self._ready.set()
+
+	def wait(self, timeout: Optional[float] = None):
+		"""Block until the first replica is loaded and warmed, then return it."""
+		self.preload()
+		if not self._ready.wait(timeout):
+			raise TimeoutError(f"ASR model {self.label} still loading")
+		if self._error is not None:
+			raise RuntimeError(f"ASR model {self.label} failed to load") from self._error
+		return self._primary
+
+	def ready(self) -> bool:
+		return self._ready.is_set() and self._error is None
+
+	@contextmanager
+	def lease(self, max_replicas: int = 1) -> Iterator[object]:
+		"""Exclusive use of one replica, loading another if all are busy and fewer than `max_replicas` exist."""
+		model = self._acquire(max(1, max_replicas))
+		try:
+			yield model
+		finally:
+			self._free.put(model)
+
+	def _acquire(self, max_replicas: int):
+		self.wait()
+		try:
+			return self._free.get_nowait()
+		except queue.Empty:
+			pass
+		with self._lock:
+			grow = self.replicas < max_replicas
+			if grow:
+				self.replicas += 1
+		if not grow:
+			return self._free.get()
+		try:
+			return self._load()[0]
+		except BaseException:
+			with self._lock:
+				self.replicas -= 1
+			raise
+
+	def stats(self) -> dict:
+		return {
+			"engine": self.backend.name,
+			"size": self.size,
+			"ready": self.ready(),
+			"replicas": self.replicas,
+			"idle": self._free.qsize(),
+			"load_s": self.load_s,
+			"warmup_s": self.warmup_s,
+		}
+
+
+class ModelRegistry:
+	"""Hands out one ModelPool per (engine, model size), shared by every caller in the process."""
+
+	def __init__(self):
+		self._pools: dict[tuple[str, str], ModelPool] = {}
+		self._lock = threading.Lock()
+
+	def pool(self, size: str, backend=None, warmup: bool = True) -> ModelPool:
+		"""The pool for `size` on `backend` (openai-whisper by default), loading in the background on first request."""
+		backend = backend or OpenAIWhisperBackend()
+		key = (backend.name, size)
+		with self._lock:
+			pool = self._pools.get(key)
+			if pool is None:
+				pool = self._pools[key] = ModelPool(size, backend, warmup=warmup)
+		pool.preload()
+		return pool
+
+	def stats(self) -> list[dict]:
+		with self._lock:
+			return [pool.stats() for pool in self._pools.values()]
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+	global _registry
+	with _registry_lock:
+		if _registry is None:
+			_registry = ModelRegistry()
+		return _registry
@@ -0,0 +1,507 @@
+import asyncio
+import concurrent.futures
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Optional
+
+from .asr_whisper import WHISPER_MAX_SECONDS, WhisperASR
+from .audio import AudioSegment, VADRecorder, pcm16_to_float32
+from .audio_journal import get_audio_journal
+from .config import AppConfig
+from .playback import PCMStreamPlayer
+from .tracing import get_tracer
+from .translate_batch import ends_sentence
+
+
+# Marks the end of the stream on every inter-stage queue
+_DONE = None
+
+# Process-wide, so utterance ids stay unique when several pipelines share a tracer
+_utterance_ids = itertools.count()
+
+# Late utterances merged into the next one keep at most this much of the newest text
+MAX_MERGE_CHARS = 400
+
+
+class _TrackedQueue(asyncio.Queue):
+	"""asyncio.Queue that remembers the deepest it has been."""
+
+	def _init(self, maxsize):
+		super()._init(maxsize)
+		self.high_water = 0
+
+	def _put(self, item):
+		super()._put(item)
+		self.high_water = max(self.high_water, self.qsize())
+
+	def newest(self):
+		return self._queue[-1]
+
+
+def _merge_segments(older: AudioSegment, newer: AudioSegment) -> Optional[AudioSegment]:
+	"""One segment holding both, while it still fits a single Whisper window."""
+	if older.sample_rate != newer.sample_rate or older.duration_ms + newer.duration_ms > WHISPER_MAX_SECONDS * 1000:
+		return None
+	return AudioSegment(older.pcm16 + newer.pcm16, older.sample_rate, older.duration_ms + newer.duration_ms)
+
+
+@dataclass(eq=False)
+class Utterance:
+	id: int
+	segment: AudioSegment
+	captured_at: float = field(default_factory=time.monotonic)
+	text: str = ""
+	language: Optional[str] = None
+	translation: str = ""
+	# False for words committed early by incremental decoding; more of the utterance follows
+	is_final: bool = True
+	deadline: Optional[float] = None
+	cancelled: bool = False
+	chunks: Optional[asyncio.Queue] = field(default=None, repr=False)
+	slot: Optional[asyncio.Semaphore] = field(default=None, repr=False)
+
+
+class Pipeline:
+	"""capture -> segment -> ASR -> translate -> TTS -> playback on one asyncio loop.
+
+	Stages are connected by bounded asyncio queues, so a slow stage pushes back on the
+	ones before it instead of letting work pile up. Where capture meets ASR, which
+	cannot wait on a live speaker, ASR_BACKPRESSURE decides instead: merge a new segment
+	into the newest waiting one, drop the oldest, or block. Blocking calls (Whisper, translation
+	SDKs, TTS streams, the sound device) run in per-stage executors whose sizes set each
+	stage's concurrency; ASR and translation results are forwarded in capture order.
+	stop() ends capture and lets everything already captured drain through to playback.
+
+	A server running many pipelines passes shared `executors` (keyed segment, asr,
+	translate, tts, playback) and a shared `tracer`; the pipeline then leaves their
+	lifecycle to the caller.
+	"""
+
+	def __init__(
+		self,
+		config: AppConfig,
+		asr: WhisperASR,
+		translate_fn: Callable[[str, Optional[str]], str],
+		synth_fn: Optional[Callable[[str], Iterable[bytes]]] = None,
+		sample_rate: Optional[int] = None,
+		speak_fn: Optional[Callable[[str], None]] = None,
+		recorder: Optional[VADRecorder] = None,
+		player_factory: Optional[Callable[[int], PCMStreamPlayer]] = None,
+		barge_in: bool = False,
+		on_transcript: Optional[Callable[[Utterance], None]] = None,
+		on_translation: Optional[Callable[[Utterance], None]] = None,
+		tracer=None,
+		executors: Optional[dict[str, ThreadPoolExecutor]] = None,
+	):
+		if synth_fn is None and speak_fn is None:
+			raise ValueError("Pipeline needs synth_fn or speak_fn")
+		if synth_fn is not None and not sample_rate:
+			raise ValueError("synth_fn requires sample_rate")
+		self.config = config
+		self.asr = asr
+		self.translate_fn = translate_fn
+		self.synth_fn = synth_fn
+		self.sample_rate = sample_rate
+		self.speak_fn = speak_fn
+		self.recorder = recorder or VADRecorder(config)
+		if barge_in:
+			self.recorder.on_speech_start = self._on_speech_start
+		self._player_factory = player_factory or (lambda rate: PCMStreamPlayer(rate))
+		self._player: Optional[PCMStreamPlayer] = None
+		self.on_transcript = on_transcript
+		self.on_translation = on_translation
+		self._owns_tracer = tracer is None
+		self.tracer = tracer or get_tracer(config)
+		self.incremental = config.asr_incremental
+		# Spoken language is tracked per stream, so sessions sharing one WhisperASR do not mix
+		self._language = asr.language_tracker()
+		self._decoder = asr.incremental_decoder(self._language) if self.incremental else None
+		# Snapshots are superseded rather than queued, and must reach the decoder whole and in order
+		self.backpressure = "block" if self.incremental else config.asr_backpressure
+		# Incremental snapshots build on each other, so they are decoded one at a time; with
+		# batching, enough segments stay in flight to fill a batch from a backlog
+		if self.incremental:
+			self.asr_workers = 1
+		else:
+			self.asr_workers = max(1, config.asr_workers, config.asr_batch_size)
+		self.translate_workers = max(1, config.translate_workers)
+		self.tts_workers = max(1, config.tts_max_in_flight)
+		self.latency_budget_s = config.tts_latency_budget_s or None
+		# Partial fragments waiting for the rest of their sentence before translation
+		self.hold_s = config.translate_hold_ms / 1000 if config.translate_hold_ms > 0 else None
+		self._held: list[str] = []
+		self._held_since = 0.0
+		# With AUDIO_JOURNAL_ALL every final segment is written to disk for reprocessing,
+		# otherwise only the segments that backpressure drops
+		self.journal = get_audio_journal(config)
+		self._queues: dict[str, _TrackedQueue] = {}
+		self._loop: Optional[asyncio.AbstractEventLoop] = None
+		self._active: set[Utterance] = set()
+		self._abandoned = False
+		self._shared_executors = executors
+		self._executors: dict[str, ThreadPoolExecutor] = {}
+		# Metrics
+		self.dropped_stale = 0
+		self.merged = 0
+		self.merged_segments = 0
+		self.dropped_segments = 0
+		self.failed = 0
+		self.barge_ins = 0
+
+	# --- lifecycle ---
+
+	def stop(self):
+		"""Stop capturing; safe to call from any thread. run() returns once the queues drain."""
+		self.recorder.stop()
+
+	def backlog_stats(self) -> dict:
+		"""Depth and high-water mark of each inter-stage queue, plus capture counters."""
+		stats = {name: {"depth": q.qsize(), "maxsize": q.maxsize, "high_water": q.high_water} for name, q in self._queues.items()}
+		if "asr" in stats:
+			stats["asr"].update(policy=self.backpressure, merged=self.merged_segments, dropped=self.dropped_segments)
+		stats["capture"] = self.recorder.capture_stats()
+		return stats
+
+	async def run(self):
+		loop = asyncio.get_running_loop()
+		self._loop = loop
+		size = max(1, self.config.pipeline_queue_size)
+		self._asr_in: asyncio.Queue = _TrackedQueue(max(1, self.config.asr_queue_size))
+		self._translate_in: asyncio.Queue = _TrackedQueue(size)
+		self._tts_in: asyncio.Queue = _TrackedQueue(size)
+		self._play_in: asyncio.Queue = _TrackedQueue(size)
+		self._queues = {"asr": self._asr_in, "translate": self._translate_in, "tts": self._tts_in, "playback": self._play_in}
+		self._executors = self._shared_executors or {
+			"segment": ThreadPoolExecutor(1, thread_name_prefix="segment"),
+			"asr": ThreadPoolExecutor(self.asr_workers, thread_name_prefix="asr"),
+			"translate": ThreadPoolExecutor(self.translate_workers, thread_name_prefix="translate"),
+			"tts": ThreadPoolExecutor(self.tts_workers, thread_name_prefix="tts"),
+			"playback": ThreadPoolExecutor(1, thread_name_prefix="playback"),
+		}
+
+		if self._owns_tracer:
+			self.tracer.start()
+		self.recorder.start()
+		tasks = [
+			loop.create_task(self._segment_stage(), name="segment"),
+			loop.create_task(self._ordered_stage(self._asr_in, self._translate_in, self._transcribe, "asr", self.asr_workers), name="asr"),
+			loop.create_task(self._ordered_stage(self._translate_in, self._tts_in, self._translate, "translate", self.translate_workers, self._join_fragments), name="translate"),
+			loop.create_task(self._tts_stage(), name="tts"),
+			loop.create_task(self._playback_stage(), name="playback"),
+		]
+		try:
+			# asyncio.wait, unlike gather, does not cancel the stages if run() is cancelled
+			await asyncio.wait(tasks)
+		except asyncio.CancelledError:
+			self.stop()
+			_, still_running = await asyncio.wait(tasks, timeout=self.config.pipeline_drain_timeout_s)
+			if still_running:
+				self._abandoned = True
+				self._barge_in()
+				for task in still_running:
+					task.cancel()
+				await asyncio.wait(still_running)
+			raise
+		finally:
+			if self._shared_executors is None:
+				for executor in self._executors.values():
+					executor.shutdown(wait=False, cancel_futures=True)
+			if self._owns_tracer:
+				self.tracer.close()
+		for task in tasks:
+			if not task.cancelled() and task.exception() is not None:
+				raise task.exception()
+
+	# --- capture + segment ---
+
+	def _put_from_thread(self, q: asyncio.Queue, item) -> bool:
+		"""Blocking put from a worker thread that gives up if the pipeline was abandoned."""
+		future = asyncio.run_coroutine_threadsafe(q.put(item), self._loop)
+		while True:
+			try:
+				future.result(timeout=0.5)
+				return True
+			except concurrent.futures.TimeoutError:
+				if self._abandoned:
+					future.cancel()
+					return False
+
+	def _pump_segments(self):
+		try:
+			for segment in self.recorder.segments(self.config.asr_partial_ms if self.incremental else None):
+				# A snapshot is superseded by the next one, so drop it rather than wait behind ASR
+				if not segment.is_final and not self._asr_in.empty():
+					continue
+				if segment.is_final and self.journal is not None and self.config.audio_journal_all:
+					self.journal.append(segment.pcm16, segment.sample_rate)
+				utt = Utterance(id=next(_utterance_ids), segment=segment)
+				# Capture time assumes real-time input: the segment ends now and lasted duration_ms
+				self.tracer.mark(utt.id, "capture", utt.captured_at - segment.duration_ms / 1000)
+				self.tracer.mark(utt.id, "vad_end", utt.captured_at)
+				if self.backpressure != "block":
+					# Callbacks run in order, so the end-of-stream marker below still comes last
+					self._loop.call_soon_threadsafe(self._offer, utt)
+				elif not self._put_from_thread(self._asr_in, utt):
+					return
+		finally:
+			self._put_from_thread(self._asr_in, _DONE)
+
+	def _offer(self, utt: Utterance):
+		"""Queue a segment for ASR without waiting, applying the backpressure policy when the queue is full."""
+		q = self._asr_in
+		if not q.full():
+			q.put_nowait(utt)
+			return
+		if self.backpressure == "merge":
+			newest = q.newest()
+			segment = _merge_segments(newest.segment, utt.segment)
+			if segment is not None:
+				newest.segment = segment
+				self.merged_segments += 1
+				self.tracer.finish(utt.id, "merged")
+				return
+		oldest = q.get_nowait()
+		self.dropped_segments += 1
+		self.tracer.finish(oldest.id, "dropped")
+		if self.journal is not None and not self.config.audio_journal_all:
+			self.journal.append(oldest.segment.pcm16, oldest.segment.sample_rate)
+		q.put_nowait(utt)
+
+	async def _segment_stage(self):
+		# VADRecorder's generator blocks on the capture queue, so it gets a thread of its own
+		try:
+			await self._loop.run_in_executor(self._executors["segment"], self._pump_segments)
+		finally:
+			self.recorder.stop()
+
+	# --- ASR / translate ---
+
+	def _transcribe(self, utt: Utterance) -> Optional[Utterance]:
+		if self.incremental:
+			result = self.asr.decode_incremental(utt.segment, self._decoder)
+		else:
+			result = self.asr.transcribe_pooled(pcm16_to_float32(utt.segment.pcm16), utt.segment.sample_rate, self._language)
+		self.tracer.mark(utt.id, "asr_done")
+		# An empty final result still ends an utterance whose words went out as partials,
+		# so it goes on to release any fragments held for translation
+		if result is None or not (result.text or (self.incremental and result.is_final)):
+			self.tracer.finish(utt.id, "no_speech")
+			return None
+		utt.text, utt.language, utt.is_final = result.text, result.language, result.is_final
+		if self.on_transcript is not None and utt.text:
+			self.on_transcript(utt)
+		return utt
+
+	def _join_fragments(self, utt: Utterance) -> Optional[Utterance]:
+		"""Hold partial fragments that end mid-sentence and translate them with the rest of the sentence.
+
+		Runs on the loop in capture order. A fragment is held for at most hold_s; the end
+		of the utterance, or a fragment that ends a sentence, releases everything held.
+		"""
+		if self.hold_s is not None and utt.text and not utt.is_final and not ends_sentence(utt.text, utt.language):
+			now = time.monotonic()
+			if not self._held:
+				self._held_since = now
+			if now - self._held_since < self.hold_s:
+				self._held.append(utt.text)
+				self.tracer.finish(utt.id, "held")
+				return None
+		if self._held:
+			utt.text = " ".join(self._held + [utt.text]).strip()
+			self._held = []
+		if not utt.text:
+			self.tracer.finish(utt.id, "no_speech")
+			return None
+		return utt
+
+	def _translate(self, utt: Utterance) -> Optional[Utterance]:
+		utt.translation = self.translate_fn(utt.text, utt.language)
+		self.tracer.mark(utt.id, "translate_done")
+		if self.on_translation is not None:
+			self.on_translation(utt)
+		if not utt.translation.strip():
+			self.tracer.finish(utt.id, "empty")
+			return None
+		return utt
+
+	async def _ordered_stage(self, inq: asyncio.Queue, outq: asyncio.Queue, fn, executor: str, concurrency: int, prepare=None):
+		"""Run blocking fn(utt) on up to `concurrency` items at once, forwarding results in input order.
+
+		`prepare(utt)`, if given, runs on the loop in input order first and may return None to skip the item.
+		"""
+		loop = self._loop
+		slots = asyncio.Semaphore(concurrency)
+		order: asyncio.Queue = asyncio.Queue()
+
+		async def forward():
+			while True:
+				job = await order.get()
+				if job is _DONE:
+					break
+				utt, future = job
+				try:
+					utt = await future
+				except Exception as e:
+					print(f"{executor} failed: {e}")
+					self.failed += 1
+					self.tracer.finish(utt.id, "failed")
+					utt = None
+				if utt is not None:
+					await outq.put(utt)
+				# Released only once forwarded, so finished-but-blocked work still counts
+				slots.release()
+			await outq.put(_DONE)
+
+		forwarder = loop.create_task(forward())
+		while True:
+			utt = await inq.get()
+			if utt is _DONE:
+				break
+			if prepare is not None:
+				utt = prepare(utt)
+				if utt is None:
+					continue
+			await slots.acquire()
+			await order.put((utt, loop.run_in_executor(self._executors[executor], fn, utt)))
+		await order.put(_DONE)
+		await forwarder
+
+	# --- TTS / playback ---
+
+	def _pump_speech(self, utt: Utterance):
+		loop = self._loop
+		try:
+			for chunk in self.synth_fn(utt.translation):
+				if utt.cancelled:
+					break
+				self.tracer.mark(utt.id, "tts_first_byte")
+				loop.call_soon_threadsafe(utt.chunks.put_nowait, chunk)
+		except Exception as e:
+			print(f"TTS synthesis failed: {e}")
+			self.failed += 1
+		finally:
+			loop.call_soon_threadsafe(utt.chunks.put_nowait, _DONE)
+
+	def _merge_stale(self, utt: Utterance) -> tuple[Utterance, bool]:
+		"""Fold an utterance already past its budget into the ones queued behind it.
+
+		Speaking a late sentence and then the next would put both further behind, so they
+		are synthesized as the newest utterance, keeping at most MAX_MERGE_CHARS of the
+		newest text. Also returns whether the end of the stream was taken off the queue.
+		"""
+		if self.latency_budget_s is None:
+			return utt, False
+		group = [utt]
+		done = False
+		now = time.monotonic()
+		while now > group[-1].captured_at + self.latency_budget_s and not self._tts_in.empty():
+			newer = self._tts_in.get_nowait()
+			if newer is _DONE:
+				done = True
+				break
+			group.append(newer)
+		target = group[-1]
+		texts, total = [], 0
+		for other in reversed(group):
+			if texts and total + len(other.translation) > MAX_MERGE_CHARS:
+				# Too old to fit, and so is everything before it
+				total = MAX_MERGE_CHARS
+				self.dropped_stale += 1
+				self.tracer.finish(other.id, "stale")
+				continue
+			texts.insert(0, other.translation)
+			total += len(other.translation) + 1
+			if other is not target:
+				self.merged += 1
+				self.tracer.finish(other.id, "merged")
+		target.translation = " ".join(texts)
+		return target, done
+
+	async def _tts_stage(self):
+		slots = asyncio.Semaphore(self.tts_workers)
+		done = False
+		while not done:
+			utt = await self._tts_in.get()
+			if utt is _DONE:
+				break
+			# A slot is held from the start of synthesis until the utterance has played
+			await slots.acquire()
+			utt, done = self._merge_stale(utt)
+			utt.slot = slots
+			if self.latency_budget_s is not None:
+				utt.deadline = utt.captured_at + self.latency_budget_s
+			self._active.add(utt)
+			if self.synth_fn is not None:
+				utt.chunks = asyncio.Queue()
+				self._loop.run_in_executor(self._executors["tts"], self._pump_speech, utt)
+			# Handed on immediately so playback can start on the first chunk
+			await self._play_in.put(utt)
+		await self._play_in.put(_DONE)
+
+	async def _playback_stage(self):
+		run = self._loop.run_in_executor
+		playback = self._executors["playback"]
+		while True:
+			utt = await self._play_in.get()
+			if utt is _DONE:
+				break
+			outcome = "spoken"
+			try:
+				if utt.deadline is not None and time.monotonic() > utt.deadline and not self._play_in.empty():
+					utt.cancelled = True
+					self.dropped_stale += 1
+					outcome = "stale"
+				if self.synth_fn is None:
+					if not utt.cancelled:
+						self.tracer.mark(utt.id, "playback_start")
+						await run(playback, self.speak_fn, utt.translation)
+						self.tracer.mark(utt.id, "playback_end")
+					continue
+				started = False
+				while True:
+					chunk = await utt.chunks.get()
+					if chunk is _DONE:
+						break
+					if utt.cancelled:
+						if started and self._player is not None:
+							await run(playback, self._player.abort)
+							self._player = None
+							started = False
+						continue
+					player = self._player
+					if player is None:
+						# Kept open across utterances so consecutive ones play without a gap
+						player = self._player = self._player_factory(self.sample_rate)
+					if not started:
+						self.tracer.mark(utt.id, "playback_start")
+						started = True
+					# Barge-in may abort this player mid-write; the write then returns early
+					await run(playback, player.write, chunk)
+				if started:
+					# The last chunk has reached the device buffer
+					self.tracer.mark(utt.id, "playback_end")
+			finally:
+				self._active.discard(utt)
+				utt.slot.release()
+				if utt.cancelled and outcome == "spoken":
+					outcome = "cancelled"
+				self.tracer.finish(utt.id, outcome)
+		if self._player is not None:
+			await run(playback, self._player.close)
+			self._player = None
+
+	def _barge_in(self):
+		self.barge_ins += 1
+		for utt in self._active:
+			utt.cancelled = True
+		# A cached clip can arrive as one chunk, so waiting for the next chunk could mean the whole clip
+		player, self._player = self._player, None
+		if player is not None:
+			player.abort()
+
+	def _on_speech_start(self):
+		# Called on the segment thread
+		if self._loop is not None:
+			self._loop.call_soon_threadsafe(self._barge_in)
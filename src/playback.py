@@ -1,5 +1,9 @@
 import io
-from typing import Optional
+import threading
+import time
+import wave
+from dataclasses import dataclass
+from typing import Iterable, Optional
 
 import numpy as np
 import sounddevice as sd
@@ -17,3 +21,128 @@ def play_pcm16_mono(pcm16: bytes, sample_rate: int, device: Optional[int] = None
 	pcm = np.frombuffer(pcm16, dtype=np.int16).astype("float32") / 32768.0
 	sd.play(pcm, samplerate=sample_rate, device=device)
 	sd.wait()
+
+
+def pcm16_to_wav(pcm16: bytes, sample_rate: int) -> bytes:
+	with io.BytesIO() as bio:
+		with wave.open(bio, "wb") as wav:
+			wav.setnchannels(1)
+			wav.setsampwidth(2)
+			wav.setframerate(sample_rate)
+			wav.writeframes(pcm16)
+		return bio.getvalue()
+
+
+def wav_to_pcm16(wav_bytes: bytes) -> tuple[bytes, int]:
+	"""Frames and sample rate of a mono 16-bit WAV such as pcm16_to_wav produces."""
+	with io.BytesIO(wav_bytes) as bio, wave.open(bio, "rb") as wav:
+		return wav.readframes(wav.getnframes()), wav.getframerate()
+
+
+@dataclass
+class PlaybackStats:
+	time_to_first_audio_s: Optional[float]
+	audio_s: float
+	total_s: float
+
+
+class PCMStreamPlayer:
+	"""Plays 16-bit mono PCM chunks as they arrive instead of after the whole clip is known.
+
+	The output stream is opened on the first chunk, so time-to-first-audio is the time
+	from construction (or `started_at`) until the first write. `stream` lets callers
+	substitute any object with start/write/stop/abort/close, e.g. a null sink in tests.
+	abort() may be called from another thread while write() is blocked on the device.
+	"""
+
+	def __init__(self, sample_rate: int, device: Optional[int] = None, stream=None, started_at: Optional[float] = None):
+		self.sample_rate = sample_rate
+		self.device = device
+		self._stream = stream
+		self._carry = b""
+		self.started_at = started_at if started_at is not None else time.perf_counter()
+		self.first_audio_at: Optional[float] = None
+		self.bytes_written = 0
+		self.aborted = False
+		self._writing = False
+		self._lock = threading.Lock()
+
+	def _open(self):
+		if self._stream is None:
+			self._stream = sd.RawOutputStream(samplerate=self.sample_rate, channels=1, dtype="int16", device=self.device)
+		self._stream.start()
+
+	def write(self, chunk: bytes):
+		if self._carry:
+			chunk, self._carry = self._carry + chunk, b""
+		# Network chunks need not align to 2-byte samples; hold the odd byte for the next one
+		if len(chunk) % 2:
+			chunk, self._carry = chunk[:-1], chunk[-1:]
+		if not chunk:
+			return
+		with self._lock:
+			if self.aborted:
+				return
+			if self.first_audio_at is None:
+				self._open()
+				self.first_audio_at = time.perf_counter()
+			self._writing = True
+		try:
+			self._stream.write(chunk)
+			self.bytes_written += len(chunk)
+		except Exception:
+			# abort() stopped the stream under this write
+			if not self.aborted:
+				raise
+		finally:
+			with self._lock:
+				self._writing = False
+				release = self.aborted
+			if release:
+				self._stream.close()
+
+	def close(self):
+		"""Let buffered audio play out, then release the device."""
+		if self._stream is not None and self.first_audio_at is not None and not self.aborted:
+			self._stream.stop()
+			self._stream.close()
+
+	def abort(self):
+		"""Stop immediately, discarding buffered audio; later writes are ignored."""
+		with self._lock:
+			if self.aborted:
+				return
+			self.aborted = True
+			if self._stream is None or self.first_audio_at is None:
+				return
+			self._stream.abort()
+			if self._writing:
+				return  # the blocked write() releases the stream when it returns
+		self._stream.close()
+
+	def stats(self) -> PlaybackStats:
+		ttfa = None if self.first_audio_at is None else self.first_audio_at - self.started_at
+		return PlaybackStats(
+			time_to_first_audio_s=ttfa,
+			audio_s=self.bytes_written / 2 / self.sample_rate,
+			total_s=time.perf_counter() - self.started_at,
+		)
+
+
+def play_pcm16_stream(
+	chunks: Iterable[bytes],
+	sample_rate: int,
+	device: Optional[int] = None,
+	stream=None,
+	started_at: Optional[float] = None,
+) -> PlaybackStats:
+	"""Play PCM chunks from a generator as they are produced and report time-to-first-audio."""
+	player = PCMStreamPlayer(sample_rate, device=device, stream=stream, started_at=started_at)
+	try:
+		for chunk in chunks:
+			player.write(chunk)
+	except BaseException:
+		player.abort()
+		raise
+	player.close()
+	return player.stats()
@@ -0,0 +1,347 @@
+"""WebSocket server: many concurrent translation sessions in one process.
+
+Each caller opens a WebSocket on /ws and gets a session of its own: VAD state,
+target language, voice and accent. Every session runs its own Pipeline, but they
+all share one WhisperASR (so one set of loaded models), the translation service
+and one set of worker pools, so load from all callers queues on the same workers.
+
+Protocol:
+	client -> {"type": "start", "target_lang": "es", "voice": "female", "accent": "us",
+	           "native_style": false, "barge_in": false}
+	client -> binary 16-bit mono PCM at AUDIO_SAMPLE_RATE, any chunk size
+	client -> {"type": "stop"}   (drains what was said, then closes)
+	server -> {"type": "ready", "session": 7, "sample_rate": 16000}  (rate of the speech below)
+	server -> {"type": "busy", "reason": "..."}   (admission refused, then close)
+	server -> {"type": "transcript", "id": 3, "text": "...", "language": "en", "final": true}
+	server -> {"type": "translation", "id": 3, "text": "..."}
+	server -> binary 16-bit mono PCM speech, {"type": "audio_abort"} after a barge-in
+"""
+import asyncio
+import itertools
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from aiohttp import WSMsgType, web
+
+from .asr_whisper import WhisperASR
+from .audio import VADRecorder
+from .audio_journal import get_audio_journal
+from .config import AppConfig
+from .pipeline import Pipeline, Utterance
+from .tracing import get_tracer
+
+
+_session_ids = itertools.count(1)
+
+
+class ClientRecorder(VADRecorder):
+	"""VADRecorder fed by a network client through feed() instead of the microphone."""
+
+	def start(self):
+		pass
+
+
+class IngestLimiter:
+	"""Token bucket over seconds of audio: at most `ratio` x real time, plus `burst_s`."""
+
+	def __init__(self, ratio: float, burst_s: float):
+		self.ratio = ratio
+		self.burst_s = burst_s
+		self._tokens = burst_s
+		self._at = time.monotonic()
+
+	def allow(self, seconds: float) -> bool:
+		now = time.monotonic()
+		self._tokens = min(self.burst_s, self._tokens + (now - self._at) * self.ratio)
+		self._at = now
+		if seconds > self._tokens:
+			return False
+		self._tokens -= seconds
+		return True
+
+
+class _ClientSink:
+	"""Stands in for PCMStreamPlayer: synthesized audio goes to the client instead of a device."""
+
+	def __init__(self, session: "Session"):
+		self.session = session
+
+	def write(self, chunk: bytes):
+		self.session.send_threadsafe(chunk)
+
+	def close(self):
+		pass
+
+	def abort(self):
+		self.session.send_threadsafe({"type": "audio_abort"})
+
+
+class Session:
+	def __init__(self, server: "TranslationServer", ws: web.WebSocketResponse, settings: dict):
+		config = server.config
+		self.server = server
+		self.id = next(_session_ids)
+		self.ws = ws
+		self.loop = asyncio.get_running_loop()
+		self.outbox: asyncio.Queue = asyncio.Queue()
+		self.target_lang = settings.get("target_lang") or config.default_target_lang
+		self.voice = settings.get("voice") or config.default_voice
+		self.accent = settings.get("accent") or config.default_accent
+		self.native_style = bool(settings.get("native_style", False))
+		self.limiter = IngestLimiter(config.server_ingest_ratio, config.server_ingest_burst_s)
+		self.bytes_per_second = config.sample_rate * 2
+		self.received_s = 0.0
+		self.dropped_s = 0.0
+		self.started_at = time.monotonic()
+		self.recorder = ClientRecorder(config)
+		self.pipeline = Pipeline(
+			config,
+			server.asr,
+			self._translate,
+			recorder=self.recorder,
+			player_factory=lambda rate: _ClientSink(self),
+			barge_in=bool(settings.get("barge_in", False)),
+			on_transcript=self._on_transcript,
+			on_translation=self._on_translation,
+			tracer=server.tracer,
+			executors=server.executors,
+			**server.speech_options(self),
+		)
+
+	def _translate(self, text: str, source_lang: Optional[str]) -> str:
+		return self.server.translate(text, self.target_lang, source_lang)
+
+	def _on_transcript(self, utt: Utterance):
+		self.send_threadsafe({"type": "transcript", "id": utt.id, "text": utt.text, "language": utt.language, "final": utt.is_final})
+
+	def _on_translation(self, utt: Utterance):
+		self.send_threadsafe({"type": "translation", "id": utt.id, "text": utt.translation})
+
+	def send_threadsafe(self, message):
+		self.loop.call_soon_threadsafe(self.outbox.put_nowait, message)
+
+	def feed(self, pcm16: bytes) -> bool:
+		seconds = len(pcm16) / self.bytes_per_second
+		if not self.limiter.allow(seconds):
+			self.dropped_s += seconds
+			return False
+		# Called on the event loop, so a session whose pipeline has backed up drops audio instead of waiting
+		if not self.recorder.feed(pcm16, block=False):
+			self.dropped_s += seconds
+			return False
+		self.received_s += seconds
+		return True
+
+	async def sender(self):
+		while True:
+			message = await self.outbox.get()
+			if message is None:
+				break
+			if self.ws.closed:
+				continue
+			try:
+				if isinstance(message, bytes):
+					await self.ws.send_bytes(message)
+				else:
+					await self.ws.send_json(message)
+			except ConnectionError:
+				pass
+
+	def stats(self) -> dict:
+		return {
+			"session": self.id,
+			"target_lang": self.target_lang,
+			"age_s": round(time.monotonic() - self.started_at, 1),
+			"received_s": round(self.received_s, 1),
+			"dropped_s": round(self.dropped_s, 1),
+			"backlog": self.pipeline.backlog_stats(),
+		}
+
+
+def _parse_message(data: str) -> Optional[dict]:
+	"""A client's text frame as a JSON object, or None when it is not one."""
+	try:
+		message = json.loads(data)
+	except ValueError:
+		return None
+	return message if isinstance(message, dict) else None
+
+
+class TranslationServer:
+	"""Accepts sessions up to SERVER_MAX_SESSIONS and runs each as a Pipeline on shared resources."""
+
+	def __init__(self, config: AppConfig, tts: str = "none", offline: bool = False):
+		self.config = config
+		self.tts = tts
+		self.offline = offline
+		self.asr = WhisperASR(config)
+		self.tracer = get_tracer(config)
+		max_sessions = max(1, config.server_max_sessions)
+		self.executors = {
+			# Each session's VAD loop holds a segment thread while it is connected, and its
+			# playback stage a playback thread while it speaks
+			"segment": ThreadPoolExecutor(max_sessions, thread_name_prefix="segment"),
+			# With batching these threads only wait on the scheduler, one per segment it may batch
+			"asr": ThreadPoolExecutor(max(1, config.asr_workers, config.asr_batch_size), thread_name_prefix="asr"),
+			"translate": ThreadPoolExecutor(max(1, config.translate_workers), thread_name_prefix="translate"),
+			"tts": ThreadPoolExecutor(max(1, config.server_tts_workers), thread_name_prefix="tts"),
+			"playback": ThreadPoolExecutor(max_sessions, thread_name_prefix="playback"),
+		}
+		self.sessions: dict[int, Session] = {}
+		self.accepted = 0
+		self.rejected = 0
+
+	# --- shared backends, bound per session ---
+
+	def speech_options(self, session: Session) -> dict:
+		"""Pipeline TTS arguments for a session's voice settings."""
+		options = {"voice": session.voice, "accent": session.accent, "native_style": session.native_style}
+		if self.tts == "local" or self.offline:
+			from .local_backends import LOCAL_TTS_SAMPLE_RATE, local_tts_stream
+			return {"synth_fn": local_tts_stream, "sample_rate": LOCAL_TTS_SAMPLE_RATE}
+		if self.tts == "elevenlabs":
+			from .tts_elevenlabs import SAMPLE_RATE, speech_chunks_elevenlabs
+			return {"synth_fn": lambda text: speech_chunks_elevenlabs(text, self.config, **options), "sample_rate": SAMPLE_RATE}
+		if self.tts == "azure":
+			from .tts_azure import SAMPLE_RATE, speech_chunks_azure
+			return {"synth_fn": lambda text: speech_chunks_azure(text, self.config, **options), "sample_rate": SAMPLE_RATE}
+		return {"speak_fn": lambda text: None}
+
+	def translate(self, text: str, target_lang: str, source_lang: Optional[str]) -> str:
+		if self.offline:
+			from .local_backends import local_translate
+			return local_translate(text, target_lang, source_lang)
+		from .translate import translate_text
+		return translate_text(text, target_lang, self.config, source_lang=source_lang)
+
+	def translation_batch_stats(self) -> Optional[dict]:
+		if self.offline:
+			return None
+		from .translate import get_translation_service
+		batcher = get_translation_service(self.config).batcher
+		return batcher.stats() if batcher is not None else None
+
+	# --- admission ---
+
+	def admit(self) -> Optional[str]:
+		"""None if a new session may start, otherwise why not."""
+		if len(self.sessions) >= self.config.server_max_sessions:
+			return f"at capacity ({self.config.server_max_sessions} sessions)"
+		return None
+
+	# --- handlers ---
+
+	async def handle_ws(self, request: web.Request) -> web.WebSocketResponse:
+		ws = web.WebSocketResponse(heartbeat=30)
+		await ws.prepare(request)
+		try:
+			first = await ws.receive(timeout=10)
+		except asyncio.TimeoutError:
+			await ws.close()
+			return ws
+		settings = _parse_message(first.data) if first.type == WSMsgType.TEXT else None
+		if settings is None or settings.get("type") != "start":
+			await ws.send_json({"type": "error", "reason": "expected a start message"})
+			await ws.close()
+			return ws
+		reason = self.admit()
+		if reason is not None:
+			self.rejected += 1
+			await ws.send_json({"type": "busy", "reason": reason})
+			await ws.close()
+			return ws
+
+		session = Session(self, ws, settings)
+		self.sessions[session.id] = session
+		self.accepted += 1
+		session.outbox.put_nowait({"type": "ready", "session": session.id, "sample_rate": session.pipeline.sample_rate or 0})
+		sender = asyncio.create_task(session.sender())
+		runner = asyncio.create_task(session.pipeline.run())
+		try:
+			async for msg in ws:
+				if msg.type == WSMsgType.BINARY:
+					session.feed(msg.data)
+				elif msg.type == WSMsgType.TEXT:
+					message = _parse_message(msg.data)
+					if message is None:
+						# Queued behind any audio still going out; the session drains and closes
+						session.outbox.put_nowait({"type": "error", "reason": "expected a JSON object"})
+						break
+					if message.get("type") == "stop":
+						break
+				elif msg.type == WSMsgType.ERROR:
+					break
+		finally:
+			# Let what the caller already said come out the other end before closing
+			try:
+				session.pipeline.stop()
+				done, _ = await asyncio.wait({runner}, timeout=self.config.pipeline_drain_timeout_s)
+				if not done:
+					runner.cancel()
+					await asyncio.wait({runner})
+				elif runner.exception() is not None:
+					print(f"Session {session.id} failed: {runner.exception()}")
+				session.outbox.put_nowait(None)
+				await sender
+			finally:
+				# Free the slot even if the sender failed, or the session counts against SERVER_MAX_SESSIONS for good
+				self.sessions.pop(session.id, None)
+				await ws.close()
+		return ws
+
+	async def handle_health(self, request: web.Request) -> web.Response:
+		journal = get_audio_journal(self.config)
+		return web.json_response({
+			"sessions": [s.stats() for s in self.sessions.values()],
+			"max_sessions": self.config.server_max_sessions,
+			"accepted": self.accepted,
+			"rejected": self.rejected,
+			"asr": self.asr.startup_stats(),
+			"asr_batching": self.asr.batch_stats(),
+			"translation_batching": self.translation_batch_stats(),
+			"journal": journal.stats() if journal is not None else None,
+		})
+
+	async def handle_metrics(self, request: web.Request) -> web.Response:
+		lines = []
+		if self.tracer.enabled:
+			lines.append(self.tracer.prometheus().rstrip("\n"))
+		lines += [
+			"# TYPE voice_translator_sessions gauge",
+			f"voice_translator_sessions {len(self.sessions)}",
+			"# TYPE voice_translator_sessions_rejected_total counter",
+			f"voice_translator_sessions_rejected_total {self.rejected}",
+		]
+		return web.Response(text="\n".join(lines) + "\n", content_type="text/plain")
+
+	async def on_shutdown(self, app: web.Application):
+		for session in list(self.sessions.values()):
+			await session.ws.close()
+
+	async def on_cleanup(self, app: web.Application):
+		for executor in self.executors.values():
+			executor.shutdown(wait=False, cancel_futures=True)
+		self.asr.close()
+		self.tracer.close()
+
+	def app(self) -> web.Application:
+		app = web.Application()
+		app.add_routes([
+			web.get("/ws", self.handle_ws),
+			web.get("/health", self.handle_health),
+			web.get("/metrics", self.handle_metrics),
+		])
+		app.on_shutdown.append(self.on_shutdown)
+		app.on_cleanup.append(self.on_cleanup)
+		return app
+
+
+def serve(config: AppConfig, host: str = "0.0.0.0", port: int = 8765, tts: str = "none", offline: bool = False):
+	server = TranslationServer(config, tts=tts, offline=offline)
+	server.tracer.start()
+	print(f"Serving on ws://{host}:{port}/ws (max {config.server_max_sessions} sessions, tts={tts}, offline={offline})")
+	if config.asr_batch_size <= 1:
+		print("ASR_BATCH_SIZE is 1: each session's segments are transcribed on their own; set it above 1 to batch Whisper across sessions")
+	web.run_app(server.app(), host=host, port=port, print=None)
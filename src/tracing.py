@@ -0,0 +1,213 @@
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+from .config import AppConfig
+
+
+# Events stamped on each utterance, in pipeline order
+EVENTS = ("capture", "vad_end", "asr_done", "translate_done", "tts_first_byte", "playback_start", "playback_end")
+
+# Reported stages: name -> (from event, to event)
+STAGES = {
+	"vad": ("capture", "vad_end"),
+	"asr": ("vad_end", "asr_done"),
+	"translate": ("asr_done", "translate_done"),
+	"tts_first_byte": ("translate_done", "tts_first_byte"),
+	"playback_wait": ("tts_first_byte", "playback_start"),
+	"playback": ("playback_start", "playback_end"),
+	"end_to_end": ("vad_end", "playback_start"),
+}
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyHistogram:
+	"""Running count/sum plus the most recent `window` samples for percentiles."""
+
+	def __init__(self, window: int = 2048):
+		self.samples: deque[float] = deque(maxlen=window)
+		self.count = 0
+		self.total = 0.0
+
+	def add(self, value: float):
+		self.samples.append(value)
+		self.count += 1
+		self.total += value
+
+	def quantiles(self, qs=QUANTILES) -> dict[float, float]:
+		if not self.samples:
+			return {}
+		ordered = sorted(self.samples)
+		last = len(ordered) - 1
+		return {q: ordered[min(last, int(round(q * last)))] for q in qs}
+
+
+class LatencyTracer:
+	"""Timestamps each utterance as it moves through the pipeline.
+
+	mark() records when an event happened; finish() closes the utterance, adds its
+	stage durations to the histograms and, with `trace_path`, appends one JSON line
+	holding every timestamp. start() launches the periodic summary and, with
+	`prometheus_port`, a /metrics endpoint in the Prometheus text format.
+	"""
+
+	enabled = True
+
+	def __init__(
+		self,
+		trace_path: Optional[str] = None,
+		summary_interval_s: float = 0.0,
+		prometheus_port: int = 0,
+		window: int = 2048,
+		max_open: int = 4096,
+		printer: Callable[[str], None] = print,
+	):
+		self.trace_path = trace_path
+		self.summary_interval_s = summary_interval_s
+		self.prometheus_port = prometheus_port
+		self._printer = printer
+		self._lock = threading.Lock()
+		self._open: dict[int, dict[str, float]] = {}
+		# Utterances that never reach finish() (e.g. lost in a failure path) must not pile up
+		self.max_open = max_open
+		self.histograms = {stage: LatencyHistogram(window) for stage in STAGES}
+		self.outcomes: dict[str, int] = {}
+		self._trace = open(trace_path, "a", encoding="utf-8") if trace_path else None
+		self._epoch = time.monotonic()
+		self._wall_epoch = time.time()
+		self._stop = threading.Event()
+		self._reporter: Optional[threading.Thread] = None
+		self._server: Optional[ThreadingHTTPServer] = None
+
+	def mark(self, utterance_id: int, event: str, at: Optional[float] = None):
+		at = time.monotonic() if at is None else at
+		with self._lock:
+			events = self._open.get(utterance_id)
+			if events is None:
+				if len(self._open) >= self.max_open:
+					del self._open[next(iter(self._open))]
+					self.outcomes["expired"] = self.outcomes.get("expired", 0) + 1
+				events = self._open[utterance_id] = {}
+			# First stamp wins, so a retried or repeated step does not move the event
+			events.setdefault(event, at)
+
+	def finish(self, utterance_id: int, outcome: str = "spoken"):
+		with self._lock:
+			events = self._open.pop(utterance_id, None)
+			if events is None:
+				return
+			self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+			for stage, (start, end) in STAGES.items():
+				if start in events and end in events:
+					self.histograms[stage].add(events[end] - events[start])
+			if self._trace is not None:
+				# Events are offsets from the first one; t0 is that moment as a Unix time
+				base = events.get("capture", min(events.values()))
+				record = {"id": utterance_id, "outcome": outcome, "t0": round(self._wall_epoch + base - self._epoch, 6)}
+				record.update({event: round(events[event] - base, 6) for event in EVENTS if event in events})
+				self._trace.write(json.dumps(record) + "\n")
+				self._trace.flush()
+
+	def summary(self) -> dict:
+		with self._lock:
+			return {
+				stage: {"count": h.count, **{f"p{int(q * 100)}": v for q, v in h.quantiles().items()}}
+				for stage, h in self.histograms.items()
+			}
+
+	def format_summary(self) -> str:
+		lines = []
+		for stage, s in self.summary().items():
+			if not s["count"]:
+				continue
+			lines.append(f"{stage:>15}: n={s['count']:<5} p50={s['p50'] * 1000:7.1f} ms  p95={s['p95'] * 1000:7.1f} ms  p99={s['p99'] * 1000:7.1f} ms")
+		return "\n".join(lines) or "no completed utterances yet"
+
+	def prometheus(self) -> str:
+		name = "voice_translator_stage_seconds"
+		lines = [f"# HELP {name} Per-stage latency of translated utterances.", f"# TYPE {name} summary"]
+		with self._lock:
+			for stage, h in self.histograms.items():
+				for q, v in h.quantiles().items():
+					lines.append(f'{name}{{stage="{stage}",quantile="{q}"}} {v:.6f}')
+				lines.append(f'{name}_sum{{stage="{stage}"}} {h.total:.6f}')
+				lines.append(f'{name}_count{{stage="{stage}"}} {h.count}')
+			lines.append("# TYPE voice_translator_utterances_total counter")
+			for outcome, n in sorted(self.outcomes.items()):
+				lines.append(f'voice_translator_utterances_total{{outcome="{outcome}"}} {n}')
+		return "\n".join(lines) + "\n"
+
+	def start(self):
+		if self.summary_interval_s > 0 and self._reporter is None:
+			self._reporter = threading.Thread(target=self._report_loop, daemon=True)
+			self._reporter.start()
+		if self.prometheus_port and self._server is None:
+			self._server = ThreadingHTTPServer(("0.0.0.0", self.prometheus_port), _metrics_handler(self))
+			threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+	def _report_loop(self):
+		while not self._stop.wait(self.summary_interval_s):
+			self._printer(self.format_summary())
+
+	def close(self):
+		self._stop.set()
+		if self._server is not None:
+			self._server.shutdown()
+			self._server.server_close()
+			self._server = None
+		with self._lock:
+			if self._trace is not None:
+				self._trace.close()
+				self._trace = None
+
+
+class NullTracer:
+	"""Stand-in used when tracing is off; every call is a no-op."""
+
+	enabled = False
+
+	def mark(self, utterance_id: int, event: str, at: Optional[float] = None):
+		pass
+
+	def finish(self, utterance_id: int, outcome: str = "spoken"):
+		pass
+
+	def start(self):
+		pass
+
+	def close(self):
+		pass
+
+
+def _metrics_handler(tracer: LatencyTracer):
+	class MetricsHandler(BaseHTTPRequestHandler):
+		def do_GET(self):
+			if self.path.split("?")[0] != "/metrics":
+				self.send_error(404)
+				return
+			body = tracer.prometheus().encode("utf-8")
+			self.send_response(200)
+			self.send_header("Content-Type", "text/plain; version=0.0.4")
+			self.send_header("Content-Length", str(len(body)))
+			self.end_headers()
+			self.wfile.write(body)
+
+		def log_message(self, format, *args):
+			pass
+
+	return MetricsHandler
+
+
+def get_tracer(config: AppConfig):
+	"""LatencyTracer configured from AppConfig, or a NullTracer when TRACE_ENABLED is off."""
+	if not config.trace_enabled:
+		return NullTracer()
+	return LatencyTracer(
+		trace_path=config.trace_path or None,
+		summary_interval_s=config.trace_summary_s,
+		prometheus_port=config.metrics_port,
+	)
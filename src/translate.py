@@ -1,24 +1,299 @@
+import threading
+import time
 from typing import Optional
 
 from .config import AppConfig
+from .translate_batch import TranslationBatcher
+from .translate_local import UnsupportedPair
+from .translation_cache import TranslationCache, get_translation_cache
 
 
-def translate_text(text: str, target_lang: str, config: AppConfig, source_lang: Optional[str] = None) -> str:
-	if not text.strip():
-		return text
-	# Prefer DeepL if key exists
-	if config.deepl_api_key:
-		try:
-			import deepl
-			translator = deepl.Translator(config.deepl_api_key)
-			result = translator.translate_text(text, target_lang=target_lang.upper())
-			return result.text
-		except Exception:
-			pass
-	# Fallback to deep-translator (Google Translate backend)
-	try:
+class CircuitBreaker:
+	"""Skip a backend after repeated failures instead of paying its timeout on every utterance.
+
+	closed: calls go through. open: after `failure_threshold` consecutive failures calls are
+	refused for `reset_timeout_s`. half-open: one trial call is let through; success closes
+	the breaker, failure re-opens it.
+	"""
+
+	def __init__(self, failure_threshold: int = 3, reset_timeout_s: float = 30.0):
+		self.failure_threshold = max(1, failure_threshold)
+		self.reset_timeout_s = reset_timeout_s
+		self._failures = 0
+		self._opened_at: Optional[float] = None
+		self._trial_in_flight = False
+		self._lock = threading.Lock()
+
+	@property
+	def state(self) -> str:
+		with self._lock:
+			if self._opened_at is None:
+				return "closed"
+			if time.monotonic() - self._opened_at >= self.reset_timeout_s:
+				return "half-open"
+			return "open"
+
+	def allow(self) -> bool:
+		with self._lock:
+			if self._opened_at is None:
+				return True
+			if time.monotonic() - self._opened_at < self.reset_timeout_s or self._trial_in_flight:
+				return False
+			self._trial_in_flight = True
+			return True
+
+	def release(self):
+		"""End a half-open trial that neither succeeded nor failed."""
+		with self._lock:
+			self._trial_in_flight = False
+
+	def record_success(self):
+		with self._lock:
+			self._failures = 0
+			self._opened_at = None
+			self._trial_in_flight = False
+
+	def record_failure(self):
+		with self._lock:
+			self._failures += 1
+			self._trial_in_flight = False
+			if self._opened_at is not None or self._failures >= self.failure_threshold:
+				self._opened_at = time.monotonic()
+
+
+# Source languages DeepL accepts; for anything else it is left to detect the language itself
+_DEEPL_SOURCES = {
+	"AR", "BG", "CS", "DA", "DE", "EL", "EN", "ES", "ET", "FI", "FR", "HU", "ID", "IT", "JA", "KO",
+	"LT", "LV", "NB", "NL", "PL", "PT", "RO", "RU", "SK", "SL", "SV", "TR", "UK", "ZH",
+}
+# Whisper codes that Google spells differently
+_GOOGLE_ALIASES = {"zh": "zh-CN", "he": "iw", "nn": "no"}
+
+
+def _base_code(code: str) -> str:
+	return code.replace("_", "-").split("-")[0].lower()
+
+
+class DeepLBackend:
+	name = "deepl"
+
+	def __init__(self, api_key: str, server_url: Optional[str] = None):
+		import deepl
+		# deepl.Translator keeps one requests.Session, so reusing it reuses TLS connections
+		self._translator = deepl.Translator(api_key, server_url=server_url)
+
+	@staticmethod
+	def _source(source_lang: Optional[str]) -> Optional[str]:
+		"""DeepL's code for the detected language, or None to let DeepL detect one it does not list."""
+		if not source_lang:
+			return None
+		code = _base_code(source_lang).upper()
+		code = "NB" if code in ("NO", "NN") else code
+		return code if code in _DEEPL_SOURCES else None
+
+	def translate(self, text: str, target_lang: str, source_lang: Optional[str] = None) -> str:
+		return self._translator.translate_text(text, source_lang=self._source(source_lang), target_lang=target_lang.upper()).text
+
+	def translate_batch(self, texts: list[str], target_lang: str, source_lang: Optional[str] = None) -> list[str]:
+		# One request carries every text; results come back in the same order
+		results = self._translator.translate_text(texts, source_lang=self._source(source_lang), target_lang=target_lang.upper())
+		return [r.text for r in results]
+
+
+class _PooledRequests:
+	"""Stand-in for the `requests` module inside deep_translator.google.
+
+	deep-translator calls the module-level requests.get(), which opens a new connection
+	per sentence; routing it through one Session gives keep-alive and a timeout.
+	"""
+
+	def __init__(self, timeout_s: float):
+		import requests
+		self._requests = requests
+		self._session = requests.Session()
+		adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+		self._session.mount("https://", adapter)
+		self._session.mount("http://", adapter)
+		self._timeout_s = timeout_s
+
+	def get(self, url, **kwargs):
+		kwargs.setdefault("timeout", self._timeout_s)
+		return self._session.get(url, **kwargs)
+
+	def __getattr__(self, name):
+		return getattr(self._requests, name)
+
+
+class GoogleBackend:
+	name = "google"
+
+	def __init__(self, timeout_s: float):
+		import deep_translator.google as google
 		from deep_translator import GoogleTranslator
-		gt = GoogleTranslator(source="auto", target=target_lang)
-		return gt.translate(text)
-	except Exception:
-		return text
+		if not isinstance(google.requests, _PooledRequests):
+			google.requests = _PooledRequests(timeout_s)
+		self._cls = GoogleTranslator
+		self._codes = set(GoogleTranslator(source="auto", target="en").get_supported_languages(as_dict=True).values())
+		# translate() writes the text into the translator's own request params, so a
+		# translator is never shared between threads; only the pooled session is
+		self._local = threading.local()
+
+	def _source(self, source_lang: Optional[str]) -> str:
+		"""Google's code for the detected language, or "auto" for one it does not list."""
+		if not source_lang:
+			return "auto"
+		code = _base_code(source_lang)
+		code = _GOOGLE_ALIASES.get(code, code)
+		return code if code in self._codes else "auto"
+
+	def _translator(self, target_lang: str, source_lang: Optional[str]):
+		translators = getattr(self._local, "translators", None)
+		if translators is None:
+			translators = self._local.translators = {}
+		key = (self._source(source_lang), target_lang)
+		gt = translators.get(key)
+		if gt is None:
+			gt = translators[key] = self._cls(source=key[0], target=target_lang)
+		return gt
+
+	def translate(self, text: str, target_lang: str, source_lang: Optional[str] = None) -> str:
+		return self._translator(target_lang, source_lang).translate(text)
+
+	def translate_batch(self, texts: list[str], target_lang: str, source_lang: Optional[str] = None) -> list[str]:
+		# The web endpoint takes one text, but keeps line breaks: send the batch as lines
+		# and fall back to one request per text if the lines do not come back one-to-one
+		if not any("\n" in t for t in texts):
+			lines = (self.translate("\n".join(texts), target_lang, source_lang) or "").split("\n")
+			if len(lines) == len(texts):
+				return [line.strip() for line in lines]
+		return [self.translate(t, target_lang, source_lang) for t in texts]
+
+
+TRANSLATE_BACKENDS = ("deepl", "google", "local")
+
+
+def create_translation_backend(name: str, config: AppConfig):
+	if name == "deepl":
+		return DeepLBackend(config.deepl_api_key, config.deepl_server_url)
+	if name == "google":
+		return GoogleBackend(config.translate_timeout_s)
+	from .translate_local import LocalBackend
+	return LocalBackend(config)
+
+
+class TranslationService:
+	"""Long-lived, thread-safe translator built once from AppConfig.
+
+	Backends are tried in TRANSLATE_BACKENDS order (DeepL only when a key is set), each
+	behind its own circuit breaker, with the translation cache in front of them. With
+	TRANSLATE_BATCH_SIZE above 1, cache misses from concurrent callers are micro-batched
+	into one backend request per language pair.
+	"""
+
+	def __init__(self, config: AppConfig):
+		self.config = config
+		self.cache: Optional[TranslationCache] = get_translation_cache(config)
+		self.backends = []
+		for name in [n.strip() for n in config.translate_backends.split(",") if n.strip()]:
+			if name not in TRANSLATE_BACKENDS:
+				raise ValueError(f"Unknown translation backend: {name} (expected some of {', '.join(TRANSLATE_BACKENDS)})")
+			if name == "deepl" and not config.deepl_api_key:
+				continue
+			try:
+				self.backends.append(create_translation_backend(name, config))
+			except Exception as e:
+				print(f"Translation backend {name} unavailable: {e}")
+		self.untranslated = 0
+		self.breakers = {
+			b.name: CircuitBreaker(config.translate_breaker_failures, config.translate_breaker_reset_s) for b in self.backends
+		}
+		self.batcher: Optional[TranslationBatcher] = None
+		if config.translate_batch_size > 1:
+			self.batcher = TranslationBatcher(
+				self._translate_uncached, config.translate_batch_size, config.translate_batch_wait_ms, config.translate_workers
+			)
+
+	def translate(self, text: str, target_lang: str, source_lang: Optional[str] = None) -> str:
+		# Nothing to translate when the speaker already talks in the target language
+		if not text.strip() or same_language(source_lang, target_lang):
+			return text
+		if self.cache is not None and self.backends:
+			# Stored under whichever backend answered, so a fallback's translations are found too
+			cached = self.cache.get_first(source_lang, target_lang, [b.name for b in self.backends], text)
+			if cached is not None:
+				return cached
+		if self.batcher is not None:
+			return self.batcher.translate(text, target_lang, source_lang)
+		return self._translate_uncached([text], target_lang, source_lang)[0]
+
+	def _translate_uncached(self, texts: list[str], target_lang: str, source_lang: Optional[str]) -> list[str]:
+		"""One backend request for all `texts`, falling through the backends; untranslated if all fail."""
+		for backend in self.backends:
+			breaker = self.breakers[backend.name]
+			if not breaker.allow():
+				continue
+			try:
+				if len(texts) == 1:
+					translated = [backend.translate(texts[0], target_lang, source_lang)]
+				else:
+					translated = backend.translate_batch(texts, target_lang, source_lang)
+			except UnsupportedPair:
+				# The backend works, it just has no model for this pair
+				breaker.release()
+				continue
+			except Exception:
+				breaker.record_failure()
+				continue
+			breaker.record_success()
+			if self.cache is not None:
+				for text, result in zip(texts, translated):
+					self.cache.put(source_lang, target_lang, backend.name, text, result)
+			return translated
+		self.untranslated += len(texts)
+		if self.untranslated == len(texts):
+			print(f"No translation backend available for {source_lang or 'auto'}->{target_lang}; passing text through untranslated")
+		return list(texts)
+
+
+_services: dict[tuple, TranslationService] = {}
+_services_lock = threading.Lock()
+
+
+def get_translation_service(config: AppConfig) -> TranslationService:
+	"""One service per distinct backend configuration, shared by every caller in the process."""
+	key = (
+		config.deepl_api_key,
+		config.translate_timeout_s,
+		config.translate_breaker_failures,
+		config.translate_breaker_reset_s,
+		config.translation_cache_path,
+		config.translation_cache_size,
+		config.translation_cache_memory,
+		config.translation_cache_ttl_s,
+		config.deepl_server_url,
+		config.translate_batch_size,
+		config.translate_batch_wait_ms,
+		config.translate_workers,
+		config.translate_backends,
+		config.local_mt_engine,
+		config.local_mt_dir,
+		config.local_mt_memory_mb,
+		config.local_mt_beam,
+		config.local_mt_threads,
+	)
+	with _services_lock:
+		service = _services.get(key)
+		if service is None:
+			service = _services[key] = TranslationService(config)
+		return service
+
+
+def same_language(a: Optional[str], b: Optional[str]) -> bool:
+	"""True when two codes name the same language, ignoring region and case ("en-US" and "EN")."""
+	if not a or not b:
+		return False
+	return _base_code(a) == _base_code(b)
+
+
+def translate_text(text: str, target_lang: str, config: AppConfig, source_lang: Optional[str] = None) -> str:
+	return get_translation_service(config).translate(text, target_lang, source_lang)
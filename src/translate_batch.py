@@ -0,0 +1,141 @@
+"""Micro-batching of translation requests, and sentence boundaries for holding fragments.
+
+Callers on any thread submit() one text and get a Future. The batcher keeps a queue
+per (source, target) pair and sends a queue as one request through `translate_many`
+once it holds `max_batch` texts or its oldest text has waited `max_wait_ms`, so
+utterances from concurrent streams that are ready at about the same time share a
+round trip. Each translation is routed back to the Future of the text it came from.
+
+ends_sentence() is what the pipeline uses to hold partial ASR fragments back until
+the rest of their sentence arrives, so a sentence is translated whole.
+"""
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Optional
+
+
+# Terminal punctuation (Latin, CJK, Devanagari, Arabic, Greek question mark), optionally closed by quotes or brackets
+_SENTENCE_END = re.compile(r"[.!?…。！？।؟\u037e]['\"”’)\]»」』]*$")
+# U+037E normalizes to ";", which is what Whisper writes for a Greek question
+_GREEK_SENTENCE_END = re.compile(r"[.!?…;\u037e]['\"”’)\]»」』]*$")
+
+
+def ends_sentence(text: str, language: Optional[str] = None) -> bool:
+	"""Whether `text` ends a sentence; for Greek (`el`) a trailing ";" is a question mark."""
+	pattern = _GREEK_SENTENCE_END if language == "el" else _SENTENCE_END
+	return bool(pattern.search(text.strip()))
+
+
+class TranslationBatcher:
+	"""Groups texts submitted from many threads into one request per language pair.
+
+	`translate_many(texts, target_lang, source_lang)` returns one translation per text
+	in order. Up to `workers` batches (for different pairs, or a pair whose queue
+	refilled) are in flight at once.
+	"""
+
+	def __init__(
+		self,
+		translate_many: Callable[[list[str], str, Optional[str]], list[str]],
+		max_batch: int = 16,
+		max_wait_ms: float = 15.0,
+		workers: int = 4,
+	):
+		self._translate_many = translate_many
+		self.max_batch = max(1, max_batch)
+		self.max_wait_s = max(0.0, max_wait_ms) / 1000
+		self._pending: dict[tuple[Optional[str], str], Deque[tuple[str, Future, float]]] = {}
+		self._cond = threading.Condition()
+		self._closed = False
+		self._executor = ThreadPoolExecutor(max(1, workers), thread_name_prefix="translate-batch")
+		# Metrics
+		self.texts = 0
+		self.batches = 0
+		self.largest_batch = 0
+		self._thread = threading.Thread(target=self._run, name="translate-batcher", daemon=True)
+		self._thread.start()
+
+	def submit(self, text: str, target_lang: str, source_lang: Optional[str] = None) -> Future:
+		future: Future = Future()
+		with self._cond:
+			if self._closed:
+				raise RuntimeError("TranslationBatcher is closed")
+			self._pending.setdefault((source_lang, target_lang), deque()).append((text, future, time.monotonic()))
+			self._cond.notify()
+		return future
+
+	def translate(self, text: str, target_lang: str, source_lang: Optional[str] = None) -> str:
+		return self.submit(text, target_lang, source_lang).result()
+
+	def _due(self, now: float) -> tuple[list, Optional[float]]:
+		"""Pop every queue that is full or has waited long enough; also return the time until the next one is."""
+		ready = []
+		next_s = None
+		for key, items in list(self._pending.items()):
+			while items and (len(items) >= self.max_batch or now - items[0][2] >= self.max_wait_s or self._closed):
+				batch = [items.popleft() for _ in range(min(self.max_batch, len(items)))]
+				ready.append((key, batch))
+			if items:
+				wait = self.max_wait_s - (now - items[0][2])
+				next_s = wait if next_s is None else min(next_s, wait)
+			else:
+				del self._pending[key]
+		return ready, next_s
+
+	def _run(self):
+		while True:
+			with self._cond:
+				while True:
+					ready, next_s = self._due(time.monotonic())
+					if ready or (self._closed and not self._pending):
+						break
+					self._cond.wait(next_s)
+				done = self._closed and not self._pending
+			for (source_lang, target_lang), batch in ready:
+				self._executor.submit(self._send, batch, target_lang, source_lang)
+			if done:
+				return
+
+	def _send(self, batch: list, target_lang: str, source_lang: Optional[str]):
+		live = [(text, future) for text, future, _ in batch if future.set_running_or_notify_cancel()]
+		if not live:
+			return
+		texts = [text for text, _ in live]
+		try:
+			translations = self._translate_many(texts, target_lang, source_lang)
+			if len(translations) != len(texts):
+				# zip() would leave the extra futures, and their callers, waiting forever
+				raise RuntimeError(f"translate_many returned {len(translations)} translations for {len(texts)} texts")
+		except BaseException as e:
+			for _, future in live:
+				future.set_exception(e)
+			return
+		for (_, future), translated in zip(live, translations):
+			future.set_result(translated)
+		with self._cond:
+			self.texts += len(texts)
+			self.batches += 1
+			self.largest_batch = max(self.largest_batch, len(texts))
+
+	def close(self):
+		"""Send everything still queued, then stop."""
+		with self._cond:
+			self._closed = True
+			self._cond.notify()
+		self._thread.join(timeout=5)
+		self._executor.shutdown(wait=True)
+
+	def stats(self) -> dict:
+		with self._cond:
+			return {
+				"max_batch": self.max_batch,
+				"max_wait_ms": self.max_wait_s * 1000,
+				"texts": self.texts,
+				"batches": self.batches,
+				"mean_batch": round(self.texts / self.batches, 2) if self.batches else None,
+				"largest_batch": self.largest_batch,
+				"waiting": sum(len(items) for items in self._pending.values()),
+			}
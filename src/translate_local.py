@@ -0,0 +1,180 @@
+"""Offline machine translation with one MarianMT model per language pair.
+
+Models are loaded on first use of a pair and kept in an LRU cache bounded by a memory
+budget, so a server can serve several pairs without holding every model it has ever
+seen. Two engines run the same OPUS-MT models on CPU:
+
+- ctranslate2: models converted with `ct2-transformers-converter` (int8 by default)
+  under LOCAL_MT_DIR/opus-mt-<src>-<tgt>, with the tokenizer files copied alongside
+- transformers: the PyTorch checkpoints Helsinki-NLP/opus-mt-<src>-<tgt> from the
+  Hugging Face cache (set HF_HUB_OFFLINE=1 on an air-gapped host)
+
+Both translate a whole batch of texts in one call. The libraries are imported on
+first load, so they cost nothing unless TRANSLATE_BACKENDS includes "local".
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from .config import AppConfig
+
+
+LOCAL_MT_ENGINES = ("ctranslate2", "transformers")
+
+
+class UnsupportedPair(Exception):
+	"""No local model for this language pair; not a backend failure."""
+
+
+def _lang(code: str) -> str:
+	return code.replace("_", "-").split("-")[0].lower()
+
+
+def _dir_bytes(path: str) -> int:
+	return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+class _PairModel:
+	def __init__(self, tokenizer, model, size_bytes: int, load_s: float):
+		self.tokenizer = tokenizer
+		self.model = model
+		self.size_bytes = size_bytes
+		self.load_s = load_s
+		# Neither engine's translate call is documented as safe across threads on one object
+		self.lock = threading.Lock()
+
+
+class LocalModelCache:
+	"""Loaded pair models, least recently used evicted once their total exceeds `budget_bytes`.
+
+	The model just loaded always stays, even if it alone is over budget.
+	"""
+
+	def __init__(self, load, budget_bytes: int):
+		self._load = load
+		self.budget_bytes = budget_bytes
+		self._models: "OrderedDict[tuple[str, str], _PairModel]" = OrderedDict()
+		self._missing: set[tuple[str, str]] = set()
+		self._lock = threading.Lock()
+		self._loading: dict[tuple[str, str], threading.Lock] = {}
+		# Metrics
+		self.loads = 0
+		self.evictions = 0
+
+	def get(self, pair: tuple[str, str]) -> _PairModel:
+		with self._lock:
+			if pair in self._missing:
+				raise UnsupportedPair(f"no local model for {pair[0]}->{pair[1]}")
+			model = self._models.get(pair)
+			if model is not None:
+				self._models.move_to_end(pair)
+				return model
+			loading = self._loading.setdefault(pair, threading.Lock())
+		# One thread loads a pair while the others asking for it wait; other pairs are not blocked
+		with loading:
+			with self._lock:
+				# The thread that held the lock may have found there is no model for this pair
+				if pair in self._missing:
+					raise UnsupportedPair(f"no local model for {pair[0]}->{pair[1]}")
+				model = self._models.get(pair)
+				if model is not None:
+					self._models.move_to_end(pair)
+					return model
+			try:
+				model = self._load(*pair)
+			except UnsupportedPair:
+				with self._lock:
+					self._missing.add(pair)
+				raise
+			else:
+				with self._lock:
+					self._models[pair] = model
+					self.loads += 1
+					self._evict()
+			finally:
+				with self._lock:
+					self._loading.pop(pair, None)
+			print(f"Local MT {pair[0]}->{pair[1]} loaded in {model.load_s:.2f} s ({model.size_bytes / 1e6:.0f} MB)")
+			return model
+
+	def _evict(self):
+		while len(self._models) > 1 and sum(m.size_bytes for m in self._models.values()) > self.budget_bytes:
+			pair, _ = self._models.popitem(last=False)
+			self.evictions += 1
+			print(f"Local MT {pair[0]}->{pair[1]} evicted (memory budget {self.budget_bytes / 1e6:.0f} MB)")
+
+	def stats(self) -> dict:
+		with self._lock:
+			return {
+				"pairs": [f"{s}->{t}" for s, t in self._models],
+				"bytes": sum(m.size_bytes for m in self._models.values()),
+				"budget_bytes": self.budget_bytes,
+				"loads": self.loads,
+				"evictions": self.evictions,
+				"missing": sorted(f"{s}->{t}" for s, t in self._missing),
+			}
+
+
+class LocalBackend:
+	"""TranslationService backend running OPUS-MT models locally; see the module docstring."""
+
+	name = "local"
+
+	def __init__(self, config: AppConfig):
+		if config.local_mt_engine not in LOCAL_MT_ENGINES:
+			raise ValueError(f"Unknown local MT engine: {config.local_mt_engine} (expected one of {', '.join(LOCAL_MT_ENGINES)})")
+		self.engine = config.local_mt_engine
+		self.model_dir = config.local_mt_dir
+		self.beam_size = max(1, config.local_mt_beam)
+		self.threads = config.local_mt_threads
+		self.default_source = _lang(config.default_source_lang)
+		self.models = LocalModelCache(self._load, int(config.local_mt_memory_mb * 1024 * 1024))
+
+	def _load(self, source: str, target: str) -> _PairModel:
+		t0 = time.perf_counter()
+		if self.engine == "ctranslate2":
+			import ctranslate2
+			from transformers import AutoTokenizer
+			path = os.path.join(self.model_dir, f"opus-mt-{source}-{target}")
+			if not os.path.isdir(path):
+				raise UnsupportedPair(f"no converted model at {path}")
+			tokenizer = AutoTokenizer.from_pretrained(path)
+			model = ctranslate2.Translator(path, device="cpu", intra_threads=self.threads)
+			return _PairModel(tokenizer, model, _dir_bytes(path), time.perf_counter() - t0)
+
+		import torch
+		from transformers import MarianMTModel, MarianTokenizer
+		name = f"Helsinki-NLP/opus-mt-{source}-{target}"
+		try:
+			tokenizer = MarianTokenizer.from_pretrained(name)
+			model = MarianMTModel.from_pretrained(name).eval()
+		except OSError as e:
+			raise UnsupportedPair(f"{name} unavailable: {e}") from e
+		if self.threads:
+			torch.set_num_threads(self.threads)
+		size = sum(p.numel() * p.element_size() for p in model.parameters())
+		return _PairModel(tokenizer, model, size, time.perf_counter() - t0)
+
+	def translate(self, text: str, target_lang: str, source_lang: Optional[str] = None) -> str:
+		return self.translate_batch([text], target_lang, source_lang)[0]
+
+	def translate_batch(self, texts: list[str], target_lang: str, source_lang: Optional[str] = None) -> list[str]:
+		pair = self.models.get((_lang(source_lang) if source_lang else self.default_source, _lang(target_lang)))
+		tokenizer = pair.tokenizer
+		with pair.lock:
+			if self.engine == "ctranslate2":
+				tokens = [tokenizer.convert_ids_to_tokens(tokenizer.encode(t)) for t in texts]
+				results = pair.model.translate_batch(tokens, beam_size=self.beam_size)
+				return [
+					tokenizer.decode(tokenizer.convert_tokens_to_ids(r.hypotheses[0]), skip_special_tokens=True) for r in results
+				]
+			import torch
+			batch = tokenizer(texts, return_tensors="pt", padding=True, truncation=True)
+			with torch.inference_mode():
+				generated = pair.model.generate(**batch, num_beams=self.beam_size)
+			return tokenizer.batch_decode(generated, skip_special_tokens=True)
+
+	def stats(self) -> dict:
+		return self.models.stats()
@@ -0,0 +1,227 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Sequence
+
+from .config import AppConfig
+
+
+def normalize_text(text: str) -> str:
+	"""Collapse whitespace and case so "Thank you " and "thank you" share an entry."""
+	return " ".join(text.split()).casefold()
+
+
+# A disk hit only rewrites `accessed` when the stored value is older than this, and the
+# rewrites are queued and committed with the next insert rather than one commit per hit
+ACCESS_RESOLUTION_S = 3600.0
+MAX_PENDING_TOUCHES = 256
+
+
+class TranslationCache:
+	"""Two-tier translation cache: an in-process LRU in front of an SQLite file.
+
+	Keys are (source_lang, target_lang, backend, normalized text). Entries older than
+	`ttl_s` are treated as misses and removed. The disk tier is trimmed back to
+	`max_entries` by least-recent access; the memory tier holds `memory_entries`.
+	Memory hits take their own lock, so they never wait behind disk I/O.
+	"""
+
+	def __init__(self, path: Optional[str], max_entries: int = 50000, memory_entries: int = 2048, ttl_s: Optional[float] = None):
+		self.path = path
+		self.max_entries = max_entries
+		self.memory_entries = memory_entries
+		self.ttl_s = ttl_s
+		self._memory: "OrderedDict[tuple, tuple[str, float]]" = OrderedDict()
+		self._memory_lock = threading.Lock()
+		self._db_lock = threading.Lock()
+		self._db: Optional[sqlite3.Connection] = None
+		self._rows = 0  # inserts since the last count; overcounts replaced keys until the next trim recounts
+		self._touched: dict[tuple, float] = {}
+		self.memory_hits = 0
+		self.disk_hits = 0
+		self.misses = 0
+		if path:
+			os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+			self._db = sqlite3.connect(path, check_same_thread=False)
+			self._db.execute("PRAGMA journal_mode=WAL")
+			# A cache can lose its last few inserts on power loss; skip the fsync per commit
+			self._db.execute("PRAGMA synchronous=NORMAL")
+			self._db.execute(
+				"CREATE TABLE IF NOT EXISTS translations ("
+				" source TEXT NOT NULL, target TEXT NOT NULL, backend TEXT NOT NULL, text TEXT NOT NULL,"
+				" translation TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL,"
+				" PRIMARY KEY (source, target, backend, text))"
+			)
+			self._db.execute("CREATE INDEX IF NOT EXISTS translations_accessed ON translations (accessed)")
+			self._trim(time.time())
+			self._db.commit()
+
+	@staticmethod
+	def key(source_lang: Optional[str], target_lang: str, backend: str, text: str) -> tuple:
+		return ((source_lang or "auto").lower(), target_lang.lower(), backend, normalize_text(text))
+
+	@property
+	def hits(self) -> int:
+		return self.memory_hits + self.disk_hits
+
+	def _expired(self, created: float, now: float) -> bool:
+		return self.ttl_s is not None and now - created > self.ttl_s
+
+	def get(self, source_lang: Optional[str], target_lang: str, backend: str, text: str) -> Optional[str]:
+		return self.get_first(source_lang, target_lang, (backend,), text)
+
+	def get_first(self, source_lang: Optional[str], target_lang: str, backends: Sequence[str], text: str) -> Optional[str]:
+		"""The translation stored under the first of `backends` that has one; one miss if none does."""
+		now = time.time()
+		keys = [self.key(source_lang, target_lang, backend, text) for backend in backends]
+		position, in_memory = len(keys), None
+		with self._memory_lock:
+			for i, key in enumerate(keys):
+				in_memory = self._find_memory(key, now)
+				if in_memory is not None:
+					position = i
+					break
+			if position == 0:
+				self.memory_hits += 1
+				return in_memory
+		# Only backends ahead of the memory hit can still take precedence over it
+		for key in keys[:position]:
+			found = self._find_disk(key, now)
+			if found is not None:
+				return found
+		with self._memory_lock:
+			if in_memory is not None:
+				self.memory_hits += 1
+			else:
+				self.misses += 1
+		return in_memory
+
+	def _find_memory(self, key: tuple, now: float) -> Optional[str]:
+		entry = self._memory.get(key)
+		if entry is None:
+			return None
+		if self._expired(entry[1], now):
+			del self._memory[key]
+			return None
+		self._memory.move_to_end(key)
+		return entry[0]
+
+	def _find_disk(self, key: tuple, now: float) -> Optional[str]:
+		if self._db is None:
+			return None
+		with self._db_lock:
+			if self._db is None:
+				return None
+			row = self._db.execute(
+				"SELECT translation, created, accessed FROM translations WHERE source=? AND target=? AND backend=? AND text=?",
+				key,
+			).fetchone()
+			if row is None:
+				return None
+			if self._expired(row[1], now):
+				self._db.execute("DELETE FROM translations WHERE source=? AND target=? AND backend=? AND text=?", key)
+				self._db.commit()
+				return None
+			if now - row[2] > ACCESS_RESOLUTION_S:
+				self._touched[key] = now
+				if len(self._touched) >= MAX_PENDING_TOUCHES:
+					self._flush_touches()
+					self._db.commit()
+		with self._memory_lock:
+			self._remember(key, row[0], row[1])
+			self.disk_hits += 1
+		return row[0]
+
+	def put(self, source_lang: Optional[str], target_lang: str, backend: str, text: str, translation: str):
+		key = self.key(source_lang, target_lang, backend, text)
+		now = time.time()
+		with self._memory_lock:
+			self._remember(key, translation, now)
+		if self._db is None:
+			return
+		with self._db_lock:
+			if self._db is None:
+				return
+			self._db.execute(
+				"INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?, ?)",
+				(*key, translation, now, now),
+			)
+			self._touched.pop(key, None)
+			self._rows += 1
+			if self._rows > self.max_entries:
+				self._trim(now)
+			self._flush_touches()
+			self._db.commit()
+
+	def _remember(self, key: tuple, translation: str, created: float):
+		self._memory[key] = (translation, created)
+		self._memory.move_to_end(key)
+		while len(self._memory) > self.memory_entries:
+			self._memory.popitem(last=False)
+
+	def _flush_touches(self):
+		if self._touched:
+			self._db.executemany(
+				"UPDATE translations SET accessed=? WHERE source=? AND target=? AND backend=? AND text=?",
+				[(accessed, *key) for key, accessed in self._touched.items()],
+			)
+			self._touched.clear()
+
+	def _trim(self, now: float):
+		"""Drop expired rows, recount, and trim to 90% once over `max_entries`.
+
+		Runs at open and whenever the running count passes the limit, so inserts
+		neither scan the table nor pay for a DELETE each.
+		"""
+		if self.ttl_s is not None:
+			self._db.execute("DELETE FROM translations WHERE created < ?", (now - self.ttl_s,))
+		(count,) = self._db.execute("SELECT COUNT(*) FROM translations").fetchone()
+		if count > self.max_entries:
+			self._flush_touches()
+			excess = count - int(self.max_entries * 0.9)
+			self._db.execute(
+				"DELETE FROM translations WHERE rowid IN (SELECT rowid FROM translations ORDER BY accessed LIMIT ?)",
+				(excess,),
+			)
+			count -= excess
+		self._rows = count
+
+	def stats(self) -> dict:
+		return {
+			"hits": self.hits,
+			"memory_hits": self.memory_hits,
+			"disk_hits": self.disk_hits,
+			"misses": self.misses,
+			"memory_entries": len(self._memory),
+		}
+
+	def close(self):
+		with self._db_lock:
+			if self._db is not None:
+				self._flush_touches()
+				self._db.commit()
+				self._db.close()
+				self._db = None
+
+
+_caches: dict[tuple, TranslationCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_translation_cache(config: AppConfig) -> Optional[TranslationCache]:
+	"""Process-wide cache for this config's settings, or None when caching is disabled."""
+	if config.translation_cache_memory <= 0:
+		return None
+	settings = (
+		config.translation_cache_path or None,
+		config.translation_cache_size,
+		config.translation_cache_memory,
+		config.translation_cache_ttl_s or None,
+	)
+	with _caches_lock:
+		cache = _caches.get(settings)
+		if cache is None:
+			cache = _caches[settings] = TranslationCache(*settings)
+		return cache
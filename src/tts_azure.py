@@ -1,7 +1,11 @@
-from typing import Optional
+from typing import Iterable, Iterator, Optional
+from xml.sax.saxutils import escape
 import os
+import threading
 
 from .config import AppConfig
+from .playback import PlaybackStats, pcm16_to_wav, play_pcm16_stream
+from .tts_cache import cached_chunks, get_audio_cache
 
 
 AZURE_VOICE_MAP = {
@@ -28,39 +32,207 @@ NATIVE_PRESETS = {
 }
 
 
-def tts_azure(text: str, config: AppConfig, voice: Optional[str] = None, accent: Optional[str] = None, native_style: bool = False):
+# Raw PCM output so AudioDataStream chunks can go straight to the sound device
+SAMPLE_RATE = 16000
+
+
+def _resolve(config: AppConfig, voice: Optional[str], accent: Optional[str], native_style: bool):
+	gender = voice or config.default_voice
+	acc = accent or config.default_accent
+	voice_name = AZURE_VOICE_MAP.get((gender, acc), AZURE_VOICE_MAP.get(("female", "us")))
+	preset = NATIVE_PRESETS.get((gender, acc), {"rate": "0%", "pitch": "0%", "style": "general"}) if native_style else None
+	return voice_name, preset
+
+
+def compile_ssml(voice_name: str, preset: dict) -> tuple[str, str]:
+	"""Render the SSML around the text once per (voice, preset); returns (prefix, suffix)."""
+	return (
+		"<speak version='1.0' xmlns='http://www.w3.org/2001/10/synthesis' xmlns:mstts='https://www.w3.org/2001/mstts' xml:lang='en-US'>"
+		f"<voice name='{voice_name}'>"
+		f"<mstts:express-as style='{preset['style']}'>"
+		f"<prosody rate='{preset['rate']}' pitch='{preset['pitch']}'>",
+		"</prosody></mstts:express-as></voice></speak>",
+	)
+
+
+class _Synthesizer:
+	def __init__(self, synthesizer, connection, ssml: Optional[tuple[str, str]]):
+		self.synthesizer = synthesizer
+		self.connection = connection
+		self.ssml = ssml
+
+
+class AzureSynthesizerManager:
+	"""Keeps warmed SpeechSynthesizers per (voice, preset) and reuses them across utterances.
+
+	A synthesizer speaks one utterance at a time, so each stream checks one out of its
+	voice's idle pool and returns it when done; overlapping utterances get another, and
+	the pool grows to the most utterances that ever overlapped. The SpeechConfig,
+	synthesizer and its service connection are created on first use (or up front via
+	warm()) instead of per call, and SSML is precompiled per preset. `speechsdk` can be
+	any module-like object exposing the Speech SDK API, e.g. a mock.
+	"""
+
+	def __init__(self, key: str, region: str, speechsdk=None):
+		if speechsdk is None:
+			import azure.cognitiveservices.speech as speechsdk
+		self.speechsdk = speechsdk
+		self.key = key
+		self.region = region
+		self._idle: dict[tuple, list[_Synthesizer]] = {}
+		self._lock = threading.Lock()
+
+	@staticmethod
+	def _entry_key(voice_name: str, preset: Optional[dict]) -> tuple:
+		return (voice_name, tuple(sorted(preset.items())) if preset else None)
+
+	def _create(self, voice_name: str, preset: Optional[dict]) -> _Synthesizer:
+		speechsdk = self.speechsdk
+		speech_config = speechsdk.SpeechConfig(subscription=self.key, region=self.region)
+		speech_config.set_speech_synthesis_output_format(speechsdk.SpeechSynthesisOutputFormat.Raw16Khz16BitMonoPcm)
+		speech_config.speech_synthesis_voice_name = voice_name
+		# No audio config: audio comes back through AudioDataStream and is played locally
+		synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=None)
+		connection = speechsdk.Connection.from_speech_synthesizer(synthesizer)
+		connection.open(True)
+		return _Synthesizer(synthesizer, connection, compile_ssml(voice_name, preset) if preset else None)
+
+	def _checkout(self, voice_name: str, preset: Optional[dict]) -> _Synthesizer:
+		with self._lock:
+			idle = self._idle.get(self._entry_key(voice_name, preset))
+			if idle:
+				return idle.pop()
+		# Created outside the lock so a slow connection does not hold up other voices
+		return self._create(voice_name, preset)
+
+	def _checkin(self, voice_name: str, preset: Optional[dict], entry: _Synthesizer):
+		with self._lock:
+			self._idle.setdefault(self._entry_key(voice_name, preset), []).append(entry)
+
+	def warm(self, targets: Iterable[tuple[str, Optional[dict]]]):
+		"""Create synthesizers and open their connections ahead of the first utterance."""
+		for voice_name, preset in targets:
+			with self._lock:
+				if self._idle.get(self._entry_key(voice_name, preset)):
+					continue
+			self._checkin(voice_name, preset, self._create(voice_name, preset))
+
+	def _discard(self, entry: _Synthesizer):
+		try:
+			entry.connection.close()
+		except Exception:
+			pass
+
+	def stream(self, text: str, voice_name: str, preset: Optional[dict], chunk_bytes: int = 3200) -> Iterator[bytes]:
+		"""Yield raw PCM for `text` from a pooled synthesizer.
+
+		A synthesizer whose result was cancelled or raised is closed rather than pooled,
+		so the next utterance for its voice gets a fresh one.
+		"""
+		speechsdk = self.speechsdk
+		entry = self._checkout(voice_name, preset)
+		finished = False
+		healthy = True
+		try:
+			# start_speaking_* resolves once the first audio arrives, not when synthesis completes
+			if entry.ssml is not None:
+				prefix, suffix = entry.ssml
+				result = entry.synthesizer.start_speaking_ssml_async(prefix + escape(text) + suffix).get()
+			else:
+				result = entry.synthesizer.start_speaking_text_async(text).get()
+			stream = speechsdk.AudioDataStream(result)
+			buf = bytes(chunk_bytes)
+			while True:
+				n = stream.read_data(buf)
+				if n == 0:
+					break
+				yield buf[:n]
+			finished = True
+			if stream.status == speechsdk.StreamStatus.Canceled:
+				healthy = False
+				raise RuntimeError(stream.cancellation_details.error_details)
+		except GeneratorExit:
+			raise
+		except Exception:
+			healthy = False
+			raise
+		finally:
+			if not finished and healthy:
+				# Abandoned (barge-in, cancel): stop synthesis so the synthesizer is free again
+				try:
+					entry.synthesizer.stop_speaking_async().get()
+				except Exception:
+					healthy = False
+			if healthy:
+				self._checkin(voice_name, preset, entry)
+			else:
+				self._discard(entry)
+
+	def close(self):
+		"""Close the idle synthesizers' connections; ones still streaming are returned to a fresh pool."""
+		with self._lock:
+			entries = [entry for idle in self._idle.values() for entry in idle]
+			self._idle = {}
+		for entry in entries:
+			self._discard(entry)
+
+
+_managers: dict[tuple, AzureSynthesizerManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_synthesizer_manager(config: AppConfig) -> AzureSynthesizerManager:
 	key = config.azure_speech_key or os.getenv("AZURE_SPEECH_KEY")
 	region = config.azure_speech_region or os.getenv("AZURE_SPEECH_REGION")
 	if not key or not region:
 		raise RuntimeError("Missing Azure speech key/region")
+	with _managers_lock:
+		manager = _managers.get((key, region))
+		if manager is None:
+			manager = _managers[(key, region)] = AzureSynthesizerManager(key, region)
+		return manager
+
+
+def warm_azure(config: AppConfig, voice: Optional[str] = None, accent: Optional[str] = None, native_style: bool = False):
+	"""Pre-open the synthesizer for the configured voice so the first utterance skips setup."""
+	get_synthesizer_manager(config).warm([_resolve(config, voice, accent, native_style)])
+
+
+def stream_azure(text: str, config: AppConfig, voice: Optional[str] = None, accent: Optional[str] = None, native_style: bool = False, chunk_bytes: int = 3200) -> Iterator[bytes]:
+	"""Yield raw 16-bit mono PCM at SAMPLE_RATE as Azure produces it."""
+	voice_name, preset = _resolve(config, voice, accent, native_style)
 	try:
-		import azure.cognitiveservices.speech as speechsdk
-		speech_config = speechsdk.SpeechConfig(subscription=key, region=region)
-		gender = voice or config.default_voice
-		acc = accent or config.default_accent
-		voice_name = AZURE_VOICE_MAP.get((gender, acc), AZURE_VOICE_MAP.get(("female", "us")))
-		audio_config = speechsdk.audio.AudioOutputConfig(use_default_speaker=True)
-		synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=audio_config)
-
-		if native_style:
-			preset = NATIVE_PRESETS.get((gender, acc), {"rate": "0%", "pitch": "0%", "style": "general"})
-			ssml = f"""
-				<speak version='1.0' xmlns='http://www.w3.org/2001/10/synthesis' xmlns:mstts='https://www.w3.org/2001/mstts' xml:lang='en-US'>
-					<voice name='{voice_name}'>
-						<mstts:express-as style='{preset["style"]}'>
-							<prosody rate='{preset["rate"]}' pitch='{preset["pitch"]}'>
-								{text}
-							</prosody>
-						</mstts:express-as>
-					</voice>
-				</speak>
-			"""
-			result = synthesizer.speak_ssml_async(ssml).get()
-		else:
-			speech_config.speech_synthesis_voice_name = voice_name
-			result = synthesizer.speak_text_async(text).get()
-
-		if result.reason != speechsdk.ResultReason.SynthesizingAudioCompleted:
-			raise RuntimeError(f"Azure TTS failed: {result.reason}")
+		yield from get_synthesizer_manager(config).stream(text, voice_name, preset, chunk_bytes)
 	except Exception as e:
 		raise RuntimeError(f"Azure TTS failed: {e}")
+
+
+def _cache_key(cache, voice_name: str, preset: Optional[dict], text: str) -> str:
+	return cache.key("azure/raw16k", voice_name, preset, text)
+
+
+def synthesize_azure(text: str, config: AppConfig, voice: Optional[str] = None, accent: Optional[str] = None, native_style: bool = False) -> bytes:
+	"""Return WAV bytes for `text`, from the audio cache when possible."""
+	def synthesize() -> bytes:
+		return pcm16_to_wav(b"".join(stream_azure(text, config, voice, accent, native_style)), SAMPLE_RATE)
+
+	cache = get_audio_cache(config)
+	if cache is None:
+		return synthesize()
+	voice_name, preset = _resolve(config, voice, accent, native_style)
+	return cache.get_or_synthesize(_cache_key(cache, voice_name, preset, text), synthesize)
+
+
+def speech_chunks_azure(text: str, config: AppConfig, voice: Optional[str] = None, accent: Optional[str] = None, native_style: bool = False) -> Iterator[bytes]:
+	"""PCM at SAMPLE_RATE for `text`: from the cache on a hit, otherwise streamed and cached."""
+	cache = get_audio_cache(config)
+	key = None
+	if cache is not None:
+		voice_name, preset = _resolve(config, voice, accent, native_style)
+		key = _cache_key(cache, voice_name, preset, text)
+	return cached_chunks(cache, key, lambda: stream_azure(text, config, voice, accent, native_style), SAMPLE_RATE)
+
+
+def tts_azure(text: str, config: AppConfig, voice: Optional[str] = None, accent: Optional[str] = None, native_style: bool = False) -> PlaybackStats:
+	"""Speak `text`, starting playback on the first chunk."""
+	return play_pcm16_stream(speech_chunks_azure(text, config, voice, accent, native_style), SAMPLE_RATE)
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Callable, Iterable, Iterator, Optional
+
+from .config import AppConfig
+from .playback import pcm16_to_wav, wav_to_pcm16
+
+
+# Cached clips are played back in slices of this length, like a provider stream
+CACHED_CHUNK_MS = 40
+
+
+class AudioCache:
+	"""Content-addressed store of synthesized audio on disk.
+
+	Files are named by the SHA-256 of (provider, voice, preset, text) and hold the
+	provider's encoded audio as-is. When the directory grows past `max_bytes` the
+	least recently used files (by mtime, refreshed on every hit) are removed.
+	"""
+
+	def __init__(self, directory: str, max_bytes: int):
+		self.directory = directory
+		self.max_bytes = max_bytes
+		self.hits = 0
+		self.misses = 0
+		self._lock = threading.Lock()
+		os.makedirs(directory, exist_ok=True)
+		self._total = sum(e.stat().st_size for e in os.scandir(directory) if e.is_file() and e.name.endswith(".audio"))
+
+	@staticmethod
+	def key(provider: str, voice: str, preset: Optional[dict], text: str) -> str:
+		material = json.dumps([provider, voice, preset, text.strip()], sort_keys=True, ensure_ascii=False)
+		return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+	def _path(self, key: str) -> str:
+		return os.path.join(self.directory, f"{key}.audio")
+
+	def get(self, key: str) -> Optional[bytes]:
+		path = self._path(key)
+		try:
+			with open(path, "rb") as f:
+				data = f.read()
+			os.utime(path)
+		except FileNotFoundError:
+			with self._lock:
+				self.misses += 1
+			return None
+		with self._lock:
+			self.hits += 1
+		return data
+
+	def put(self, key: str, data: bytes):
+		path = self._path(key)
+		tmp = f"{path}.{threading.get_ident()}.tmp"
+		with open(tmp, "wb") as f:
+			f.write(data)
+		with self._lock:
+			previous = os.path.getsize(path) if os.path.exists(path) else 0
+			os.replace(tmp, path)
+			self._total += len(data) - previous
+			if self._total > self.max_bytes:
+				self._evict()
+
+	def _evict(self):
+		entries = sorted(
+			(e for e in os.scandir(self.directory) if e.is_file() and e.name.endswith(".audio")),
+			key=lambda e: e.stat().st_mtime,
+		)
+		# Trim to 90% so a full cache does not rescan the directory on every insert
+		target = int(self.max_bytes * 0.9)
+		for entry in entries:
+			if self._total <= target:
+				break
+			try:
+				size = entry.stat().st_size
+				os.remove(entry.path)
+				self._total -= size
+			except FileNotFoundError:
+				continue
+
+	def get_or_synthesize(self, key: str, synthesize: Callable[[], bytes]) -> bytes:
+		data = self.get(key)
+		if data is None:
+			data = synthesize()
+			self.put(key, data)
+		return data
+
+	def stats(self) -> dict:
+		return {"hits": self.hits, "misses": self.misses, "bytes": self._total, "max_bytes": self.max_bytes}
+
+
+_caches: dict[tuple, AudioCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_audio_cache(config: AppConfig) -> Optional[AudioCache]:
+	"""Process-wide TTS cache for this config, or None when disabled (TTS_CACHE_MAX_MB=0)."""
+	if not config.tts_cache_dir or config.tts_cache_max_mb <= 0:
+		return None
+	settings = (config.tts_cache_dir, int(config.tts_cache_max_mb * 1024 * 1024))
+	with _caches_lock:
+		cache = _caches.get(settings)
+		if cache is None:
+			cache = _caches[settings] = AudioCache(*settings)
+		return cache
+
+
+def tee_into_cache(chunks: Iterable[bytes], cache: Optional[AudioCache], key: str, sample_rate: int) -> Iterator[bytes]:
+	"""Pass PCM chunks through unchanged and store them as one WAV once the stream completes."""
+	parts = []
+	for chunk in chunks:
+		parts.append(chunk)
+		yield chunk
+	if cache is not None and parts:
+		cache.put(key, pcm16_to_wav(b"".join(parts), sample_rate))
+
+
+def cached_chunks(cache: Optional[AudioCache], key: Optional[str], stream: Callable[[], Iterable[bytes]], sample_rate: int) -> Iterator[bytes]:
+	"""PCM for a cached clip in short slices, or the live provider stream teed into the cache.
+
+	Slicing keeps each playback write short, so barge-in and cancellation take effect
+	within a slice even for a clip that is already complete.
+	"""
+	if cache is not None:
+		cached = cache.get(key)
+		if cached is not None:
+			pcm, rate = wav_to_pcm16(cached)
+			step = max(2, int(rate * CACHED_CHUNK_MS / 1000) * 2)
+			for i in range(0, len(pcm), step):
+				yield pcm[i : i + step]
+			return
+	yield from tee_into_cache(stream(), cache, key, sample_rate)
+
+
+def prewarm(phrases: Iterable[str], synthesize: Callable[[str], bytes]) -> tuple[int, int]:
+	"""Synthesize each phrase through a caching synthesize function; returns (done, failed)."""
+	done = failed = 0
+	for phrase in phrases:
+		phrase = phrase.strip()
+		if not phrase or phrase.startswith("#"):
+			continue
+		try:
+			synthesize(phrase)
+			done += 1
+		except Exception as e:
+			print(f"Pre-warm failed for {phrase!r}: {e}")
+			failed += 1
+	return done, failed
@@ -1,8 +1,9 @@
-from typing import Optional
+from typing import Iterator, Optional
 import os
 
 from .config import AppConfig
-from .playback import play_wav_bytes
+from .playback import PlaybackStats, pcm16_to_wav, play_pcm16_stream
+from .tts_cache import cached_chunks, get_audio_cache
 
 
 VOICE_MAP = {
@@ -28,20 +29,35 @@ NATIVE_PRESETS = {
 }
 
 
-def tts_elevenlabs(text: str, config: AppConfig, voice: Optional[str] = None, accent: Optional[str] = None, native_style: bool = False):
+MODEL = "eleven_multilingual_v2"
+# Raw PCM so chunks can be played as they arrive, without an mp3 decoder in between
+SAMPLE_RATE = 22050
+OUTPUT_FORMAT = f"pcm_{SAMPLE_RATE}"
+
+
+def _resolve(config: AppConfig, voice: Optional[str], accent: Optional[str], native_style: bool):
+	gender = voice or config.default_voice
+	acc = accent or config.default_accent
+	selected_name = VOICE_MAP.get((gender, acc), VOICE_MAP.get(("female", "us")))
+	preset = NATIVE_PRESETS.get((gender, acc), {"stability": 0.4, "similarity_boost": 0.8, "style": 0.2}) if native_style else None
+	return selected_name, preset
+
+
+def _cache_key(cache, selected_name: str, preset: Optional[dict], text: str) -> str:
+	return cache.key(f"elevenlabs/{MODEL}/{OUTPUT_FORMAT}", selected_name, preset, text)
+
+
+def stream_elevenlabs(text: str, config: AppConfig, voice: Optional[str] = None, accent: Optional[str] = None, native_style: bool = False) -> Iterator[bytes]:
+	"""Yield raw 16-bit mono PCM at SAMPLE_RATE as ElevenLabs streams it."""
 	api_key = config.elevenlabs_api_key or os.getenv("ELEVENLABS_API_KEY")
 	if not api_key:
 		raise RuntimeError("Missing ELEVENLABS_API_KEY")
+	selected_name, preset = _resolve(config, voice, accent, native_style)
 	try:
 		from elevenlabs import VoiceSettings, generate, set_api_key
 		set_api_key(api_key)
-		gender = voice or config.default_voice
-		acc = accent or config.default_accent
-		selected_name = VOICE_MAP.get((gender, acc), VOICE_MAP.get(("female", "us")))
-
 		voice_settings = None
-		if native_style:
-			preset = NATIVE_PRESETS.get((gender, acc), {"stability": 0.4, "similarity_boost": 0.8, "style": 0.2})
+		if preset is not None:
 			voice_settings = VoiceSettings(
 				stability=preset["stability"],
 				similarity_boost=preset["similarity_boost"],
@@ -50,13 +66,41 @@ def tts_elevenlabs(text: str, config: AppConfig, voice: Optional[str] = None, ac
 		audio = generate(
 			text=text,
 			voice=selected_name,
-			model="eleven_multilingual_v2",
+			model=MODEL,
 			voice_settings=voice_settings,
+			stream=True,
+			output_format=OUTPUT_FORMAT,
 		)
 		if isinstance(audio, bytes):
-			play_wav_bytes(audio)
+			yield audio
 		else:
-			buf = b"".join(chunk for chunk in audio)
-			play_wav_bytes(buf)
+			yield from audio
 	except Exception as e:
 		raise RuntimeError(f"ElevenLabs TTS failed: {e}")
+
+
+def synthesize_elevenlabs(text: str, config: AppConfig, voice: Optional[str] = None, accent: Optional[str] = None, native_style: bool = False) -> bytes:
+	"""Return WAV bytes for `text`, from the audio cache when possible."""
+	def synthesize() -> bytes:
+		return pcm16_to_wav(b"".join(stream_elevenlabs(text, config, voice, accent, native_style)), SAMPLE_RATE)
+
+	cache = get_audio_cache(config)
+	if cache is None:
+		return synthesize()
+	selected_name, preset = _resolve(config, voice, accent, native_style)
+	return cache.get_or_synthesize(_cache_key(cache, selected_name, preset, text), synthesize)
+
+
+def speech_chunks_elevenlabs(text: str, config: AppConfig, voice: Optional[str] = None, accent: Optional[str] = None, native_style: bool = False) -> Iterator[bytes]:
+	"""PCM at SAMPLE_RATE for `text`: from the cache on a hit, otherwise streamed and cached."""
+	cache = get_audio_cache(config)
+	key = None
+	if cache is not None:
+		selected_name, preset = _resolve(config, voice, accent, native_style)
+		key = _cache_key(cache, selected_name, preset, text)
+	return cached_chunks(cache, key, lambda: stream_elevenlabs(text, config, voice, accent, native_style), SAMPLE_RATE)
+
+
+def tts_elevenlabs(text: str, config: AppConfig, voice: Optional[str] = None, accent: Optional[str] = None, native_style: bool = False) -> PlaybackStats:
+	"""Speak `text`, starting playback on the first chunk."""
+	return play_pcm16_stream(speech_chunks_elevenlabs(text, config, voice, accent, native_style), SAMPLE_RATE)
@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.asr_backends import FasterWhisperBackend
+
+tokenizers = pytest.importorskip("tokenizers")
+transcribe = pytest.importorskip("faster_whisper.transcribe")
+feature_extractor = pytest.importorskip("faster_whisper.feature_extractor")
+
+TEXT = {"de": [0, 1], "en": [2, 3]}
+VOCAB = {
+	"hallo": 0, "welt": 1, "hello": 2, "world": 3, "[UNK]": 4,
+	"<|endoftext|>": 5, "<|startoftranscript|>": 6, "<|en|>": 7, "<|de|>": 8, "<|transcribe|>": 9, "<|notimestamps|>": 10,
+}
+
+
+class FakeWhisper:
+	"""Stands in for ctranslate2.models.Whisper, with the signatures faster-whisper 1.0.3 calls."""
+
+	device = "cpu"
+	device_index = [0]
+	is_multilingual = True
+
+	def __init__(self, detected: list[str]):
+		self.detected = detected
+		self.encoded_shapes = []
+
+	def encode(self, features, to_cpu: bool = False):
+		features = np.asarray(features)
+		# (batch, mel bins, frames); a 4-D input is what a stacked batch through WhisperModel.encode() becomes
+		assert features.ndim == 3
+		self.encoded_shapes.append(features.shape)
+		return features
+
+	def detect_language(self, encoded):
+		rows = np.asarray(encoded).shape[0]
+		return [[(f"<|{language}|>", 0.9), ("<|ja|>", 0.1)] for language in self.detected[:rows]]
+
+	def generate(self, encoded, prompts, **options):
+		assert np.asarray(encoded).shape[0] == len(prompts)
+		language = {VOCAB["<|de|>"]: "de", VOCAB["<|en|>"]: "en"}
+		return [SimpleNamespace(sequences_ids=[TEXT[language[prompt[1]]] + [VOCAB["<|endoftext|>"]]]) for prompt in prompts]
+
+
+def _model(detected: list[str]):
+	hf_tokenizer = tokenizers.Tokenizer(tokenizers.models.WordLevel(VOCAB, unk_token="[UNK]"))
+	hf_tokenizer.pre_tokenizer = tokenizers.pre_tokenizers.WhitespaceSplit()
+	model = transcribe.WhisperModel.__new__(transcribe.WhisperModel)
+	model.model = FakeWhisper(detected)
+	model.feature_extractor = feature_extractor.FeatureExtractor()
+	model.hf_tokenizer = hf_tokenizer
+	return model
+
+
+def test_faster_whisper_batch_encodes_every_segment_in_one_pass():
+	model = _model(["de", "en"])
+	audios = [np.zeros(16000, dtype=np.float32), np.full(8000, 0.1, dtype=np.float32)]
+	results = FasterWhisperBackend().transcribe_batch(model, audios)
+	assert [(r.language, r.text) for r in results] == [("de", "hallo welt"), ("en", "hello world")]
+	assert model.model.encoded_shapes == [(2, 80, model.feature_extractor.nb_max_frames)]
+
+
+def test_faster_whisper_batch_honours_given_languages():
+	model = _model(["de", "de", "de"])
+	audios = [np.zeros(4000, dtype=np.float32)] * 3
+	results = FasterWhisperBackend().transcribe_batch(model, audios, ["en", None, "en"])
+	assert [r.language for r in results] == ["en", "de", "en"]
+	assert len(model.model.encoded_shapes) == 1
+
+
+def test_faster_whisper_detect_language_uses_one_segment_batch():
+	model = _model(["de"])
+	assert FasterWhisperBackend().detect_language(model, np.zeros(16000, dtype=np.float32)) == ("de", 0.9)
+	assert model.model.encoded_shapes[0][0] == 1
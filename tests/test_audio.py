@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+from src.audio import VADRecorder, read_wav_pcm16
+from src.config import AppConfig
+
+SAMPLE_RATE = 16000
+
+
+def voiced(seconds: float, level: float = 0.3) -> np.ndarray:
+	"""A 180 Hz buzz with harmonics, which webrtcvad classifies as speech."""
+	t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+	wave = sum(np.sin(2 * np.pi * 180 * h * t) / h for h in range(1, 8))
+	return (level * wave / np.abs(wave).max()).astype(np.float32)
+
+
+def silence(seconds: float) -> np.ndarray:
+	return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+@pytest.fixture
+def config() -> AppConfig:
+	config = AppConfig()
+	config.sample_rate = SAMPLE_RATE
+	config.frame_ms = 20
+	config.aggressiveness = 2
+	config.padding_ms = 300
+	config.vad_hangover_ms = 300
+	config.max_segment_ms = 8000
+	config.vad_split_search_ms = 1000
+	return config
+
+
+@pytest.fixture
+def wav(tmp_path):
+	def write(*parts: np.ndarray) -> str:
+		path = str(tmp_path / "fixture.wav")
+		sf.write(path, np.concatenate(parts), SAMPLE_RATE, subtype="PCM_16")
+		return path
+	return write
+
+
+def test_segments_from_wav_cuts_each_utterance_at_its_pause(config, wav):
+	path = wav(silence(0.5), voiced(1.0), silence(1.0), voiced(1.5), silence(1.0))
+	segments = list(VADRecorder(config).segments_from_wav(path))
+	assert [s.is_final for s in segments] == [True, True]
+	# Each segment is the utterance plus at most the hangover and the frames before the trigger
+	for segment, spoken_ms in zip(segments, (1000, 1500)):
+		assert spoken_ms <= segment.duration_ms <= spoken_ms + 400
+		assert segment.sample_rate == SAMPLE_RATE
+		assert len(segment.pcm16) == segment.duration_ms * SAMPLE_RATE // 1000 * 2
+
+
+def test_silence_yields_no_segments(config, wav):
+	assert list(VADRecorder(config).segments_from_wav(wav(silence(2.0)))) == []
+
+
+def test_longer_hangover_bridges_a_short_pause(config, wav):
+	path = wav(silence(0.5), voiced(1.0), silence(0.4), voiced(1.0), silence(1.5))
+	assert len(list(VADRecorder(config, hangover_ms=200).segments_from_wav(path))) == 2
+	assert len(list(VADRecorder(config, hangover_ms=800).segments_from_wav(path))) == 1
+
+
+def test_segment_stream_does_not_depend_on_chunk_size(config, wav):
+	pcm = read_wav_pcm16(wav(silence(0.5), voiced(1.0), silence(1.0), voiced(0.8), silence(1.0)), SAMPLE_RATE)
+	expected = [s.pcm16 for s in VADRecorder(config).segment_stream([pcm])]
+	# 7 ms chunks: frames straddle chunk boundaries all the time
+	step = int(SAMPLE_RATE * 0.007) * 2
+	chunked = [s.pcm16 for s in VADRecorder(config).segment_stream(pcm[i : i + step] for i in range(0, len(pcm), step))]
+	assert len(expected) == 2
+	assert chunked == expected
+
+
+def test_partial_snapshots_precede_the_final_segment(config, wav):
+	path = wav(silence(0.5), voiced(1.5), silence(1.0))
+	segments = list(VADRecorder(config).segments_from_wav(path, partial_ms=500))
+	assert [s.is_final for s in segments] == [False, False, False, True]
+	# Every snapshot is a prefix of the final segment
+	final = segments[-1].pcm16
+	assert all(final.startswith(s.pcm16) for s in segments[:-1])
+
+
+def test_unbroken_speech_is_split_at_its_quietest_frame(config, wav):
+	config.max_segment_ms = 2000
+	# A quieter stretch 1.5 s into the speech, inside the search window before the 2 s limit
+	path = wav(silence(0.3), voiced(1.5), voiced(0.06, level=0.05), voiced(3.44), silence(1.0))
+	recorder = VADRecorder(config)
+	segments = list(recorder.segments_from_wav(path))
+	assert recorder.forced_splits >= 1
+	assert all(s.duration_ms <= config.max_segment_ms for s in segments[:-1])
+	first = np.frombuffer(segments[0].pcm16, dtype=np.int16)
+	# The cut lands just after a quiet frame rather than mid-buzz
+	tail = first[-SAMPLE_RATE * config.frame_ms // 1000 :].astype(np.float64)
+	assert np.sqrt(np.mean(tail ** 2)) < 0.1 * 32768 * 0.3
+	# Nothing is lost at the cuts: the segments join back into one contiguous stretch of the file
+	pcm = read_wav_pcm16(path, SAMPLE_RATE)
+	joined = b"".join(s.pcm16 for s in segments)
+	assert joined in pcm
+	assert recorder.capture_stats()["forced_splits"] == recorder.forced_splits
@@ -0,0 +1,99 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.audio import AudioSegment
+from src.config import AppConfig
+from src.pipeline import MAX_MERGE_CHARS, Pipeline, Utterance, _TrackedQueue
+
+
+@pytest.fixture
+def config() -> AppConfig:
+	config = AppConfig()
+	config.trace_enabled = False
+	config.asr_incremental = False
+	config.audio_journal_dir = ""
+	config.tts_latency_budget_s = 4.0
+	return config
+
+
+def pipeline(config: AppConfig) -> Pipeline:
+	asr = SimpleNamespace(language_tracker=lambda: None)
+	pipeline = Pipeline(config, asr, lambda text, source: text, speak_fn=lambda text: None)
+	pipeline._tts_in = asyncio.Queue()
+	return pipeline
+
+
+def segment_utterance(id: int, duration_ms: int) -> Utterance:
+	samples = 16 * duration_ms
+	return Utterance(id=id, segment=AudioSegment(pcm16=bytes([id]) * 2 * samples, sample_rate=16000, duration_ms=duration_ms))
+
+
+def offer_all(config: AppConfig, *utts: Utterance) -> Pipeline:
+	p = pipeline(config)
+	p._asr_in = _TrackedQueue(config.asr_queue_size)
+	for utt in utts:
+		p._offer(utt)
+	return p
+
+
+def utterance(text: str, age_s: float) -> Utterance:
+	segment = AudioSegment(pcm16=b"", sample_rate=16000, duration_ms=0)
+	return Utterance(id=0, segment=segment, captured_at=time.monotonic() - age_s, translation=text)
+
+
+def test_late_utterance_is_merged_into_the_ones_behind_it(config):
+	p = pipeline(config)
+	newest = utterance("third", 0.5)
+	for utt in (utterance("second", 4.5), newest):
+		p._tts_in.put_nowait(utt)
+	merged, done = p._merge_stale(utterance("first", 5.0))
+	assert merged is newest
+	assert merged.translation == "first second third"
+	assert (p.merged, done) == (2, False)
+
+
+def test_utterance_within_budget_is_spoken_alone(config):
+	p = pipeline(config)
+	p._tts_in.put_nowait(utterance("second", 0.1))
+	merged, _ = p._merge_stale(utterance("first", 1.0))
+	assert merged.translation == "first"
+	assert p._tts_in.qsize() == 1
+
+
+def test_merge_keeps_the_newest_text_and_stops_at_the_end_of_stream(config):
+	p = pipeline(config)
+	p._tts_in.put_nowait(utterance("b" * (MAX_MERGE_CHARS - 10), 6.0))
+	p._tts_in.put_nowait(None)
+	merged, done = p._merge_stale(utterance("a" * 50, 9.0))
+	assert merged.translation == "b" * (MAX_MERGE_CHARS - 10)
+	assert (p.merged, p.dropped_stale, done) == (0, 1, True)
+
+
+def test_full_asr_queue_merges_into_the_newest_segment(config):
+	config.asr_queue_size = 2
+	config.asr_backpressure = "merge"
+	p = offer_all(config, *(segment_utterance(i, 1000) for i in (1, 2, 3, 4)))
+	first, second = p._asr_in.get_nowait(), p._asr_in.get_nowait()
+	assert (first.id, second.id) == (1, 2)
+	assert second.segment.duration_ms == 3000
+	assert second.segment.pcm16 == bytes([2]) * 32000 + bytes([3]) * 32000 + bytes([4]) * 32000
+	assert p.merged_segments == 2
+
+
+def test_merge_falls_back_to_dropping_past_one_whisper_window(config):
+	config.asr_queue_size = 1
+	config.asr_backpressure = "merge"
+	p = offer_all(config, segment_utterance(1, 20000), segment_utterance(2, 20000))
+	assert p._asr_in.get_nowait().id == 2
+	assert (p.merged_segments, p.dropped_segments) == (0, 1)
+
+
+def test_full_asr_queue_drops_the_oldest_segment(config):
+	config.asr_queue_size = 2
+	config.asr_backpressure = "drop_oldest"
+	p = offer_all(config, *(segment_utterance(i, 1000) for i in (1, 2, 3)))
+	assert [p._asr_in.get_nowait().id for _ in range(2)] == [2, 3]
+	assert p.dropped_segments == 1
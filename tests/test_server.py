@@ -0,0 +1,115 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+pytest.importorskip("aiohttp")
+from aiohttp.test_utils import TestClient, TestServer
+
+import src.asr_whisper
+from src.asr_backends import ASRResult
+from src.config import AppConfig
+from src.server import TranslationServer
+
+SAMPLE_RATE = 16000
+
+
+class FakeBackend:
+	"""An ASR engine that records the batches it is given instead of running Whisper."""
+
+	name = "fake-batching"
+
+	def __init__(self):
+		self.batches: list[int] = []
+		self._lock = threading.Lock()
+
+	def load(self, size: str):
+		return object()
+
+	def transcribe(self, model, audio, language=None) -> ASRResult:
+		with self._lock:
+			self.batches.append(1)
+		return ASRResult(text="hello there.", language=language or "en")
+
+	def transcribe_batch(self, model, audios, languages=None, choose=None) -> list[ASRResult]:
+		with self._lock:
+			self.batches.append(len(audios))
+		return [ASRResult(text="hello there.", language="en") for _ in audios]
+
+
+def utterance() -> bytes:
+	"""Half a second of silence, one second of a voiced buzz, then a second of silence."""
+	t = np.arange(SAMPLE_RATE) / SAMPLE_RATE
+	buzz = sum(np.sin(2 * np.pi * 180 * h * t) / h for h in range(1, 8))
+	audio = np.concatenate([np.zeros(SAMPLE_RATE // 2), 0.3 * buzz / np.abs(buzz).max(), np.zeros(SAMPLE_RATE)])
+	return (audio * 32767).astype(np.int16).tobytes()
+
+
+async def call(client: TestClient, pcm16: bytes) -> list[dict]:
+	messages = []
+	async with client.ws_connect("/ws") as ws:
+		await ws.send_json({"type": "start", "target_lang": "es"})
+		assert (await ws.receive_json())["type"] == "ready"
+		await ws.send_bytes(pcm16)
+		await ws.send_json({"type": "stop"})
+		async for msg in ws:
+			if msg.type.name == "TEXT":
+				messages.append(msg.json())
+	return messages
+
+
+def run_callers(config: AppConfig, callers: int) -> tuple[TranslationServer, list[list[dict]]]:
+	async def main():
+		server = TranslationServer(config, offline=True)
+		client = TestClient(TestServer(server.app()))
+		await client.start_server()
+		try:
+			results = await asyncio.gather(*(call(client, utterance()) for _ in range(callers)))
+		finally:
+			await client.close()
+		return server, results
+
+	return asyncio.run(main())
+
+
+@pytest.fixture
+def backend(monkeypatch) -> FakeBackend:
+	backend = FakeBackend()
+	monkeypatch.setattr(src.asr_whisper, "get_asr_backend", lambda config: backend)
+	return backend
+
+
+@pytest.fixture
+def config(backend) -> AppConfig:
+	config = AppConfig()
+	config.sample_rate = SAMPLE_RATE
+	config.whisper_model_size = "test"
+	config.whisper_warmup = False
+	config.asr_language = "en"
+	config.asr_incremental = False
+	config.asr_workers = 1
+	config.asr_batch_size = 8
+	config.asr_batch_wait_ms = 500
+	config.trace_enabled = False
+	config.audio_journal_dir = ""
+	config.server_ingest_ratio = 1000.0
+	config.server_ingest_burst_s = 60.0
+	return config
+
+
+def test_concurrent_sessions_share_a_whisper_batch(config, backend):
+	server, results = run_callers(config, callers=4)
+	for messages in results:
+		assert [m["type"] for m in messages if m["type"] in ("transcript", "translation")] == ["transcript", "translation"]
+	# All four utterances end at the same moment, so they are decoded together
+	assert backend.batches == [4]
+	assert server.asr.batch_stats()["largest_batch"] == 4
+	assert server.sessions == {}
+
+
+def test_sessions_are_transcribed_one_at_a_time_without_batching(config, backend):
+	config.asr_batch_size = 1
+	server, _ = run_callers(config, callers=2)
+	assert backend.batches == [1, 1]
+	assert server.asr.batch_stats() is None
@@ -0,0 +1,15 @@
+from src.translate_batch import ends_sentence
+
+
+def test_greek_question_as_whisper_writes_it():
+	# Whisper's Greek output ends questions with an ASCII ";" rather than U+037E
+	assert ends_sentence("Τι ώρα είναι;", "el")
+	assert ends_sentence("Πού είναι ο σταθμός;»", "el")
+	assert ends_sentence("Θα έρθεις αύριο;", "el")
+	assert not ends_sentence("Πήγα στο σπίτι, αλλά", "el")
+
+
+def test_semicolon_ends_a_sentence_only_in_greek():
+	assert not ends_sentence("I went home;", "en")
+	assert not ends_sentence("I went home;")
+	assert ends_sentence("I went home.", "en")
@@ -0,0 +1,151 @@
+import ctypes
+from types import SimpleNamespace
+
+import pytest
+
+from src.tts_azure import AzureSynthesizerManager
+
+
+class FakeResult:
+	def __init__(self, chunks: list[bytes], canceled: bool):
+		self.chunks = list(chunks)
+		self.canceled = canceled
+
+
+class FakeAudioDataStream:
+	def __init__(self, result: FakeResult):
+		self.result = result
+		self.status = "canceled" if result.canceled else "completed"
+		self.cancellation_details = SimpleNamespace(error_details="connection reset")
+
+	def read_data(self, buf: bytes) -> int:
+		if not self.result.chunks:
+			return 0
+		chunk = self.result.chunks.pop(0)
+		# Like the SDK, fill the caller's bytes buffer in place from native code
+		ctypes.memmove(ctypes.c_char_p(buf), chunk, len(chunk))
+		return len(chunk)
+
+
+class FakeSDK:
+	"""The parts of azure.cognitiveservices.speech that AzureSynthesizerManager uses."""
+
+	SpeechSynthesisOutputFormat = SimpleNamespace(Raw16Khz16BitMonoPcm="raw16k")
+	StreamStatus = SimpleNamespace(Canceled="canceled")
+
+	def __init__(self):
+		self.synthesizers = []
+		self.closed = []
+		self.outcomes: list[bool] = []  # True = cancelled; consumed one per utterance
+		sdk = self
+
+		class SpeechConfig:
+			def __init__(self, subscription: str, region: str):
+				self.speech_synthesis_voice_name = None
+
+			def set_speech_synthesis_output_format(self, output_format):
+				self.output_format = output_format
+
+		class SpeechSynthesizer:
+			def __init__(self, speech_config, audio_config):
+				self.voice = speech_config.speech_synthesis_voice_name
+				self.spoken = []
+				sdk.synthesizers.append(self)
+
+			def start_speaking_text_async(self, text: str):
+				self.spoken.append(text)
+				canceled = sdk.outcomes.pop(0) if sdk.outcomes else False
+				return SimpleNamespace(get=lambda: FakeResult([b"\x01\x00" * 4, b"\x02\x00" * 4], canceled))
+
+			start_speaking_ssml_async = start_speaking_text_async
+
+			def stop_speaking_async(self):
+				return SimpleNamespace(get=lambda: None)
+
+		class Connection:
+			def __init__(self, synthesizer):
+				self.synthesizer = synthesizer
+
+			@classmethod
+			def from_speech_synthesizer(cls, synthesizer):
+				return cls(synthesizer)
+
+			def open(self, for_continuous_recognition: bool):
+				pass
+
+			def close(self):
+				sdk.closed.append(self.synthesizer)
+
+		self.SpeechConfig = SpeechConfig
+		self.SpeechSynthesizer = SpeechSynthesizer
+		self.Connection = Connection
+		self.AudioDataStream = FakeAudioDataStream
+
+
+def _speak(manager: AzureSynthesizerManager, text: str, voice: str) -> bytes:
+	return b"".join(manager.stream(text, voice, None))
+
+
+def test_synthesizers_are_reused_per_voice():
+	sdk = FakeSDK()
+	manager = AzureSynthesizerManager("key", "westeurope", speechsdk=sdk)
+	assert _speak(manager, "one", "en-US-JennyNeural") == b"\x01\x00" * 4 + b"\x02\x00" * 4
+	_speak(manager, "two", "en-US-JennyNeural")
+	_speak(manager, "three", "en-GB-RyanNeural")
+	_speak(manager, "four", "en-GB-RyanNeural")
+	assert [(s.voice, s.spoken) for s in sdk.synthesizers] == [
+		("en-US-JennyNeural", ["one", "two"]),
+		("en-GB-RyanNeural", ["three", "four"]),
+	]
+
+
+def test_overlapping_utterances_get_their_own_synthesizer():
+	sdk = FakeSDK()
+	manager = AzureSynthesizerManager("key", "westeurope", speechsdk=sdk)
+	first = manager.stream("one", "en-US-JennyNeural", None)
+	next(first)
+	_speak(manager, "two", "en-US-JennyNeural")
+	list(first)
+	assert len(sdk.synthesizers) == 2
+
+
+def test_cancelled_result_rebuilds_the_synthesizer():
+	sdk = FakeSDK()
+	manager = AzureSynthesizerManager("key", "westeurope", speechsdk=sdk)
+	sdk.outcomes = [True]
+	with pytest.raises(RuntimeError, match="connection reset"):
+		_speak(manager, "one", "en-US-JennyNeural")
+	_speak(manager, "two", "en-US-JennyNeural")
+	assert sdk.closed == [sdk.synthesizers[0]]
+	assert [s.spoken for s in sdk.synthesizers] == [["one"], ["two"]]
+
+
+def test_error_mid_stream_rebuilds_the_synthesizer():
+	sdk = FakeSDK()
+	manager = AzureSynthesizerManager("key", "westeurope", speechsdk=sdk)
+	broken = sdk.AudioDataStream
+
+	def failing(result):
+		stream = broken(result)
+		stream.read_data = lambda buf: (_ for _ in ()).throw(OSError("socket closed"))
+		return stream
+
+	sdk.AudioDataStream = failing
+	with pytest.raises(OSError):
+		_speak(manager, "one", "en-US-JennyNeural")
+	sdk.AudioDataStream = broken
+	_speak(manager, "two", "en-US-JennyNeural")
+	assert sdk.closed == [sdk.synthesizers[0]]
+	assert len(sdk.synthesizers) == 2
+
+
+def test_abandoned_stream_keeps_its_synthesizer():
+	sdk = FakeSDK()
+	manager = AzureSynthesizerManager("key", "westeurope", speechsdk=sdk)
+	stream = manager.stream("one", "en-US-JennyNeural", None)
+	next(stream)
+	# Barge-in: the consumer stops reading
+	stream.close()
+	_speak(manager, "two", "en-US-JennyNeural")
+	assert sdk.closed == []
+	assert [s.spoken for s in sdk.synthesizers] == [["one", "two"]]